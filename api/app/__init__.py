@@ -5,40 +5,90 @@ import os
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
-from flask_jwt_extended import JWTManager
 from flask_cors import CORS
 from flask_marshmallow import Marshmallow
 from dotenv import load_dotenv
+from app.core.jwt_manager import CachingJWTManager
+from app.infra.db_router import RoutingSession
 
 # Carregar variáveis de ambiente
 load_dotenv()
 
-# Inicializar extensões
-db = SQLAlchemy()
+# Inicializar extensões (objetos continuam carregados após o commit: sem SELECT para reler o que acabou de ser gravado;
+# leituras roteadas para réplicas quando configuradas)
+db = SQLAlchemy(session_options={'expire_on_commit': False, 'class_': RoutingSession})
 migrate = Migrate()
-jwt = JWTManager()
+jwt = CachingJWTManager()
 ma = Marshmallow()
 
 def create_app(config_name=None):
     """Factory da aplicação Flask"""
     app = Flask(__name__)
     
-    # Configurações
-    app.config.from_object('app.config.Config')
+    # Configurações do ambiente (config_name ou FLASK_ENV: development, production, testing)
+    from app.config import config
+    app.config.from_object(config.get(config_name or os.environ.get('FLASK_ENV', 'default'), config['default']))
     
     # Configurar CORS
     CORS(app, origins=[app.config.get('FRONTEND_URL', 'http://localhost:5173')])
     
+    # Instrumentar o pool de conexões (antes de criar os engines)
+    from app.infra.db_pool import pool_monitor
+    pool_monitor.init_app(app)
+    
     # Inicializar extensões
     db.init_app(app)
     migrate.init_app(app, db)
     jwt.init_app(app)
     ma.init_app(app)
     
-    # Configurar JWT
+    # Configurar revogação de tokens (Redis + filtro de Bloom)
+    from app.infra.pubsub import pubsub_listener
+    from app.infra.token_store import revocation_store, epoch_store
+    pubsub_listener.init_app(app)
+    revocation_store.init_app(app)
+    epoch_store.init_app(app)
+    
+    # Configurar JWT (chaveiro de assinatura assimétrica)
+    from app.core.keyring import keyring
+    keyring.init_app(app)
+    
     from app.core.security import jwt_config
     jwt_config(app)
     
+    # Configurar buffer write-behind de logins
+    from app.infra.login_buffer import login_buffer
+    login_buffer.init_app(app)
+    
+    # Configurar busca textual de usuários
+    from app.infra.search import user_search
+    user_search.init_app(app)
+    
+    # Configurar cache de identidade de usuários (memo da requisição, worker e Redis)
+    from app.infra.user_cache import user_cache
+    user_cache.init_app(app)
+    
+    # Configurar índice de autocomplete de usuários (montado por worker)
+    from app.infra.autocomplete import autocomplete_index
+    autocomplete_index.init_app(app)
+    
+    # Configurar pool de hashing de senhas
+    from app.core.hashing import hashing_executor
+    hashing_executor.init_app(app)
+    
+    # Configurar roteamento de leituras para réplicas
+    from app.infra.db_router import db_router
+    db_router.init_app(app)
+    
+    # Configurar unidade de trabalho (um commit por requisição)
+    from app.infra.unit_of_work import unit_of_work
+    unit_of_work.init_app(app)
+    
+    # Configurar Celery (o módulo de tarefas lê a configuração da aplicação ao ser importado)
+    with app.app_context():
+        from app.infra.tasks import init_celery
+        init_celery(app)
+    
     # Registrar blueprints
     from app.api.health import health_bp
     from app.api.v1.auth import auth_bp
@@ -1 +1,2 @@
 # Health module
+from .routes import health_bp
@@ -1,9 +1,11 @@
 """
 Rotas de health check
 """
-from flask import Blueprint, jsonify
+from flask import Blueprint, current_app, jsonify, request
+from flask_jwt_extended import jwt_required
 from datetime import datetime
 import os
+from app.core.security import require_roles
 
 health_bp = Blueprint('health', __name__)
 
@@ -52,3 +54,28 @@ def liveness_check():
         'timestamp': datetime.utcnow().isoformat(),
         'uptime': 'running'
     })
+
+@health_bp.route('/health/metrics', methods=['GET'])
+@jwt_required()
+@require_roles('admin')
+def metrics_check():
+    """Métricas internas do worker (pool de hashing, caches, etc.) - apenas administradores"""
+    from app.core.metrics import metrics
+    
+    return jsonify({
+        'status': 'ok',
+        'timestamp': datetime.utcnow().isoformat(),
+        'pid': os.getpid(),
+        'metrics': metrics.snapshot()
+    })
+
+@health_bp.route('/.well-known/jwks.json', methods=['GET'])
+def jwks():
+    """Chaves públicas para verificação local dos tokens (JWKS)"""
+    from app.core.keyring import keyring
+    
+    response = jsonify(keyring.jwks() if keyring.enabled else {'keys': []})
+    response.cache_control.public = True
+    response.cache_control.max_age = current_app.config.get('JWT_JWKS_MAX_AGE', 300)
+    response.add_etag()
+    return response.make_conditional(request)
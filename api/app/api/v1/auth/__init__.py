@@ -1 +1,2 @@
 # Auth module
+from .routes import auth_bp
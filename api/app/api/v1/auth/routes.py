@@ -10,7 +10,7 @@ from app.api.v1.auth.schemas import (
 )
 from app.api.v1.auth.service import AuthService
 from app.domain.dtos import LoginRequestDTO, RegisterRequestDTO, ChangePasswordRequestDTO
-from app.core.exceptions import ValidationError, AuthenticationError, ConflictError, NotFoundError
+from app.core.exceptions import ValidationError, AuthenticationError, ConflictError, NotFoundError, ServiceUnavailableError
 from app.core.utils import get_client_ip
 from app.core.logging import get_logger
 
@@ -72,6 +72,13 @@ def login():
             'message': e.message
         }), 401
         
+    except ServiceUnavailableError as e:
+        return jsonify({
+            'success': False,
+            'error': 'ServiceUnavailableError',
+            'message': e.message
+        }), 503, {'Retry-After': str(e.retry_after)}
+        
     except Exception as e:
         logger.error(f"Erro no endpoint de login: {str(e)}")
         return jsonify({
@@ -123,6 +130,13 @@ def register():
             'message': e.message
         }), 409
         
+    except ServiceUnavailableError as e:
+        return jsonify({
+            'success': False,
+            'error': 'ServiceUnavailableError',
+            'message': e.message
+        }), 503, {'Retry-After': str(e.retry_after)}
+        
     except Exception as e:
         logger.error(f"Erro no endpoint de registro: {str(e)}")
         return jsonify({
@@ -136,7 +150,7 @@ def register():
 def get_current_user():
     """Obtém dados do usuário atual"""
     try:
-        user_id = get_jwt_identity()
+        user_id = int(get_jwt_identity())
         result = auth_service.get_current_user(user_id)
         
         return jsonify({
@@ -175,14 +189,15 @@ def change_password():
         )
         
         # Obter ID do usuário
-        user_id = get_jwt_identity()
+        user_id = int(get_jwt_identity())
         
         # Alterar senha
-        auth_service.change_password(user_id, change_password_dto)
+        tokens = auth_service.change_password(user_id, change_password_dto)
         
         return jsonify({
             'success': True,
-            'message': 'Senha alterada com sucesso'
+            'message': 'Senha alterada com sucesso',
+            'data': {'tokens': tokens}
         }), 200
         
     except ValidationError as e:
@@ -200,6 +215,13 @@ def change_password():
             'message': e.message
         }), 404
         
+    except ServiceUnavailableError as e:
+        return jsonify({
+            'success': False,
+            'error': 'ServiceUnavailableError',
+            'message': e.message
+        }), 503, {'Retry-After': str(e.retry_after)}
+        
     except Exception as e:
         logger.error(f"Erro no endpoint de mudança de senha: {str(e)}")
         return jsonify({
@@ -251,7 +273,7 @@ def logout():
     """Logout do usuário"""
     try:
         # Obter informações do token
-        user_id = get_jwt_identity()
+        user_id = int(get_jwt_identity())
         jti = get_jwt()['jti']
         
         # Realizar logout
@@ -269,3 +291,27 @@ def logout():
             'error': 'InternalServerError',
             'message': 'Erro interno do servidor'
         }), 500
+
+@auth_bp.route('/logout-all', methods=['POST'])
+@jwt_required()
+def logout_all():
+    """Logout de todas as sessões do usuário"""
+    try:
+        user_id = int(get_jwt_identity())
+        
+        # Revogar todos os tokens emitidos para o usuário
+        if not auth_service.logout_all(user_id):
+            raise RuntimeError("falha ao incrementar epoch de tokens")
+        
+        return jsonify({
+            'success': True,
+            'message': 'Todas as sessões foram encerradas'
+        }), 200
+        
+    except Exception as e:
+        logger.error(f"Erro no endpoint de logout de todas as sessões: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': 'InternalServerError',
+            'message': 'Erro interno do servidor'
+        }), 500
@@ -1,20 +1,41 @@
 """
 Serviços de autenticação
 """
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from typing import Optional, Dict, Any
 from flask import current_app
 from flask_jwt_extended import create_access_token, create_refresh_token, get_jwt_identity, get_jwt
-from app.domain.models import User, BlacklistedToken
+from app.domain.models import User
 from app.domain.dtos import LoginRequestDTO, RegisterRequestDTO, ChangePasswordRequestDTO, TokenResponseDTO, UserDTO
 from app.infra.repositories.user_repo import UserRepository
-from app.core.security import hash_password, verify_password, create_tokens
-from app.core.exceptions import ValidationError, AuthenticationError, ConflictError, NotFoundError
+from app.core.security import hash_password, verify_password, password_needs_rehash, create_tokens, build_token_claims, is_token_revoked
+from app.core.exceptions import ValidationError, AuthenticationError, ConflictError, NotFoundError, ServiceUnavailableError
 from app.core.utils import get_client_ip, mask_email
 from app.core.logging import get_logger
+from app.core.metrics import metrics
+from app.infra.token_store import revocation_store, epoch_store
+from app.infra.login_buffer import login_buffer
+from app.infra.unit_of_work import unit_of_work
 from datetime import datetime
 
 logger = get_logger(__name__)
 
+# Executor para rehash de senhas em segundo plano
+rehash_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='password-rehash')
+
+def _rehash_password(app, user_id: int, password: str, old_hash: str):
+    """Recalcula o hash da senha com a política atual"""
+    with app.app_context():
+        try:
+            new_hash = hash_password(password)
+            if UserRepository().update_password_hash_if_unchanged(user_id, old_hash, new_hash):
+                metrics.inc('hashing.rehash_completed')
+                logger.info(f"Hash de senha atualizado para usuário: {user_id}")
+        except Exception as e:
+            metrics.inc('hashing.rehash_failed')
+            logger.warning(f"Erro ao atualizar hash de senha do usuário {user_id}: {str(e)}")
+
 class AuthService:
     """Serviço de autenticação"""
     
@@ -40,14 +61,21 @@ class AuthService:
                 logger.warning(f"Tentativa de login de usuário sem acesso: {mask_email(login_dto.email)}")
                 raise AuthenticationError("Acesso negado")
             
-            # Atualizar informações de login
-            self.user_repo.update_last_login(user.id, ip_address)
+            # Atualizar hash em segundo plano se a política mudou (só em login aceito)
+            if current_app.config.get('PASSWORD_REHASH_ON_LOGIN', True) and password_needs_rehash(user.password_hash):
+                self._schedule_rehash(user.id, login_dto.password, user.password_hash)
+            
+            # Atualizar informações de login (gravadas em lote pelo buffer)
+            login_at = datetime.utcnow()
+            login_buffer.record(user.id, ip_address, login_at)
             
             # Criar tokens
             tokens = create_tokens(user)
             
-            # Criar DTO do usuário
+            # Criar DTO do usuário já com este login
             user_dto = UserDTO.from_model(user, include_sensitive=True)
+            user_dto.last_login = login_at
+            user_dto.login_count = (user.login_count or 0) + 1
             
             logger.info(f"Login realizado com sucesso: {mask_email(user.email)}")
             
@@ -57,18 +85,21 @@ class AuthService:
             }
             
         except Exception as e:
-            if isinstance(e, (AuthenticationError, ValidationError)):
+            if isinstance(e, (AuthenticationError, ValidationError, ServiceUnavailableError)):
                 raise
             logger.error(f"Erro no login: {str(e)}")
             raise AuthenticationError("Erro interno no login")
     
+    def _schedule_rehash(self, user_id: int, password: str, old_hash: str):
+        """Agenda rehash da senha sem bloquear o login"""
+        metrics.inc('hashing.rehash_scheduled')
+        rehash_executor.submit(
+            _rehash_password, current_app._get_current_object(), user_id, password, old_hash
+        )
+    
     def register(self, register_dto: RegisterRequestDTO, ip_address: Optional[str] = None) -> Dict[str, Any]:
         """Registra novo usuário"""
         try:
-            # Verificar se email já existe
-            if self.user_repo.find_by_email(register_dto.email):
-                raise ConflictError("Email já está em uso")
-            
             # Validar força da senha
             from app.core.utils import validate_password_strength
             password_validation = validate_password_strength(register_dto.password)
@@ -76,7 +107,7 @@ class AuthService:
                 raise ValidationError("Senha não atende aos critérios de segurança", 
                                     details={'password_errors': password_validation['errors']})
             
-            # Criar usuário
+            # Criar usuário (email duplicado é detectado pelo índice único, sem SELECT prévio)
             user_data = {
                 'email': register_dto.email,
                 'password_hash': hash_password(register_dto.password),
@@ -110,15 +141,15 @@ class AuthService:
             }
             
         except Exception as e:
-            if isinstance(e, (ConflictError, ValidationError)):
+            if isinstance(e, (ConflictError, ValidationError, ServiceUnavailableError)):
                 raise
             logger.error(f"Erro no registro: {str(e)}")
             raise ValidationError("Erro interno no registro")
     
-    def change_password(self, user_id: int, change_password_dto: ChangePasswordRequestDTO) -> bool:
-        """Altera senha do usuário"""
+    def change_password(self, user_id: int, change_password_dto: ChangePasswordRequestDTO) -> Dict[str, Any]:
+        """Altera senha do usuário e revoga as demais sessões"""
         try:
-            # Buscar usuário
+            # Buscar usuário (do banco: o cache de identidade não guarda o hash da senha)
             user = self.user_repo.get_by_id(user_id)
             if not user:
                 raise NotFoundError("Usuário não encontrado")
@@ -134,16 +165,21 @@ class AuthService:
                 raise ValidationError("Nova senha não atende aos critérios de segurança", 
                                     details={'password_errors': password_validation['errors']})
             
-            # Atualizar senha
-            user.password_hash = hash_password(change_password_dto.new_password)
-            self.user_repo.update(user.id, password_hash=user.password_hash)
+            # Atualizar senha e revogar todos os tokens emitidos antes da troca no mesmo comando
+            user = self.user_repo.update_user(
+                user.id, revoke_tokens=True, password_hash=hash_password(change_password_dto.new_password)
+            )
+            unit_of_work.on_commit(partial(epoch_store.publish_bumps, [(user.id, user.token_epoch)]))
+            
+            # Emitir novos tokens (com o epoch novo, ainda não propagado)
+            tokens = create_tokens(user)
             
             logger.info(f"Senha alterada com sucesso para usuário: {mask_email(user.email)}")
             
-            return True
+            return tokens
             
         except Exception as e:
-            if isinstance(e, (NotFoundError, ValidationError)):
+            if isinstance(e, (NotFoundError, ValidationError, ServiceUnavailableError)):
                 raise
             logger.error(f"Erro na mudança de senha: {str(e)}")
             raise ValidationError("Erro interno na mudança de senha")
@@ -160,22 +196,19 @@ class AuthService:
             if not user_id:
                 raise AuthenticationError("Token inválido")
             
+            # decode_token não consulta a blacklist
+            if is_token_revoked(decoded_token):
+                raise AuthenticationError("Token foi revogado")
+            
             # Buscar usuário
-            user = self.user_repo.get_by_id(user_id)
+            user = self.user_repo.get_cached(user_id)
             if not user or not user.is_active:
                 raise AuthenticationError("Usuário não encontrado ou inativo")
             
             # Criar novo access token
-            user_data = {
-                'user_id': user.id,
-                'email': user.email,
-                'role': user.role,
-                'is_active': user.is_active
-            }
-            
             access_token = create_access_token(
-                identity=user.id,
-                additional_claims=user_data,
+                identity=str(user.id),
+                additional_claims=build_token_claims(user),
                 expires_delta=current_app.config['JWT_ACCESS_TOKEN_EXPIRES']
             )
             
@@ -205,8 +238,8 @@ class AuthService:
             exp = current_jwt.get('exp', 0)
             expires_at = datetime.utcfromtimestamp(exp)
             
-            # Adicionar à blacklist
-            BlacklistedToken.add_to_blacklist(
+            # Revogar no Redis/filtro de Bloom (e no log durável, se habilitado)
+            revocation_store.revoke(
                 jti=jti,
                 token_type=token_type,
                 user_id=user_id,
@@ -221,10 +254,23 @@ class AuthService:
             logger.error(f"Erro no logout: {str(e)}")
             return False
     
+    def logout_all(self, user_id: int) -> bool:
+        """Encerra todas as sessões do usuário"""
+        try:
+            epoch_store.bump(user_id)
+            
+            logger.info(f"Logout de todas as sessões realizado para usuário: {user_id}")
+            
+            return True
+            
+        except Exception as e:
+            logger.error(f"Erro no logout de todas as sessões: {str(e)}")
+            return False
+    
     def get_current_user(self, user_id: int) -> Dict[str, Any]:
         """Obtém dados do usuário atual"""
         try:
-            user = self.user_repo.get_by_id(user_id)
+            user = self.user_repo.get_cached(user_id)
             if not user:
                 raise NotFoundError("Usuário não encontrado")
             
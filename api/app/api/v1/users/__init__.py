@@ -1 +1,2 @@
 # Users module
+from .routes import users_bp
@@ -1,20 +1,24 @@
 """
 Rotas de usuários
 """
-from flask import Blueprint, request, jsonify
+import json
+import os
+from marshmallow import ValidationError as SchemaValidationError
+from flask import Blueprint, Response, request, jsonify, send_from_directory, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.api.v1.users.schemas import (
     CreateUserSchema, UpdateUserSchema, UserQuerySchema,
     UserResponseSchema, UserListResponseSchema, UserStatsSchema,
     ActivateUserSchema, DeactivateUserSchema, ResetPasswordSchema,
-    ErrorSchema, SuccessSchema
+    BulkUserActionSchema, UserExportQuerySchema, UserImportSchema, ErrorSchema, SuccessSchema
 )
 from app.api.v1.users.service import UserService
 from app.domain.dtos import (
     UserQueryDTO, CreateUserRequestDTO, UpdateUserRequestDTO,
     UserRole, UserStatus
 )
-from app.core.exceptions import ValidationError, ConflictError, NotFoundError, AuthorizationError
+from app.core.exceptions import ValidationError, ConflictError, NotFoundError, AuthorizationError, ServiceUnavailableError
+from app.core.export import EXPORT_FORMATS
 from app.core.security import require_admin, require_dev_or_admin
 from app.core.logging import get_logger
 
@@ -33,6 +37,9 @@ user_stats_schema = UserStatsSchema()
 activate_user_schema = ActivateUserSchema()
 deactivate_user_schema = DeactivateUserSchema()
 reset_password_schema = ResetPasswordSchema()
+bulk_user_action_schema = BulkUserActionSchema()
+user_export_query_schema = UserExportQuerySchema()
+user_import_schema = UserImportSchema()
 error_schema = ErrorSchema()
 success_schema = SuccessSchema()
 
@@ -56,16 +63,18 @@ def get_users():
             role=UserRole(query_data['role']) if query_data.get('role') else None,
             status=UserStatus(query_data['status']) if query_data.get('status') else None,
             sort_by=query_data['sort_by'],
-            sort_order=query_data['sort_order']
+            sort_order=query_data['sort_order'],
+            cursor=query_data.get('cursor'),
+            count_mode=query_data['count_mode']
         )
         
-        # Buscar usuários
-        result = user_service.get_users(query_dto)
+        # Buscar usuários (linhas serializadas direto em JSON, sem hidratar o ORM)
+        users_json, pagination = user_service.get_users_json(query_dto)
         
-        return jsonify({
-            'success': True,
-            'data': result.to_dict()
-        }), 200
+        body = b'{"success":true,"data":{"users":%s,"pagination":%s}}' % (
+            users_json, json.dumps(pagination.to_dict()).encode('ascii')
+        )
+        return Response(body, status=200, mimetype='application/json')
         
     except ValidationError as e:
         return jsonify({
@@ -139,6 +148,13 @@ def create_user():
             'message': e.message
         }), 403
         
+    except ServiceUnavailableError as e:
+        return jsonify({
+            'success': False,
+            'error': 'ServiceUnavailableError',
+            'message': e.message
+        }), 503, {'Retry-After': str(e.retry_after)}
+        
     except Exception as e:
         logger.error(f"Erro no endpoint de criar usuário: {str(e)}")
         return jsonify({
@@ -399,6 +415,416 @@ def get_user_stats():
             'message': 'Erro interno do servidor'
         }), 500
 
+@users_bp.route('/bulk', methods=['POST'])
+@jwt_required()
+@require_admin()
+def bulk_user_action():
+    """Ativa, desativa, suspende ou troca a role de vários usuários (apenas para admins)"""
+    try:
+        data = bulk_user_action_schema.load(request.json or {})
+        
+        # O próprio admin fica fora do lote (não se desativa nem perde a role por engano)
+        result = user_service.bulk_user_action(
+            data['action'],
+            role=data.get('role'),
+            ids=data.get('ids'),
+            filters=data.get('filters'),
+            actor_id=int(get_jwt_identity())
+        )
+        
+        if result['status'] == 'queued':
+            return jsonify({
+                'success': True,
+                'message': 'Ação em lote enfileirada',
+                'data': result
+            }), 202
+        
+        return jsonify({
+            'success': True,
+            'message': 'Ação em lote concluída',
+            'data': result
+        }), 200
+        
+    except SchemaValidationError as e:
+        return jsonify({
+            'success': False,
+            'error': 'ValidationError',
+            'message': 'Dados inválidos',
+            'details': e.messages
+        }), 400
+        
+    except ValidationError as e:
+        return jsonify({
+            'success': False,
+            'error': 'ValidationError',
+            'message': e.message,
+            'details': e.payload
+        }), 400
+        
+    except AuthorizationError as e:
+        return jsonify({
+            'success': False,
+            'error': 'AuthorizationError',
+            'message': e.message
+        }), 403
+        
+    except ServiceUnavailableError as e:
+        return jsonify({
+            'success': False,
+            'error': 'ServiceUnavailableError',
+            'message': e.message
+        }), 503, {'Retry-After': str(e.retry_after)}
+        
+    except Exception as e:
+        logger.error(f"Erro no endpoint de ação em lote: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': 'InternalServerError',
+            'message': 'Erro interno do servidor'
+        }), 500
+
+@users_bp.route('/bulk/<task_id>', methods=['GET'])
+@jwt_required()
+@require_admin()
+def get_bulk_user_action(task_id):
+    """Consulta o progresso de uma ação em lote enfileirada (apenas para admins)"""
+    try:
+        result = user_service.get_bulk_task_status(task_id)
+        
+        return jsonify({
+            'success': True,
+            'data': result
+        }), 200
+        
+    except AuthorizationError as e:
+        return jsonify({
+            'success': False,
+            'error': 'AuthorizationError',
+            'message': e.message
+        }), 403
+        
+    except Exception as e:
+        logger.error(f"Erro no endpoint de progresso da ação em lote: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': 'InternalServerError',
+            'message': 'Erro interno do servidor'
+        }), 500
+
+@users_bp.route('/export', methods=['GET'])
+@jwt_required()
+@require_admin()
+def export_users():
+    """Exporta usuários em CSV, NDJSON ou Parquet (apenas para admins)
+    
+    A resposta é enviada em blocos enquanto o cursor no servidor percorre a tabela; acima de
+    `USER_EXPORT_ASYNC_THRESHOLD` linhas (ou com `background=true`) a exportação vira uma
+    tarefa Celery, acompanhada em `/export/<task_id>`.
+    """
+    try:
+        query_data = user_export_query_schema.load(request.args)
+        
+        query_dto = UserQueryDTO(
+            search=query_data.get('search'),
+            role=UserRole(query_data['role']) if query_data.get('role') else None,
+            status=UserStatus(query_data['status']) if query_data.get('status') else None,
+            sort_by=query_data['sort_by'],
+            sort_order=query_data['sort_order']
+        )
+        
+        fmt = query_data['format']
+        result = user_service.export_users(
+            query_dto, fmt, force_async=query_data['background'], owner_id=int(get_jwt_identity())
+        )
+        
+        if result['status'] == 'queued':
+            return jsonify({
+                'success': True,
+                'message': 'Exportação enfileirada',
+                'data': result
+            }), 202
+        
+        mimetype, extension = EXPORT_FORMATS[fmt]
+        return Response(stream_with_context(result['chunks']), mimetype=mimetype, headers={
+            'Content-Disposition': f'attachment; filename=users.{extension}',
+            'X-Accel-Buffering': 'no'
+        })
+        
+    except SchemaValidationError as e:
+        return jsonify({
+            'success': False,
+            'error': 'ValidationError',
+            'message': 'Parâmetros inválidos',
+            'details': e.messages
+        }), 400
+        
+    except ValidationError as e:
+        return jsonify({
+            'success': False,
+            'error': 'ValidationError',
+            'message': e.message,
+            'details': e.payload
+        }), 400
+        
+    except AuthorizationError as e:
+        return jsonify({
+            'success': False,
+            'error': 'AuthorizationError',
+            'message': e.message
+        }), 403
+        
+    except ServiceUnavailableError as e:
+        return jsonify({
+            'success': False,
+            'error': 'ServiceUnavailableError',
+            'message': e.message
+        }), 503, {'Retry-After': str(e.retry_after)}
+        
+    except Exception as e:
+        logger.error(f"Erro no endpoint de exportação de usuários: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': 'InternalServerError',
+            'message': 'Erro interno do servidor'
+        }), 500
+
+@users_bp.route('/export/<task_id>', methods=['GET'])
+@jwt_required()
+@require_admin()
+def get_user_export(task_id):
+    """Consulta o progresso de uma exportação enfileirada pelo próprio admin"""
+    try:
+        result = user_service.get_export_task_status(task_id, int(get_jwt_identity()))
+        
+        return jsonify({
+            'success': True,
+            'data': result
+        }), 200
+        
+    except NotFoundError as e:
+        return jsonify({
+            'success': False,
+            'error': 'NotFoundError',
+            'message': e.message
+        }), 404
+    
+    except AuthorizationError as e:
+        return jsonify({
+            'success': False,
+            'error': 'AuthorizationError',
+            'message': e.message
+        }), 403
+        
+    except Exception as e:
+        logger.error(f"Erro no endpoint de progresso da exportação: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': 'InternalServerError',
+            'message': 'Erro interno do servidor'
+        }), 500
+
+@users_bp.route('/export/<task_id>/file', methods=['GET'])
+@jwt_required()
+@require_admin()
+def download_user_export(task_id):
+    """Baixa o arquivo de uma exportação concluída do próprio admin"""
+    try:
+        from app.infra.storage import storage
+        
+        path = user_service.get_export_file(task_id, int(get_jwt_identity()))
+        return send_from_directory(os.path.abspath(storage.upload_folder), path, as_attachment=True)
+        
+    except NotFoundError as e:
+        return jsonify({
+            'success': False,
+            'error': 'NotFoundError',
+            'message': e.message
+        }), 404
+        
+    except AuthorizationError as e:
+        return jsonify({
+            'success': False,
+            'error': 'AuthorizationError',
+            'message': e.message
+        }), 403
+        
+    except Exception as e:
+        logger.error(f"Erro no download da exportação: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': 'InternalServerError',
+            'message': 'Erro interno do servidor'
+        }), 500
+
+@users_bp.route('/import', methods=['POST'])
+@jwt_required()
+@require_admin()
+def import_users():
+    """Importa usuários de um arquivo CSV ou NDJSON (apenas para admins)
+    
+    O arquivo (campo `file` do multipart) é gravado no storage e processado por uma tarefa
+    Celery, acompanhada em `/import/<task_id>`; as linhas rejeitadas saem num relatório CSV.
+    """
+    try:
+        form_data = user_import_schema.load(request.form)
+        
+        upload = request.files.get('file')
+        if upload is None or not upload.filename:
+            raise ValidationError("Arquivo é obrigatório (campo file)")
+        
+        result = user_service.enqueue_user_import(
+            upload.stream, upload.filename, form_data.get('format'), owner_id=int(get_jwt_identity())
+        )
+        
+        return jsonify({
+            'success': True,
+            'message': 'Importação enfileirada',
+            'data': result
+        }), 202
+    
+    except SchemaValidationError as e:
+        return jsonify({
+            'success': False,
+            'error': 'ValidationError',
+            'message': 'Dados inválidos',
+            'details': e.messages
+        }), 400
+    
+    except ValidationError as e:
+        return jsonify({
+            'success': False,
+            'error': 'ValidationError',
+            'message': e.message,
+            'details': e.payload
+        }), 400
+    
+    except AuthorizationError as e:
+        return jsonify({
+            'success': False,
+            'error': 'AuthorizationError',
+            'message': e.message
+        }), 403
+    
+    except ServiceUnavailableError as e:
+        return jsonify({
+            'success': False,
+            'error': 'ServiceUnavailableError',
+            'message': e.message
+        }), 503, {'Retry-After': str(e.retry_after)}
+    
+    except Exception as e:
+        logger.error(f"Erro no endpoint de importação de usuários: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': 'InternalServerError',
+            'message': 'Erro interno do servidor'
+        }), 500
+
+@users_bp.route('/import/<task_id>', methods=['GET'])
+@jwt_required()
+@require_admin()
+def get_user_import(task_id):
+    """Consulta o progresso de uma importação enfileirada pelo próprio admin"""
+    try:
+        result = user_service.get_import_task_status(task_id, int(get_jwt_identity()))
+        
+        return jsonify({
+            'success': True,
+            'data': result
+        }), 200
+    
+    except NotFoundError as e:
+        return jsonify({
+            'success': False,
+            'error': 'NotFoundError',
+            'message': e.message
+        }), 404
+    
+    except AuthorizationError as e:
+        return jsonify({
+            'success': False,
+            'error': 'AuthorizationError',
+            'message': e.message
+        }), 403
+    
+    except Exception as e:
+        logger.error(f"Erro no endpoint de progresso da importação: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': 'InternalServerError',
+            'message': 'Erro interno do servidor'
+        }), 500
+
+@users_bp.route('/import/<task_id>/report', methods=['GET'])
+@jwt_required()
+@require_admin()
+def download_user_import_report(task_id):
+    """Baixa o relatório de erros por linha de uma importação concluída do próprio admin"""
+    try:
+        from app.infra.storage import storage
+        
+        path = user_service.get_import_report(task_id, int(get_jwt_identity()))
+        return send_from_directory(os.path.abspath(storage.upload_folder), path, as_attachment=True)
+    
+    except NotFoundError as e:
+        return jsonify({
+            'success': False,
+            'error': 'NotFoundError',
+            'message': e.message
+        }), 404
+    
+    except AuthorizationError as e:
+        return jsonify({
+            'success': False,
+            'error': 'AuthorizationError',
+            'message': e.message
+        }), 403
+    
+    except Exception as e:
+        logger.error(f"Erro no download do relatório da importação: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': 'InternalServerError',
+            'message': 'Erro interno do servidor'
+        }), 500
+
+@users_bp.route('/autocomplete', methods=['GET'])
+@jwt_required()
+@require_dev_or_admin()
+def autocomplete_users():
+    """Sugestões de usuários por prefixo de nome ou email"""
+    try:
+        prefix = request.args.get('q', '')
+        limit = min(max(request.args.get('limit', 10, type=int), 1), 50)
+        
+        if not prefix.strip():
+            return jsonify({
+                'success': True,
+                'data': []
+            }), 200
+        
+        result = user_service.autocomplete_users(prefix, limit)
+        
+        return jsonify({
+            'success': True,
+            'data': result
+        }), 200
+        
+    except ValidationError as e:
+        return jsonify({
+            'success': False,
+            'error': 'ValidationError',
+            'message': e.message
+        }), 400
+        
+    except Exception as e:
+        logger.error(f"Erro no endpoint de autocomplete: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': 'InternalServerError',
+            'message': 'Erro interno do servidor'
+        }), 500
+
 @users_bp.route('/search', methods=['GET'])
 @jwt_required()
 @require_dev_or_admin()
@@ -406,7 +832,7 @@ def search_users():
     """Busca usuários por termo"""
     try:
         search_term = request.args.get('q', '')
-        limit = int(request.args.get('limit', 10))
+        limit = min(max(request.args.get('limit', 10, type=int), 1), 100)
         
         if not search_term:
             return jsonify({
@@ -62,6 +62,78 @@ class UserQuerySchema(Schema):
                            error_messages={
         'validator_failed': 'Ordem deve ser asc ou desc'
     })
+    cursor = fields.Str(allow_none=True)
+    count_mode = fields.Str(missing='exact',
+                           validate=validate.OneOf(['exact', 'estimated', 'none']),
+                           error_messages={
+        'validator_failed': 'count_mode deve ser exact, estimated ou none'
+    })
+
+class UserExportQuerySchema(Schema):
+    """Schema para exportação de usuários (filtros e ordenação da listagem)"""
+    format = fields.Str(missing='csv', validate=validate.OneOf(['csv', 'ndjson', 'parquet']), error_messages={
+        'validator_failed': 'Formato deve ser csv, ndjson ou parquet'
+    })
+    search = fields.Str(allow_none=True)
+    role = fields.Str(validate=validate.OneOf(['admin', 'developer', 'user']), 
+                     allow_none=True, error_messages={
+        'validator_failed': 'Role deve ser admin, developer ou user'
+    })
+    status = fields.Str(validate=validate.OneOf(['active', 'inactive', 'pending', 'suspended']), 
+                       allow_none=True, error_messages={
+        'validator_failed': 'Status deve ser active, inactive, pending ou suspended'
+    })
+    sort_by = fields.Str(missing='id', 
+                        validate=validate.OneOf(['id', 'name', 'email', 'created_at', 'updated_at']),
+                        error_messages={
+        'validator_failed': 'Campo de ordenação inválido'
+    })
+    sort_order = fields.Str(missing='asc', 
+                           validate=validate.OneOf(['asc', 'desc']),
+                           error_messages={
+        'validator_failed': 'Ordem deve ser asc ou desc'
+    })
+    background = fields.Bool(missing=False)  # força a exportação em tarefa Celery
+
+class UserImportSchema(Schema):
+    """Schema para importação de usuários (formato; padrão pela extensão do arquivo)"""
+    format = fields.Str(validate=validate.OneOf(['csv', 'ndjson']), error_messages={
+        'validator_failed': 'Formato deve ser csv ou ndjson'
+    })
+
+class BulkUserFilterSchema(Schema):
+    """Schema para filtros de ação em lote (mesmos da listagem)"""
+    search = fields.Str()
+    role = fields.Str(validate=validate.OneOf(['admin', 'developer', 'user']), error_messages={
+        'validator_failed': 'Role deve ser admin, developer ou user'
+    })
+    status = fields.Str(validate=validate.OneOf(['active', 'inactive', 'pending', 'suspended']), error_messages={
+        'validator_failed': 'Status deve ser active, inactive, pending ou suspended'
+    })
+
+class BulkUserActionSchema(Schema):
+    """Schema para ação em lote sobre usuários (lista de ids ou filtros)"""
+    action = fields.Str(required=True,
+                        validate=validate.OneOf(['activate', 'deactivate', 'suspend', 'change_role']),
+                        error_messages={
+        'required': 'Ação é obrigatória',
+        'validator_failed': 'Ação deve ser activate, deactivate, suspend ou change_role'
+    })
+    role = fields.Str(validate=validate.OneOf(['admin', 'developer', 'user']), error_messages={
+        'validator_failed': 'Role deve ser admin, developer ou user'
+    })
+    ids = fields.List(fields.Int(validate=validate.Range(min=1)), validate=validate.Length(min=1))
+    filters = fields.Nested(BulkUserFilterSchema)
+    
+    @validates_schema
+    def validate_target(self, data, **kwargs):
+        """Exige exatamente um alvo (ids ou filtros não vazios) e a role em change_role"""
+        if ('ids' in data) == ('filters' in data):
+            raise ValidationError('Informe ids ou filters (apenas um)')
+        if 'filters' in data and not any(data['filters'].values()):
+            raise ValidationError('Informe ao menos um filtro', 'filters')
+        if data['action'] == 'change_role' and not data.get('role'):
+            raise ValidationError('Role é obrigatória para change_role', 'role')
 
 class UserResponseSchema(Schema):
     """Schema para resposta de usuário"""
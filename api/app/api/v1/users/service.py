@@ -1,21 +1,40 @@
 """
 Serviços de usuários
 """
-from typing import List, Dict, Any, Tuple
+import os
+from functools import partial
+from typing import BinaryIO, Callable, List, Dict, Any, Optional, Sequence, Tuple, Union
+from flask import current_app
+from marshmallow import EXCLUDE, ValidationError as SchemaValidationError
+from app.api.v1.users.schemas import CreateUserSchema
 from app.domain.dtos import (
     UserQueryDTO, UserStatsDTO, UserDTO, UserListResponseDTO, 
-    PaginationDTO, CreateUserRequestDTO, UpdateUserRequestDTO,
-    UserRole, UserStatus
+    PaginationDTO, CursorPaginationDTO, CreateUserRequestDTO, UpdateUserRequestDTO,
+    UserRole, UserStatus, user_row_serializer
 )
+from app.core.export import EXPORT_FORMATS, RowExporter, parquet_available
+from app.core.imports import IMPORT_FORMATS, ImportResult, detect_format, read_rows
 from app.infra.repositories.user_repo import UserRepository
-from app.core.security import hash_password, verify_password
-from app.core.exceptions import ValidationError, ConflictError, NotFoundError, AuthorizationError
+from app.core.security import hash_password, hash_passwords, verify_password
+from app.core.exceptions import ValidationError, ConflictError, NotFoundError, AuthorizationError, ServiceUnavailableError
 from app.core.utils import validate_password_strength, mask_email
 from app.core.logging import get_logger
+from app.infra.token_store import epoch_store
+from app.infra.autocomplete import autocomplete_index
+from app.infra.unit_of_work import unit_of_work
+from app.core.metrics import metrics
 from datetime import datetime
 
 logger = get_logger(__name__)
 
+# Ações em lote: alterações aplicadas e se os tokens dos usuários alcançados são revogados
+BULK_USER_ACTIONS = {
+    'activate': ({'status': 'active', 'is_active': True}, False),
+    'deactivate': ({'status': 'inactive', 'is_active': False}, True),
+    'suspend': ({'status': 'suspended', 'is_active': False}, True),
+    'change_role': ({}, True),
+}
+
 class UserService:
     """Serviço de usuários"""
     
@@ -24,28 +43,50 @@ class UserService:
     
     def get_users(self, query_dto: UserQueryDTO) -> UserListResponseDTO:
         """Lista usuários com paginação e filtros"""
+        users, pagination = self._list_users(query_dto)
+        user_dtos = [UserDTO.from_model(user, include_sensitive=True) for user in users]
+        return UserListResponseDTO(users=user_dtos, pagination=pagination)
+    
+    def get_users_json(self, query_dto: UserQueryDTO) -> Tuple[bytes, Union[PaginationDTO, CursorPaginationDTO]]:
+        """Lista usuários já serializados em JSON (só as colunas da resposta, sem ORM nem DTOs)"""
+        rows, pagination = self._list_users(query_dto, columns=user_row_serializer.fields)
+        return user_row_serializer.serialize_many(rows), pagination
+    
+    def _list_users(self, query_dto: UserQueryDTO, columns: Optional[Sequence[str]] = None):
+        """Busca a página de usuários (modelos, ou Rows das colunas informadas) e sua paginação"""
         try:
+            if query_dto.cursor is not None:
+                # Paginação por cursor (sem OFFSET nem contagem)
+                page = self.user_repo.get_users_with_cursor(query_dto, columns)
+                pagination = CursorPaginationDTO(
+                    per_page=page.per_page,
+                    has_prev=page.has_prev,
+                    has_next=page.has_next,
+                    prev_cursor=page.prev_cursor,
+                    next_cursor=page.next_cursor
+                )
+                return page.items, pagination
+        
             # Buscar usuários
-            users, total = self.user_repo.get_users_with_pagination(query_dto)
+            users, total, total_is_exact, has_next = self.user_repo.get_users_with_pagination(query_dto, columns)
             
-            # Converter para DTOs
-            user_dtos = [UserDTO.from_model(user, include_sensitive=True) for user in users]
-            
-            # Criar paginação
-            pages = (total + query_dto.per_page - 1) // query_dto.per_page
+            # Criar paginação (has_next vem da própria página, válido mesmo sem total exato)
+            pages = (total + query_dto.per_page - 1) // query_dto.per_page if total is not None else None
             pagination = PaginationDTO(
                 page=query_dto.page,
                 per_page=query_dto.per_page,
                 total=total,
                 pages=pages,
                 has_prev=query_dto.page > 1,
-                has_next=query_dto.page < pages,
+                has_next=has_next,
                 prev_num=query_dto.page - 1 if query_dto.page > 1 else None,
-                next_num=query_dto.page + 1 if query_dto.page < pages else None
+                next_num=query_dto.page + 1 if has_next else None,
+                total_is_exact=total_is_exact
             )
+            return users, pagination
             
-            return UserListResponseDTO(users=user_dtos, pagination=pagination)
-            
+        except ValidationError:
+            raise
         except Exception as e:
             logger.error(f"Erro ao listar usuários: {str(e)}")
             raise ValidationError("Erro interno ao listar usuários")
@@ -53,7 +94,7 @@ class UserService:
     def get_user_by_id(self, user_id: int) -> UserDTO:
         """Obtém usuário por ID"""
         try:
-            user = self.user_repo.get_by_id(user_id)
+            user = self.user_repo.get_cached(user_id)
             if not user:
                 raise NotFoundError("Usuário não encontrado")
             
@@ -68,17 +109,13 @@ class UserService:
     def create_user(self, create_dto: CreateUserRequestDTO) -> UserDTO:
         """Cria novo usuário"""
         try:
-            # Verificar se email já existe
-            if self.user_repo.find_by_email(create_dto.email):
-                raise ConflictError("Email já está em uso")
-            
             # Validar força da senha
             password_validation = validate_password_strength(create_dto.password)
             if not password_validation['is_valid']:
                 raise ValidationError("Senha não atende aos critérios de segurança", 
                                     details={'password_errors': password_validation['errors']})
             
-            # Criar usuário
+            # Criar usuário (email duplicado é detectado pelo índice único, sem SELECT prévio)
             user_data = {
                 'email': create_dto.email,
                 'password_hash': hash_password(create_dto.password),
@@ -94,7 +131,7 @@ class UserService:
             
             return UserDTO.from_model(user, include_sensitive=True)
             
-        except (ConflictError, ValidationError):
+        except (ConflictError, ValidationError, ServiceUnavailableError):
             raise
         except Exception as e:
             logger.error(f"Erro ao criar usuário: {str(e)}")
@@ -103,15 +140,6 @@ class UserService:
     def update_user(self, user_id: int, update_dto: UpdateUserRequestDTO) -> UserDTO:
         """Atualiza usuário"""
         try:
-            user = self.user_repo.get_by_id(user_id)
-            if not user:
-                raise NotFoundError("Usuário não encontrado")
-            
-            # Verificar se email já existe (se estiver sendo alterado)
-            if update_dto.email and update_dto.email != user.email:
-                if self.user_repo.find_by_email(update_dto.email):
-                    raise ConflictError("Email já está em uso")
-            
             # Preparar dados para atualização
             update_data = {}
             if update_dto.email:
@@ -124,15 +152,25 @@ class UserService:
                 update_data['status'] = update_dto.status.value
                 update_data['is_active'] = update_dto.status == UserStatus.ACTIVE
             
-            # Atualizar usuário
-            self.user_repo.update(user_id, **update_data)
+            # Atualizar usuário num único UPDATE ... RETURNING (email duplicado vira ConflictError).
+            # Usuário deixou de estar ativo ou mudou de role: o mesmo comando incrementa o epoch,
+            # revogando as sessões (a role vai nos claims do token, como na ação em lote)
+            revoke_tokens = bool(update_dto.status and update_dto.status != UserStatus.ACTIVE)
+            user = self.user_repo.update_user(user_id, revoke_tokens=revoke_tokens, **update_data)
+            if not user:
+                raise NotFoundError("Usuário não encontrado")
             
-            # Buscar usuário atualizado
-            updated_user = self.user_repo.get_by_id(user_id)
+            # Com role informada o epoch retornado é propagado mesmo sem mudança (a propagação
+            # guarda o maior epoch, então repetir o atual não revoga nada)
+            if revoke_tokens or 'role' in update_data:
+                unit_of_work.on_commit(partial(epoch_store.publish_bumps, [(user.id, user.token_epoch)]))
+            if 'name' in update_data or 'email' in update_data:
+                changes = {user.id: (user.name, user.email)}
+                unit_of_work.on_commit(lambda: autocomplete_index.publish_changes(changes))
             
-            logger.info(f"Usuário atualizado: {mask_email(updated_user.email)}")
+            logger.info(f"Usuário atualizado: {mask_email(user.email)}")
             
-            return UserDTO.from_model(updated_user, include_sensitive=True)
+            return UserDTO.from_model(user, include_sensitive=True)
             
         except (NotFoundError, ConflictError, ValidationError):
             raise
@@ -143,19 +181,21 @@ class UserService:
     def delete_user(self, user_id: int) -> bool:
         """Remove usuário"""
         try:
-            user = self.user_repo.get_by_id(user_id)
-            if not user:
-                raise NotFoundError("Usuário não encontrado")
-            
             # Não permitir que o usuário se delete
             # (implementar verificação se necessário)
             
-            success = self.user_repo.delete(user_id)
+            deleted = self.user_repo.delete_user(user_id)
+            if not deleted:
+                raise NotFoundError("Usuário não encontrado")
+            
+            # Revogar sessões (o epoch permanece no Redis até os tokens expirarem)
+            email, token_epoch = deleted
+            unit_of_work.on_commit(partial(epoch_store.publish_bumps, [(user_id, token_epoch + 1)]))
+            unit_of_work.on_commit(lambda: autocomplete_index.publish_changes({user_id: (None, None)}))
             
-            if success:
-                logger.info(f"Usuário removido: {mask_email(user.email)}")
+            logger.info(f"Usuário removido: {mask_email(email)}")
             
-            return success
+            return True
             
         except NotFoundError:
             raise
@@ -163,19 +203,23 @@ class UserService:
             logger.error(f"Erro ao remover usuário {user_id}: {str(e)}")
             raise ValidationError("Erro interno ao remover usuário")
     
+    def _set_status(self, user_id: int, status: str, revoke_tokens: bool) -> str:
+        """Altera status num único UPDATE ... RETURNING e propaga o epoch -> email do usuário"""
+        changed = self.user_repo.set_status(user_id, status, revoke_tokens=revoke_tokens)
+        if not changed:
+            raise NotFoundError("Usuário não encontrado")
+        
+        email, token_epoch = changed
+        if revoke_tokens:
+            unit_of_work.on_commit(partial(epoch_store.publish_bumps, [(user_id, token_epoch)]))
+        return email
+    
     def activate_user(self, user_id: int) -> bool:
         """Ativa usuário"""
         try:
-            user = self.user_repo.get_by_id(user_id)
-            if not user:
-                raise NotFoundError("Usuário não encontrado")
-            
-            success = self.user_repo.activate_user(user_id)
-            
-            if success:
-                logger.info(f"Usuário ativado: {mask_email(user.email)}")
-            
-            return success
+            email = self._set_status(user_id, 'active', revoke_tokens=False)
+            logger.info(f"Usuário ativado: {mask_email(email)}")
+            return True
             
         except NotFoundError:
             raise
@@ -186,16 +230,9 @@ class UserService:
     def deactivate_user(self, user_id: int) -> bool:
         """Desativa usuário"""
         try:
-            user = self.user_repo.get_by_id(user_id)
-            if not user:
-                raise NotFoundError("Usuário não encontrado")
-            
-            success = self.user_repo.deactivate_user(user_id)
-            
-            if success:
-                logger.info(f"Usuário desativado: {mask_email(user.email)}")
-            
-            return success
+            email = self._set_status(user_id, 'inactive', revoke_tokens=True)
+            logger.info(f"Usuário desativado: {mask_email(email)}")
+            return True
             
         except NotFoundError:
             raise
@@ -206,16 +243,9 @@ class UserService:
     def suspend_user(self, user_id: int) -> bool:
         """Suspende usuário"""
         try:
-            user = self.user_repo.get_by_id(user_id)
-            if not user:
-                raise NotFoundError("Usuário não encontrado")
-            
-            success = self.user_repo.suspend_user(user_id)
-            
-            if success:
-                logger.info(f"Usuário suspenso: {mask_email(user.email)}")
-            
-            return success
+            email = self._set_status(user_id, 'suspended', revoke_tokens=True)
+            logger.info(f"Usuário suspenso: {mask_email(email)}")
+            return True
             
         except NotFoundError:
             raise
@@ -226,25 +256,24 @@ class UserService:
     def reset_user_password(self, user_id: int, new_password: str) -> bool:
         """Redefine senha do usuário"""
         try:
-            user = self.user_repo.get_by_id(user_id)
-            if not user:
-                raise NotFoundError("Usuário não encontrado")
-            
             # Validar nova senha
             password_validation = validate_password_strength(new_password)
             if not password_validation['is_valid']:
                 raise ValidationError("Senha não atende aos critérios de segurança", 
                                     details={'password_errors': password_validation['errors']})
             
-            # Atualizar senha
+            # Atualizar senha e revogar as sessões no mesmo comando
             new_password_hash = hash_password(new_password)
-            self.user_repo.update(user_id, password_hash=new_password_hash)
+            user = self.user_repo.update_user(user_id, revoke_tokens=True, password_hash=new_password_hash)
+            if not user:
+                raise NotFoundError("Usuário não encontrado")
+            unit_of_work.on_commit(partial(epoch_store.publish_bumps, [(user.id, user.token_epoch)]))
             
             logger.info(f"Senha redefinida para usuário: {mask_email(user.email)}")
             
             return True
             
-        except (NotFoundError, ValidationError):
+        except (NotFoundError, ValidationError, ServiceUnavailableError):
             raise
         except Exception as e:
             logger.error(f"Erro ao redefinir senha do usuário {user_id}: {str(e)}")
@@ -258,11 +287,374 @@ class UserService:
             logger.error(f"Erro ao obter estatísticas: {str(e)}")
             raise ValidationError("Erro interno ao obter estatísticas")
     
+    def autocomplete_users(self, prefix: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """Sugestões por prefixo (índice em memória; banco enquanto o índice é montado)"""
+        autocomplete_index.ensure_started()
+        if autocomplete_index.ready:
+            metrics.inc('autocomplete.memory_hits')
+            return autocomplete_index.search(prefix, limit)
+        
+        try:
+            metrics.inc('autocomplete.database_fallbacks')
+            users = self.user_repo.search_users(prefix, limit=limit)
+            return [{'id': user.id, 'name': user.name, 'email': user.email} for user in users]
+        except Exception as e:
+            logger.error(f"Erro no autocomplete de usuários: {str(e)}")
+            raise ValidationError("Erro interno ao buscar usuários")
+    
+    def bulk_user_action(self, action: str, role: Optional[str] = None, ids: Optional[List[int]] = None,
+                         filters: Optional[Dict[str, str]] = None, actor_id: Optional[int] = None) -> Dict[str, Any]:
+        """Aplica ação em lote a uma lista de ids ou aos usuários de um filtro (tarefa Celery acima do limite)"""
+        try:
+            query_dto = self._bulk_query_dto(filters)
+            exclude_ids = [actor_id] if actor_id else []
+            matched = self.user_repo.count_bulk_targets(ids, query_dto, exclude_ids)
+            result = {'action': action, 'matched': matched}
+            if ids is not None:
+                result['requested'] = len(set(ids))
+            
+            if matched > current_app.config.get('USER_BULK_ASYNC_THRESHOLD', 1000):
+                from app.infra.tasks import bulk_user_action_task
+                try:
+                    task = bulk_user_action_task.delay(action, role, ids, filters, exclude_ids)
+                except Exception as e:
+                    logger.error(f"Erro ao enfileirar ação em lote: {str(e)}")
+                    raise ServiceUnavailableError("Fila de tarefas indisponível")
+                logger.info(f"Ação em lote {action} enfileirada para {matched} usuários (tarefa {task.id})")
+                return dict(result, task_id=task.id, status='queued')
+            
+            result['affected'] = self.apply_bulk_user_action(action, role, ids, filters, exclude_ids)
+            return dict(result, status='done')
+            
+        except ServiceUnavailableError:
+            raise
+        except Exception as e:
+            logger.error(f"Erro na ação em lote {action}: {str(e)}")
+            raise ValidationError("Erro interno na ação em lote")
+    
+    def apply_bulk_user_action(self, action: str, role: Optional[str] = None, ids: Optional[List[int]] = None,
+                               filters: Optional[Dict[str, str]] = None, exclude_ids: Sequence[int] = (),
+                               chunk_size: Optional[int] = None,
+                               progress: Optional[Callable[[int, int, int], None]] = None) -> int:
+        """Executa a ação em lote (um UPDATE, ou um por bloco de ids) e retorna quantos usuários mudaram"""
+        changes, revoke_tokens = BULK_USER_ACTIONS[action]
+        if action == 'change_role':
+            changes = {'role': role}
+        query_dto = self._bulk_query_dto(filters)
+        
+        if chunk_size is None:
+            chunks = [ids]
+        else:
+            # Alvos congelados no início: blocos por id mantêm cada transação curta
+            target_ids = self.user_repo.get_bulk_target_ids(ids, query_dto, exclude_ids)
+            chunks = [target_ids[start:start + chunk_size] for start in range(0, len(target_ids), chunk_size)]
+            query_dto = None
+        
+        processed = affected = 0
+        total = sum(len(chunk) for chunk in chunks if chunk is not None)
+        for chunk in chunks:
+            rows = self.user_repo.bulk_update_users(
+                changes, ids=chunk, query_dto=query_dto, exclude_ids=exclude_ids, bump_token_epoch=revoke_tokens
+            )
+            if revoke_tokens:
+                unit_of_work.on_commit(partial(epoch_store.publish_bumps, rows))
+            affected += len(rows)
+            processed += len(chunk) if chunk is not None else 0
+            if progress:
+                progress(processed, total, affected)
+        
+        metrics.inc('users.bulk_updates', affected)
+        logger.info(f"Ação em lote {action}: {affected} usuários alterados")
+        return affected
+    
+    def get_bulk_task_status(self, task_id: str) -> Dict[str, Any]:
+        """Estado de uma ação em lote enfileirada (progresso enquanto executa, resultado ao terminar)"""
+        return self._task_status(task_id, 'Falha na execução da ação em lote')
+    
+    @staticmethod
+    def _task_status(task_id: str, failure_message: str, task_type: Optional[str] = None,
+                     owner_id: Optional[int] = None) -> Dict[str, Any]:
+        """Estado de uma tarefa Celery (progresso enquanto executa, resultado ao terminar)
+        
+        Com `task_type`, progresso e resultado precisam trazer o mesmo tipo e dono (gravados pela
+        tarefa); tarefa de outro tipo ou de outro usuário é tratada como inexistente.
+        """
+        from app.infra.tasks import celery
+        task = celery.AsyncResult(task_id)
+        status = {'task_id': task_id, 'state': task.state}
+        details = task.info if task.state in ('PROGRESS', 'SUCCESS') else None
+        if task_type is not None and details is not None:
+            details = dict(details)
+            owner = (details.pop('task_type', None), details.pop('owner_id', None))
+            if owner != (task_type, owner_id):
+                raise NotFoundError("Tarefa não encontrada")
+        if task.state == 'PROGRESS':
+            status['progress'] = details
+        elif task.state == 'SUCCESS':
+            status['result'] = details
+        elif task.state == 'FAILURE':
+            status['error'] = failure_message
+        return status
+    
+    @staticmethod
+    def _storage_file(path: Optional[str], file_type: str) -> str:
+        """Caminho de um arquivo gerado por tarefa, restrito à pasta do seu tipo no storage"""
+        if not path or os.path.dirname(os.path.normpath(path)) != file_type:
+            raise NotFoundError("Arquivo não encontrado")
+        return path
+    
+    def export_users(self, query_dto: UserQueryDTO, fmt: str, force_async: bool = False,
+                     owner_id: Optional[int] = None) -> Dict[str, Any]:
+        """Exporta os usuários dos filtros: blocos para a resposta em streaming, ou tarefa Celery acima do limite"""
+        try:
+            if fmt == 'parquet' and not parquet_available():
+                raise ValidationError("Formato parquet indisponível (pyarrow não instalado)")
+            
+            estimated, _ = self.user_repo.count_filtered_users(query_dto, 'estimated')
+            result = {'format': fmt, 'estimated_rows': estimated}
+            
+            if force_async or estimated > current_app.config.get('USER_EXPORT_ASYNC_THRESHOLD', 100000):
+                from app.infra.tasks import export_users_task
+                filters = {
+                    'search': query_dto.search,
+                    'role': query_dto.role.value if query_dto.role else None,
+                    'status': query_dto.status.value if query_dto.status else None
+                }
+                try:
+                    task = export_users_task.delay(
+                        fmt, {key: value for key, value in filters.items() if value}, query_dto.sort_by, query_dto.sort_order,
+                        owner_id=owner_id
+                    )
+                except Exception as e:
+                    logger.error(f"Erro ao enfileirar exportação de usuários: {str(e)}")
+                    raise ServiceUnavailableError("Fila de tarefas indisponível")
+                logger.info(f"Exportação {fmt} de ~{estimated} usuários enfileirada (tarefa {task.id})")
+                return dict(result, task_id=task.id, status='queued')
+            
+            return dict(result, status='streaming', chunks=self.stream_users_export(query_dto, fmt))
+            
+        except (ValidationError, ServiceUnavailableError):
+            raise
+        except Exception as e:
+            logger.error(f"Erro na exportação de usuários: {str(e)}")
+            raise ValidationError("Erro interno na exportação de usuários")
+    
+    def stream_users_export(self, query_dto: UserQueryDTO, fmt: str,
+                            progress: Optional[Callable[[int], None]] = None):
+        """Blocos de bytes da exportação (cursor no servidor; memória constante)"""
+        batch_size = current_app.config.get('USER_EXPORT_BATCH_SIZE', 1000)
+        rows = self.user_repo.stream_users(query_dto, user_row_serializer.fields, batch_size=batch_size)
+        return RowExporter(user_row_serializer, batch_size).export(rows, fmt, progress=progress)
+    
+    def export_users_to_storage(self, fmt: str, filters: Optional[Dict[str, str]] = None,
+                                sort_by: str = 'created_at', sort_order: str = 'desc',
+                                progress: Optional[Callable[[int], None]] = None) -> Dict[str, Any]:
+        """Grava a exportação num arquivo do storage (tarefa Celery) e retorna caminho, linhas e tamanho"""
+        from app.infra.storage import storage
+        
+        query_dto = self._bulk_query_dto(filters) or UserQueryDTO()
+        query_dto.sort_by, query_dto.sort_order = sort_by, sort_order
+        
+        exported = [0]
+        def count(rows):
+            exported[0] = rows
+            if progress:
+                progress(rows)
+        
+        path = storage.save_stream(
+            self.stream_users_export(query_dto, fmt, progress=count),
+            f'users.{EXPORT_FORMATS[fmt][1]}'
+        )
+        metrics.inc('users.exported', exported[0])
+        logger.info(f"Exportação {fmt} concluída: {exported[0]} usuários em {path}")
+        return {'format': fmt, 'rows': exported[0], 'path': path, 'size': storage.get_file_size(path)}
+    
+    def get_export_task_status(self, task_id: str, owner_id: int) -> Dict[str, Any]:
+        """Estado de uma exportação enfileirada pelo usuário (linhas exportadas enquanto executa, arquivo ao terminar)"""
+        status = self._task_status(task_id, 'Falha na exportação de usuários', 'export', owner_id)
+        if status['state'] == 'SUCCESS':
+            status['download_url'] = f'/api/v1/users/export/{task_id}/file'
+        return status
+    
+    def get_export_file(self, task_id: str, owner_id: int) -> str:
+        """Caminho (no storage) do arquivo de uma exportação concluída do usuário"""
+        status = self.get_export_task_status(task_id, owner_id)
+        if status['state'] != 'SUCCESS':
+            raise NotFoundError("Exportação não concluída")
+        return self._storage_file(status['result'].get('path'), 'exports')
+    
+    def enqueue_user_import(self, upload: BinaryIO, filename: Optional[str], fmt: Optional[str] = None,
+                            owner_id: Optional[int] = None) -> Dict[str, Any]:
+        """Salva o arquivo enviado no storage (em blocos) e enfileira a importação numa tarefa Celery"""
+        from app.infra.storage import storage
+        from app.infra.tasks import import_users_task
+        
+        fmt = fmt or detect_format(filename)
+        if fmt not in IMPORT_FORMATS:
+            raise ValidationError("Formato deve ser csv ou ndjson")
+        
+        path = storage.save_stream(
+            iter(lambda: upload.read(64 * 1024), b''), f'users.{fmt}', 'imports',
+            max_size=current_app.config.get('USER_IMPORT_MAX_FILE_SIZE', 100 * 1024 * 1024)
+        )
+        if path is None:
+            raise ValidationError("Arquivo de importação muito grande")
+        
+        try:
+            task = import_users_task.delay(path, fmt, owner_id=owner_id)
+        except Exception as e:
+            storage.delete_file(path)
+            logger.error(f"Erro ao enfileirar importação de usuários: {str(e)}")
+            raise ServiceUnavailableError("Fila de tarefas indisponível")
+        logger.info(f"Importação {fmt} enfileirada (tarefa {task.id})")
+        return {'format': fmt, 'task_id': task.id, 'status': 'queued'}
+    
+    def import_users_from_storage(self, path: str, fmt: str,
+                                  progress: Optional[Callable[[int, int, int], None]] = None) -> Dict[str, Any]:
+        """Importa um arquivo do storage (tarefa Celery), grava o relatório de erros e remove o arquivo"""
+        from app.infra.storage import storage
+        
+        with open(os.path.join(storage.upload_folder, path), 'rb') as source:
+            result = self.import_users(source, fmt, progress=progress)
+        storage.delete_file(path)
+        
+        summary = result.to_dict(max_errors=current_app.config.get('USER_IMPORT_REPORTED_ERRORS', 100))
+        if result.errors:
+            summary['report_path'] = storage.save_stream(result.report_csv(), 'users-import-errors.csv', 'imports')
+        return summary
+    
+    def import_users(self, source: BinaryIO, fmt: str,
+                     progress: Optional[Callable[[int, int, int], None]] = None) -> ImportResult:
+        """Importa usuários de CSV/NDJSON: validação em uma passada, hash em paralelo e carga por lote
+        
+        Cada lote de `USER_IMPORT_BATCH_SIZE` linhas válidas descarta numa consulta os emails já
+        cadastrados (antes do hash, a parte cara), gera os hashes no pool de processos e entra no
+        banco por COPY + INSERT ... ON CONFLICT. `progress` recebe (linhas lidas, criados, rejeitados).
+        """
+        batch_size = current_app.config.get('USER_IMPORT_BATCH_SIZE', 1000)
+        schema = CreateUserSchema()
+        result = ImportResult()
+        seen = set()
+        batch = []
+        
+        for line, data, error in read_rows(source, fmt):
+            result.total += 1
+            row = self._validate_import_row(schema, line, data, error, seen, result)
+            if row is None:
+                continue
+            batch.append(row)
+            if len(batch) >= batch_size:
+                self._import_batch(batch, result)
+                batch = []
+                if progress:
+                    progress(result.total, result.created, result.rejected)
+        
+        self._import_batch(batch, result)
+        if progress:
+            progress(result.total, result.created, result.rejected)
+        
+        metrics.inc('users.imported', result.created)
+        logger.info(f"Importação {fmt}: {result.total} linhas, {result.created} usuários criados, {result.rejected} rejeitados")
+        return result
+    
+    @staticmethod
+    def _validate_import_row(schema: CreateUserSchema, line: int, data: Optional[Dict[str, Any]],
+                             error: Optional[str], seen: set, result: ImportResult) -> Optional[Dict[str, Any]]:
+        """Linha pronta para o lote, ou None (erro registrado no resultado)"""
+        if error:
+            result.add_error(line, None, [error])
+            return None
+        
+        email = data.get('email') if isinstance(data.get('email'), str) else None
+        try:
+            values = schema.load(data, unknown=EXCLUDE)
+        except SchemaValidationError as e:
+            result.add_error(line, email, [
+                f"{field}: {message}"
+                for field, messages in e.messages.items()
+                for message in (messages if isinstance(messages, list) else [messages])
+            ])
+            return None
+        
+        password_validation = validate_password_strength(values['password'])
+        if not password_validation['is_valid']:
+            result.add_error(line, values['email'], password_validation['errors'])
+            return None
+        
+        if values['email'] in seen:
+            result.add_error(line, values['email'], ['Email duplicado no arquivo'])
+            return None
+        seen.add(values['email'])
+        
+        return {
+            'line': line,
+            'email': values['email'],
+            'password': values['password'],
+            'name': values['name'],
+            'role': values['role'],
+            'status': values['status'],
+            'is_active': values['status'] == UserStatus.ACTIVE.value
+        }
+    
+    def _import_batch(self, batch: List[Dict[str, Any]], result: ImportResult):
+        """Carrega um lote de linhas válidas, registrando os emails já cadastrados como erro"""
+        if not batch:
+            return
+        
+        existing = self.user_repo.find_existing_emails([row['email'] for row in batch])
+        pending = []
+        for row in batch:
+            if row['email'] in existing:
+                result.add_error(row['line'], row['email'], ['Email já está em uso'])
+            else:
+                pending.append(row)
+        if not pending:
+            return
+        
+        for row, password_hash in zip(pending, hash_passwords([row.pop('password') for row in pending])):
+            row['password_hash'] = password_hash
+        
+        created = self.user_repo.import_users(pending)
+        # Cadastrados por outra requisição entre a verificação e a carga: ignorados pelo ON CONFLICT
+        created_emails = {email for _, email, _ in created}
+        for row in pending:
+            if row['email'] not in created_emails:
+                result.add_error(row['line'], row['email'], ['Email já está em uso'])
+        result.created += len(created)
+        
+        changes = {user_id: (name, email) for user_id, email, name in created}
+        unit_of_work.on_commit(lambda: autocomplete_index.publish_changes(changes))
+    
+    def get_import_task_status(self, task_id: str, owner_id: int) -> Dict[str, Any]:
+        """Estado de uma importação enfileirada pelo usuário (progresso enquanto executa, resumo ao terminar)"""
+        status = self._task_status(task_id, 'Falha na importação de usuários', 'import', owner_id)
+        if status['state'] == 'SUCCESS' and status['result'].get('report_path'):
+            status['report_url'] = f'/api/v1/users/import/{task_id}/report'
+        return status
+    
+    def get_import_report(self, task_id: str, owner_id: int) -> str:
+        """Caminho (no storage) do relatório de erros de uma importação concluída do usuário"""
+        status = self.get_import_task_status(task_id, owner_id)
+        if status['state'] != 'SUCCESS' or not status['result'].get('report_path'):
+            raise NotFoundError("Relatório de erros não disponível")
+        return self._storage_file(status['result']['report_path'], 'imports')
+    
+    @staticmethod
+    def _bulk_query_dto(filters: Optional[Dict[str, str]]) -> Optional[UserQueryDTO]:
+        """Filtros de uma ação em lote no formato da listagem"""
+        if filters is None:
+            return None
+        return UserQueryDTO(
+            search=filters.get('search'),
+            role=UserRole(filters['role']) if filters.get('role') else None,
+            status=UserStatus(filters['status']) if filters.get('status') else None
+        )
+    
     def search_users(self, search_term: str, limit: int = 10) -> List[UserDTO]:
         """Busca usuários por termo"""
         try:
-            users = self.user_repo.search_users(search_term)
-            return [UserDTO.from_model(user, include_sensitive=True) for user in users[:limit]]
+            users = self.user_repo.search_users(search_term, limit=limit)
+            return [UserDTO.from_model(user, include_sensitive=True) for user in users]
         except Exception as e:
             logger.error(f"Erro ao buscar usuários: {str(e)}")
             raise ValidationError("Erro interno ao buscar usuários")
@@ -5,8 +5,9 @@ import click
 from flask import current_app
 from app import db
 from app.domain.models import User
-from app.core.security import hash_password
+from app.core.security import hash_password, calibrate_hasher, PASSWORD_HASHERS
 from app.core.logging import get_logger
+from app.infra.token_store import epoch_store
 
 logger = get_logger(__name__)
 
@@ -92,18 +93,82 @@ def register_commands(app):
     @app.cli.command()
     def list_users():
         """Lista todos os usuários"""
-        users = User.query.all()
-        
-        if not users:
-            click.echo("Nenhum usuário encontrado.")
-            return
-        
-        click.echo(f"{'ID':<5} {'Nome':<20} {'Email':<30} {'Role':<12} {'Status':<10}")
-        click.echo("-" * 80)
+        # Cursor no servidor: memória constante independente do tamanho da tabela
+        users = User.query.order_by(User.id).yield_per(current_app.config.get('USER_EXPORT_BATCH_SIZE', 1000))
         
+        listed = 0
         for user in users:
+            if not listed:
+                click.echo(f"{'ID':<5} {'Nome':<20} {'Email':<30} {'Role':<12} {'Status':<10}")
+                click.echo("-" * 80)
+            listed += 1
             status = "Ativo" if user.is_active else "Inativo"
             click.echo(f"{user.id:<5} {user.name:<20} {user.email:<30} {user.role:<12} {status:<10}")
+        
+        if not listed:
+            click.echo("Nenhum usuário encontrado.")
+    
+    @app.cli.command()
+    @click.option('--format', 'fmt', type=click.Choice(['csv', 'ndjson', 'parquet']), default='csv', help='Formato do arquivo')
+    @click.option('--output', type=click.File('wb'), default='-', help='Arquivo de saída (padrão: stdout)')
+    @click.option('--search', default=None, help='Filtra por nome ou email')
+    @click.option('--role', type=click.Choice(['admin', 'developer', 'user']), default=None, help='Filtra por role')
+    @click.option('--status', type=click.Choice(['active', 'inactive', 'pending', 'suspended']), default=None, help='Filtra por status')
+    def export_users(fmt, output, search, role, status):
+        """Exporta usuários em CSV, NDJSON ou Parquet (em blocos, sem carregar a tabela)"""
+        from app.api.v1.users.service import UserService
+        from app.domain.dtos import UserQueryDTO, UserRole, UserStatus
+        
+        if fmt == 'parquet':
+            from app.core.export import parquet_available
+            if not parquet_available():
+                raise click.ClickException("Formato parquet indisponível (pyarrow não instalado)")
+        
+        query_dto = UserQueryDTO(
+            search=search,
+            role=UserRole(role) if role else None,
+            status=UserStatus(status) if status else None,
+            sort_by='id',
+            sort_order='asc'
+        )
+        
+        exported = [0]
+        def count(rows):
+            exported[0] = rows
+        
+        for chunk in UserService().stream_users_export(query_dto, fmt, progress=count):
+            output.write(chunk)
+        output.flush()
+        click.echo(f"Usuários exportados: {exported[0]}", err=True)
+    
+    @app.cli.command()
+    @click.argument('source', type=click.File('rb'))
+    @click.option('--format', 'fmt', type=click.Choice(['csv', 'ndjson']), default=None, help='Formato do arquivo (padrão: pela extensão)')
+    @click.option('--report', type=click.File('wb'), default=None, help='Grava o relatório de erros por linha (CSV)')
+    def import_users(source, fmt, report):
+        """Importa usuários de CSV ou NDJSON (hash em paralelo, COPY e um INSERT por lote)"""
+        from app.api.v1.users.service import UserService
+        from app.core.imports import detect_format
+        
+        fmt = fmt or detect_format(source.name)
+        if fmt is None:
+            raise click.ClickException("Informe --format (csv ou ndjson)")
+        
+        def progress(total, created, rejected):
+            click.echo(f"{total} linhas lidas, {created} usuários criados, {rejected} rejeitados", err=True)
+        
+        result = UserService().import_users(source, fmt, progress=progress)
+        click.echo(f"Linhas: {result.total} | Criados: {result.created} | Rejeitados: {result.rejected}")
+        
+        if report:
+            for chunk in result.report_csv():
+                report.write(chunk)
+        elif result.errors:
+            errors = result.sorted_errors()
+            for error in errors[:20]:
+                click.echo(f"Linha {error['line']} ({error['email'] or '-'}): {'; '.join(error['errors'])}")
+            if len(errors) > 20:
+                click.echo(f"... mais {len(errors) - 20} erros (use --report para o relatório completo)")
     
     @app.cli.command()
     def deactivate_user():
@@ -119,6 +184,7 @@ def register_commands(app):
             user.is_active = False
             user.status = "inactive"
             db.session.commit()
+            epoch_store.bump(user.id)
             
             click.echo(f"Usuário {user.name} desativado com sucesso!")
             
@@ -171,6 +237,96 @@ def register_commands(app):
         except Exception as e:
             click.echo(f"Erro: {str(e)}")
     
+    @app.cli.command()
+    @click.option('--target-ms', type=float, default=None, help='Latência alvo de verificação (ms)')
+    @click.option('--samples', type=int, default=3, help='Medições por custo')
+    def calibrate_hashing(target_ms, samples):
+        """Mede o hasher de senhas no host e sugere o custo"""
+        algorithm = current_app.config.get('PASSWORD_HASHER', 'bcrypt')
+        hasher_class = PASSWORD_HASHERS[algorithm]
+        target_ms = target_ms or current_app.config.get('PASSWORD_HASH_TARGET_MS', 250)
+        
+        click.echo(f"Calibrando {algorithm} para {target_ms:.0f}ms por verificação...")
+        cost, timings = calibrate_hasher(hasher_class, target_ms, samples)
+        
+        click.echo(f"{'Custo':<8} {'Verificação (ms)':<18}")
+        click.echo("-" * 26)
+        for timing_cost, median_ms in timings:
+            marker = " <" if timing_cost == cost else ""
+            click.echo(f"{timing_cost:<8} {median_ms:<18.1f}{marker}")
+        
+        current_cost = hasher_class.from_config(current_app.config).cost
+        click.echo(f"Custo atual: {current_cost}")
+        click.echo(f"Custo recomendado: {hasher_class.cost_config_key}={cost}")
+        if cost != current_cost:
+            click.echo("Após atualizar a configuração, os hashes serão refeitos no próximo login de cada usuário.")
+    
+    @app.cli.command()
+    @click.option('--algorithm', default=None, help='Algoritmo da nova chave (padrão: JWT_ALGORITHM)')
+    @click.option('--prune/--no-prune', default=True, help='Remove chaves substituídas cujos tokens já expiraram')
+    def rotate_jwt_key(algorithm, prune):
+        """Gera nova chave de assinatura JWT"""
+        from app.core.keyring import keyring
+        
+        if not keyring.enabled and not algorithm:
+            click.echo(f"JWT_ALGORITHM={keyring.algorithm} usa JWT_SECRET_KEY; nada a rotacionar.")
+            return
+        
+        key = keyring.generate(algorithm)
+        click.echo(f"Nova chave: {key.kid} ({key.algorithm})")
+        click.echo(f"Publicada no JWKS; passa a assinar tokens em {keyring.activation_delay}s.")
+        
+        if prune:
+            for kid in keyring.prune():
+                click.echo(f"Chave removida: {kid}")
+    
+    @app.cli.command()
+    @click.option('--batch-size', type=int, default=None, help='Linhas por bloco')
+    @click.option('--pause', type=float, default=None, help='Pausa entre blocos (s)')
+    @click.option('--drop-partitions', is_flag=True, default=False, help='Remove partições expiradas (PostgreSQL)')
+    def purge_expired_tokens(batch_size, pause, drop_partitions):
+        """Remove tokens expirados da blacklist em blocos"""
+        from datetime import datetime
+        from app.domain.models import BlacklistedToken
+        from app.infra.purge import purge_engine
+        
+        result = purge_engine.purge(
+            BlacklistedToken.__table__,
+            'expires_at',
+            datetime.utcnow(),
+            batch_size=batch_size or current_app.config.get('TOKEN_PURGE_BATCH_SIZE', 5000),
+            pause=current_app.config.get('TOKEN_PURGE_PAUSE_SECONDS', 0.1) if pause is None else pause,
+            drop_partitions=drop_partitions or current_app.config.get('TOKEN_PURGE_DROP_PARTITIONS', False)
+        )
+        
+        click.echo(f"Tokens removidos: {result.deleted} em {result.batches} blocos ({result.rows_per_second:.0f} linhas/s)")
+        for partition in result.partitions_dropped:
+            click.echo(f"Partição removida: {partition}")
+    
+    @app.cli.command()
+    def apply_ddl():
+        """Aplica triggers e demais DDL fora do ORM (idempotente)"""
+        from app.infra.ddl import ddl_registry
+        
+        applied = ddl_registry.apply()
+        click.echo(f"DDL aplicada: {', '.join(applied) if applied else 'nenhuma para este banco'}")
+    
+    @app.cli.command()
+    def rebuild_user_counters():
+        """Reconcilia user_counters com a tabela users"""
+        from app.infra.repositories.user_repo import UserRepository
+        
+        drift = UserRepository().rebuild_user_counters()
+        if not drift:
+            click.echo("Contadores consistentes com a tabela users.")
+            return
+        
+        click.echo(f"{'Role':<12} {'Status':<12} {'Ativo':<6} {'Antes':>8} {'Real':>8}")
+        click.echo("-" * 50)
+        for role, status, is_active, before, actual in drift:
+            click.echo(f"{role:<12} {status:<12} {str(is_active):<6} {before:>8} {actual:>8}")
+        click.echo(f"{len(drift)} contadores corrigidos.")
+    
     @app.cli.command()
     def run():
         """Executa a aplicação em modo de desenvolvimento"""
@@ -0,0 +1,41 @@
+"""
+Filtro de Bloom em memória
+"""
+import hashlib
+import math
+
+class BloomFilter:
+    """Filtro de Bloom com bits em bytearray (falsos positivos, nunca falsos negativos)"""
+    
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        self.capacity = max(capacity, 1)
+        self.error_rate = error_rate
+        self.num_bits = max(int(-self.capacity * math.log(error_rate) / (math.log(2) ** 2)), 8)
+        self.num_hashes = max(int(round(self.num_bits / self.capacity * math.log(2))), 1)
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+    
+    def _positions(self, item: str):
+        """Calcula as posições dos bits (double hashing)"""
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+    
+    def add(self, item: str):
+        """Adiciona item ao filtro"""
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+    
+    def __contains__(self, item: str) -> bool:
+        """Verifica se o item pode estar no filtro"""
+        for position in self._positions(item):
+            if not self.bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+    
+    def is_saturated(self) -> bool:
+        """Indica se o filtro excedeu a capacidade planejada"""
+        return self.count > self.capacity
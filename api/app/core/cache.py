@@ -0,0 +1,78 @@
+"""
+Cache LRU em memória com expiração
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+MISSING = object()
+
+class LRUCache:
+    """Cache LRU limitado, thread-safe, com TTL por entrada"""
+    
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: 'OrderedDict[Hashable, tuple]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+    
+    def get(self, key: Hashable, default: Any = MISSING) -> Any:
+        """Obtém valor (MISSING quando ausente ou expirado)"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= now:
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+    
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """Armazena valor (ttl em segundos; padrão do cache quando omitido)"""
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+    
+    def delete(self, key: Hashable):
+        """Remove valor"""
+        with self._lock:
+            self._data.pop(key, None)
+    
+    def clear(self):
+        """Remove todos os valores"""
+        with self._lock:
+            self._data.clear()
+    
+    def __len__(self) -> int:
+        """Quantidade de entradas"""
+        return len(self._data)
+    
+    def stats(self):
+        """Estatísticas de uso do cache"""
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            'evictions': self.evictions,
+            'expirations': self.expirations
+        }
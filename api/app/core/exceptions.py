@@ -3,7 +3,6 @@ Exceções customizadas da aplicação
 """
 from flask import jsonify
 from werkzeug.exceptions import HTTPException
-from app.core.exceptions import ValidationError, AuthenticationError, AuthorizationError, NotFoundError
 
 class APIException(Exception):
     """Exceção base da API"""
@@ -43,6 +42,12 @@ class ConflictError(APIException):
     status_code = 409
     message = "Conflito de recursos"
 
+class ServiceUnavailableError(APIException):
+    """Serviço temporariamente indisponível"""
+    status_code = 503
+    message = "Serviço temporariamente indisponível"
+    retry_after = 1
+
 def register_error_handlers(app):
     """Registra handlers de erro"""
     
@@ -120,6 +125,16 @@ def register_error_handlers(app):
         }
         return jsonify(response), 409
     
+    @app.errorhandler(ServiceUnavailableError)
+    def handle_service_unavailable_error(error):
+        """Handler para serviço indisponível"""
+        response = {
+            'error': 'ServiceUnavailableError',
+            'message': error.message,
+            'status_code': 503
+        }
+        return jsonify(response), 503, {'Retry-After': str(error.retry_after)}
+    
     @app.errorhandler(500)
     def handle_internal_error(error):
         """Handler para erros internos"""
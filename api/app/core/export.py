@@ -0,0 +1,141 @@
+"""
+Exportação em streaming de linhas do banco (CSV, NDJSON e Parquet)
+"""
+import csv
+import importlib.util
+import io
+import re
+from itertools import islice
+from typing import Callable, Iterable, Iterator, List, Optional
+from app.core.serialization import RowSerializer
+
+# Formato -> (mimetype, extensão do arquivo)
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv'),  # charset=utf-8 acrescentado pelo Werkzeug
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+}
+
+# Células de texto que planilhas interpretariam como fórmula. '-' seguido só de um número
+# (ex.: "-42") é mantido como está: a planilha lê um número, não uma fórmula
+CSV_FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+_NEGATIVE_NUMBER = re.compile(r'-\d+(?:[.,]\d+)?')
+
+def parquet_available() -> bool:
+    """pyarrow (dependência opcional) está instalado (sem importá-lo)"""
+    return importlib.util.find_spec('pyarrow') is not None
+
+def escape_csv_formula(value: str) -> str:
+    """Prefixa com ' o texto que uma planilha executaria como fórmula"""
+    if value.startswith(CSV_FORMULA_PREFIXES) and not _NEGATIVE_NUMBER.fullmatch(value):
+        return "'" + value
+    return value
+
+class _ChunkSink(io.RawIOBase):
+    """Destino de escrita do pyarrow que acumula os bytes até serem enviados"""
+    
+    def __init__(self):
+        super().__init__()
+        self._chunks: List[bytes] = []
+        self._position = 0
+    
+    def writable(self) -> bool:
+        return True
+    
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+    
+    def tell(self) -> int:
+        return self._position
+    
+    def drain(self) -> bytes:
+        """Bytes escritos desde a última chamada"""
+        data, self._chunks = b''.join(self._chunks), []
+        return data
+
+class RowExporter:
+    """Converte linhas (Row/tupla na ordem dos campos do serializer) em blocos de bytes no formato pedido
+    
+    As linhas são consumidas em blocos de `batch_size` e cada bloco é convertido e liberado antes
+    do próximo: a memória não depende do total exportado. NDJSON reaproveita o `RowSerializer`
+    da listagem; Parquet usa pyarrow (dependência opcional), com um row group por bloco.
+    """
+    
+    def __init__(self, serializer: RowSerializer, batch_size: int = 1000):
+        self.serializer = serializer
+        self.batch_size = batch_size
+    
+    def export(self, rows: Iterable, fmt: str, progress: Optional[Callable[[int], None]] = None) -> Iterator[bytes]:
+        """Blocos de bytes do arquivo exportado (progress recebe o total de linhas já convertidas)"""
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Formato de exportação não suportado: {fmt}")
+        return getattr(self, f'_{fmt}')(self._batches(rows, progress))
+    
+    def _batches(self, rows: Iterable, progress: Optional[Callable[[int], None]]) -> Iterator[list]:
+        """Blocos de linhas"""
+        rows = iter(rows)
+        exported = 0
+        while True:
+            batch = list(islice(rows, self.batch_size))
+            if not batch:
+                return
+            yield batch
+            exported += len(batch)
+            if progress:
+                progress(exported)
+    
+    def _csv(self, batches: Iterator[list]) -> Iterator[bytes]:
+        """CSV com cabeçalho (datas em ISO 8601, nulos vazios)"""
+        converters = [self._csv_converter(kind) for kind in self.serializer.kinds]
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(self.serializer.fields)
+        for batch in batches:
+            writer.writerows(
+                [convert(value) for convert, value in zip(converters, row)] for row in batch
+            )
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue().encode('utf-8')
+    
+    @staticmethod
+    def _csv_converter(kind: str) -> Callable:
+        """Conversão de um valor para célula CSV"""
+        if kind == 'datetime':
+            return lambda value: '' if value is None else value.isoformat()
+        if kind == 'bool':
+            return lambda value: '' if value is None else ('true' if value else 'false')
+        if kind == 'str':
+            return lambda value: '' if value is None else escape_csv_formula(value)
+        return lambda value: '' if value is None else value
+    
+    def _ndjson(self, batches: Iterator[list]) -> Iterator[bytes]:
+        """Um objeto JSON por linha, no mesmo formato da listagem"""
+        serialize = self.serializer.serialize
+        for batch in batches:
+            yield (''.join([serialize(row) + '\n' for row in batch])).encode('ascii')
+    
+    def _parquet(self, batches: Iterator[list]) -> Iterator[bytes]:
+        """Parquet (snappy) com um row group por bloco"""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        
+        types = {'int': pa.int64(), 'str': pa.string(), 'bool': pa.bool_(), 'datetime': pa.timestamp('us')}
+        schema = pa.schema([(name, types[kind]) for name, kind in zip(self.serializer.fields, self.serializer.kinds)])
+        sink = _ChunkSink()
+        writer = pq.ParquetWriter(sink, schema, compression='snappy')
+        try:
+            for batch in batches:
+                columns = list(zip(*batch))
+                writer.write_table(pa.Table.from_arrays(
+                    [pa.array(column, type=field.type) for column, field in zip(columns, schema)], schema=schema
+                ))
+                yield sink.drain()
+        finally:
+            writer.close()
+        yield sink.drain()
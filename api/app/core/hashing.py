@@ -0,0 +1,153 @@
+"""
+Executor dedicado para hashing de senhas
+"""
+import atexit
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, List, Optional
+import bcrypt
+from app.core.exceptions import ServiceUnavailableError
+from app.core.logging import get_logger
+from app.core.metrics import metrics
+
+logger = get_logger(__name__)
+
+def bcrypt_hash(password: str, rounds: int) -> str:
+    """Gera hash bcrypt (executado no processo do pool)"""
+    salt = bcrypt.gensalt(rounds=rounds)
+    return bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
+
+def bcrypt_verify(password: str, password_hash: str) -> bool:
+    """Verifica hash bcrypt (executado no processo do pool)"""
+    return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8'))
+
+class HashingExecutor:
+    """Pool de processos limitado para operações de hashing"""
+    
+    def __init__(self):
+        self.enabled = False
+        self.max_workers = os.cpu_count() or 1
+        self.max_pending = self.max_workers * 4
+        self.timeout = 30.0
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_pid: Optional[int] = None
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._pending = 0
+    
+    def init_app(self, app):
+        """Configura o executor a partir da aplicação"""
+        self.enabled = app.config.get('HASHING_POOL_ENABLED', True)
+        self.max_workers = app.config.get('HASHING_POOL_WORKERS') or self.default_workers()
+        self.max_pending = app.config.get('HASHING_POOL_MAX_PENDING') or self.max_workers * 4
+        self.timeout = app.config.get('HASHING_POOL_TIMEOUT', 30.0)
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        
+        metrics.register_gauge('hashing.in_flight', lambda: self._pending)
+        metrics.register_gauge('hashing.queue_depth', self.queue_depth)
+        metrics.register_gauge('hashing.capacity', lambda: self.max_pending)
+        atexit.register(self.shutdown)
+    
+    @staticmethod
+    def default_workers() -> int:
+        """Núcleos divididos entre os workers do servidor (WEB_CONCURRENCY), cada um com seu pool"""
+        web_workers = max(int(os.environ.get('WEB_CONCURRENCY') or 1), 1)
+        return max((os.cpu_count() or 1) // web_workers, 1)
+    
+    def queue_depth(self) -> int:
+        """Quantidade de operações aguardando um processo livre"""
+        return max(self._pending - self.max_workers, 0)
+    
+    def _get_pool(self) -> ProcessPoolExecutor:
+        """Obtém o pool, recriando-o após fork do worker"""
+        with self._lock:
+            if self._pool is None or self._pool_pid != os.getpid():
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+                self._pool_pid = os.getpid()
+            return self._pool
+    
+    def run(self, fn: Callable[..., Any], *args) -> Any:
+        """Executa operação de hashing aplicando backpressure"""
+        if not self.enabled:
+            start = time.perf_counter()
+            try:
+                return fn(*args)
+            finally:
+                metrics.observe(f'hashing.{fn.__name__}', time.perf_counter() - start)
+        
+        if not self._slots.acquire(blocking=False):
+            metrics.inc('hashing.rejected')
+            logger.warning("Fila de hashing cheia, requisição rejeitada")
+            raise ServiceUnavailableError("Serviço de autenticação sobrecarregado, tente novamente")
+        
+        with self._lock:
+            self._pending += 1
+        
+        start = time.perf_counter()
+        try:
+            future = self._get_pool().submit(fn, *args)
+        except BrokenProcessPool:
+            self._release(fn, start)
+            metrics.inc('hashing.broken_pool')
+            logger.error("Pool de hashing interrompido, será recriado")
+            self.shutdown()
+            raise ServiceUnavailableError("Serviço de autenticação indisponível, tente novamente")
+        except BaseException:
+            self._release(fn, start)
+            raise
+        
+        # A vaga só volta quando o processo termina o job (mesmo após timeout da requisição),
+        # assim o limite de pendências vale para o trabalho que ainda ocupa o pool
+        future.add_done_callback(lambda _: self._release(fn, start))
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            metrics.inc('hashing.timeouts')
+            logger.error(f"Timeout no hashing após {self.timeout}s")
+            raise ServiceUnavailableError("Serviço de autenticação indisponível, tente novamente")
+        except BrokenProcessPool:
+            metrics.inc('hashing.broken_pool')
+            logger.error("Pool de hashing interrompido, será recriado")
+            self.shutdown()
+            raise ServiceUnavailableError("Serviço de autenticação indisponível, tente novamente")
+    
+    def _release(self, fn: Callable[..., Any], start: float):
+        """Devolve a vaga de uma operação concluída"""
+        with self._lock:
+            self._pending -= 1
+        self._slots.release()
+        metrics.observe(f'hashing.{fn.__name__}', time.perf_counter() - start)
+    
+    def map(self, fn: Callable[..., Any], *iterables, chunksize: int = 16) -> List[Any]:
+        """Executa uma operação em lote distribuída pelos processos (importações; fora da fila das requisições)"""
+        if not self.enabled:
+            return list(map(fn, *iterables))
+        
+        start = time.perf_counter()
+        try:
+            return list(self._get_pool().map(fn, *iterables, chunksize=chunksize))
+        except BrokenProcessPool:
+            metrics.inc('hashing.broken_pool')
+            logger.error("Pool de hashing interrompido, será recriado")
+            self.shutdown()
+            raise ServiceUnavailableError("Serviço de hashing indisponível, tente novamente")
+        finally:
+            metrics.observe(f'hashing.{fn.__name__}_batch', time.perf_counter() - start)
+    
+    def shutdown(self):
+        """Finaliza o pool de processos"""
+        with self._lock:
+            if self._pool is not None and self._pool_pid == os.getpid():
+                self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+            self._pool_pid = None
+
+# Instância global do executor de hashing
+hashing_executor = HashingExecutor()
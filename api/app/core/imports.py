@@ -0,0 +1,101 @@
+"""
+Leitura em streaming de arquivos de importação (CSV e NDJSON) e relatório de erros por linha
+"""
+import csv
+import io
+import json
+from dataclasses import dataclass, field
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+# Formato -> extensões aceitas
+IMPORT_FORMATS = {
+    'csv': ('csv',),
+    'ndjson': ('ndjson', 'jsonl'),
+}
+
+def detect_format(filename: Optional[str]) -> Optional[str]:
+    """Formato de importação pela extensão do arquivo"""
+    extension = (filename or '').rsplit('.', 1)[-1].lower()
+    for fmt, extensions in IMPORT_FORMATS.items():
+        if extension in extensions:
+            return fmt
+    return None
+
+def read_rows(source: BinaryIO, fmt: str) -> Iterator[Tuple[int, Optional[Dict[str, Any]], Optional[str]]]:
+    """Linhas do arquivo, uma por vez -> (número da linha, dados, erro de leitura)
+    
+    Campos vazios são omitidos (valem os padrões do schema). Linhas ilegíveis viram erro
+    da própria linha e a leitura continua.
+    """
+    if fmt not in IMPORT_FORMATS:
+        raise ValueError(f"Formato de importação não suportado: {fmt}")
+    
+    text = io.TextIOWrapper(source, encoding='utf-8-sig', newline='' if fmt == 'csv' else None)
+    if fmt == 'csv':
+        reader = csv.DictReader(text)
+        for row in reader:
+            if None in row:
+                yield reader.line_num, None, 'Linha com mais colunas que o cabeçalho'
+                continue
+            yield reader.line_num, {key.strip(): value.strip() for key, value in row.items() if key and value}, None
+        return
+    
+    for line_number, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            data = json.loads(line)
+        except ValueError:
+            yield line_number, None, 'JSON inválido'
+            continue
+        if not isinstance(data, dict):
+            yield line_number, None, 'Linha deve ser um objeto JSON'
+            continue
+        yield line_number, {key: value for key, value in data.items() if value not in (None, '')}, None
+
+@dataclass
+class ImportResult:
+    """Resultado de uma importação, com os erros de cada linha rejeitada"""
+    total: int = 0
+    created: int = 0
+    errors: List[Dict[str, Any]] = field(default_factory=list)
+    
+    @property
+    def rejected(self) -> int:
+        """Linhas não importadas"""
+        return len(self.errors)
+    
+    def add_error(self, line: int, email: Optional[str], messages: List[str]):
+        """Registra a rejeição de uma linha"""
+        self.errors.append({'line': line, 'email': email, 'errors': messages})
+    
+    def sorted_errors(self) -> List[Dict[str, Any]]:
+        """Erros na ordem do arquivo (conflitos da carga são registrados depois da validação)"""
+        return sorted(self.errors, key=lambda error: error['line'])
+    
+    def report_csv(self) -> Iterator[bytes]:
+        """Relatório de erros em CSV (linha, email, erros), em blocos"""
+        errors = self.sorted_errors()
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(['line', 'email', 'errors'])
+        for start in range(0, len(errors), 1000):
+            writer.writerows(
+                [error['line'], error['email'] or '', '; '.join(error['errors'])]
+                for error in errors[start:start + 1000]
+            )
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue().encode('utf-8')
+    
+    def to_dict(self, max_errors: Optional[int] = None) -> dict:
+        """Converte para dicionário (até max_errors erros, os primeiros do arquivo)"""
+        errors = self.sorted_errors()
+        return {
+            'total': self.total,
+            'created': self.created,
+            'rejected': self.rejected,
+            'errors': errors if max_errors is None else errors[:max_errors]
+        }
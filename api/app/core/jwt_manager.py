@@ -0,0 +1,55 @@
+"""
+JWTManager com cache de tokens verificados
+"""
+import hashlib
+import time
+from flask_jwt_extended import JWTManager
+from app.core.cache import LRUCache, MISSING
+from app.core.metrics import metrics
+
+class CachingJWTManager(JWTManager):
+    """JWTManager que guarda claims já verificados por worker (opcional)"""
+    
+    def __init__(self, app=None, add_context_processor: bool = False):
+        self.verified_cache = None
+        super().__init__(app, add_context_processor)
+    
+    def init_app(self, app, add_context_processor: bool = False):
+        """Configura o manager e o cache a partir da aplicação"""
+        super().init_app(app, add_context_processor)
+        
+        if app.config.get('JWT_VERIFIED_CACHE_ENABLED', False):
+            self.verified_cache = LRUCache(maxsize=app.config.get('JWT_VERIFIED_CACHE_SIZE', 4096))
+            metrics.register_gauge('jwt.verified_cache', self.verified_cache.stats)
+        else:
+            self.verified_cache = None
+    
+    @staticmethod
+    def _cache_key(encoded_token: str) -> bytes:
+        """Chave do cache (hash do token, que inclui a assinatura)"""
+        return hashlib.blake2b(encoded_token.encode('utf-8'), digest_size=20).digest()
+    
+    def _decode_jwt_from_config(self, encoded_token: str, csrf_value=None, allow_expired: bool = False) -> dict:
+        """Decodifica o token, reaproveitando claims verificados anteriormente"""
+        cache = self.verified_cache
+        # Tokens com CSRF (cookies) ou decodificação de expirados não passam pelo cache
+        if cache is None or csrf_value is not None or allow_expired:
+            return super()._decode_jwt_from_config(encoded_token, csrf_value, allow_expired)
+        
+        key = self._cache_key(encoded_token)
+        claims = cache.get(key)
+        if claims is MISSING:
+            claims = super()._decode_jwt_from_config(encoded_token)
+            # A entrada expira junto com o token
+            ttl = claims.get('exp', 0) - time.time()
+            if ttl <= 0:
+                return claims
+            cache.set(key, claims, ttl=ttl)
+        
+        # Cópia para que alterações no request não contaminem o cache
+        return dict(claims)
+    
+    def clear_verified_cache(self):
+        """Descarta claims em cache (ex.: após rotação de chaves)"""
+        if self.verified_cache is not None:
+            self.verified_cache.clear()
@@ -0,0 +1,250 @@
+"""
+Chaveiro de assinatura JWT (chaves assimétricas com rotação por kid)
+"""
+import json
+import os
+import secrets
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519, rsa
+from jwt.algorithms import OKPAlgorithm, RSAAlgorithm
+from jwt.exceptions import InvalidTokenError
+from app.core.logging import get_logger
+from app.core.metrics import metrics
+from app.infra.pubsub import pubsub_listener
+
+logger = get_logger(__name__)
+
+KID_TIME_FORMAT = '%Y%m%d%H%M%S'
+
+@dataclass
+class SigningKey:
+    """Par de chaves identificado por kid"""
+    kid: str
+    algorithm: str
+    private_key: object
+    public_key: object
+    created_at: float
+    
+    def to_jwk(self) -> dict:
+        """Chave pública no formato JWK"""
+        if self.algorithm == 'EdDSA':
+            jwk = json.loads(OKPAlgorithm.to_jwk(self.public_key))
+        else:
+            jwk = json.loads(RSAAlgorithm.to_jwk(self.public_key))
+        jwk.update({'kid': self.kid, 'alg': self.algorithm, 'use': 'sig'})
+        return jwk
+
+class KeyRing:
+    """Chaves privadas em disco (<kid>.pem); a mais nova já publicada assina os tokens"""
+    
+    def __init__(self):
+        self.algorithm = 'HS256'
+        self.keys_dir = None
+        self.channel = 'jwt-keys'
+        self.activation_delay = 300
+        self.max_token_lifetime = 2592000
+        self._keys: Dict[str, SigningKey] = {}
+        self._loaded = False
+        self._last_forced_reload = 0.0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+    
+    def init_app(self, app):
+        """Configura o chaveiro a partir da aplicação"""
+        self.algorithm = app.config.get('JWT_ALGORITHM', 'HS256')
+        self.keys_dir = app.config.get('JWT_KEYS_DIR') or os.path.join(app.instance_path, 'jwt_keys')
+        self.channel = app.config.get('JWT_KEYS_CHANNEL', 'jwt-keys')
+        self.activation_delay = app.config.get('JWT_KEY_ACTIVATION_SECONDS', 300)
+        self.max_token_lifetime = int(max(
+            app.config['JWT_ACCESS_TOKEN_EXPIRES'], app.config['JWT_REFRESH_TOKEN_EXPIRES']
+        ).total_seconds())
+        self._keys = {}
+        self._loaded = False
+        
+        if self.enabled:
+            pubsub_listener.subscribe(self.channel, lambda _: self.reload())
+            pubsub_listener.add_periodic(app.config.get('JWT_KEYS_RELOAD_SECONDS', 60), self.reload)
+            metrics.register_gauge('jwt.keys', lambda: len(self._keys))
+    
+    @property
+    def enabled(self) -> bool:
+        """Indica se a assinatura é assimétrica (HS* usa JWT_SECRET_KEY)"""
+        return not self.algorithm.startswith('HS')
+    
+    @staticmethod
+    def _kid_created_at(kid: str) -> float:
+        """Momento de criação codificado no kid"""
+        try:
+            return datetime.strptime(kid.split('-', 1)[0], KID_TIME_FORMAT).replace(tzinfo=timezone.utc).timestamp()
+        except ValueError:
+            return 0.0
+    
+    def _load_key(self, path: str) -> Optional[SigningKey]:
+        """Lê chave privada PEM"""
+        kid = os.path.splitext(os.path.basename(path))[0]
+        with open(path, 'rb') as key_file:
+            private_key = serialization.load_pem_private_key(key_file.read(), password=None)
+        
+        if isinstance(private_key, ed25519.Ed25519PrivateKey):
+            algorithm = 'EdDSA'
+        elif isinstance(private_key, rsa.RSAPrivateKey):
+            algorithm = self.algorithm if self.algorithm.startswith(('RS', 'PS')) else 'RS256'
+        else:
+            logger.warning(f"Tipo de chave JWT não suportado ignorado: {kid}")
+            return None
+        
+        return SigningKey(
+            kid=kid,
+            algorithm=algorithm,
+            private_key=private_key,
+            public_key=private_key.public_key(),
+            created_at=self._kid_created_at(kid)
+        )
+    
+    def reload(self):
+        """Recarrega as chaves do diretório"""
+        if not self.enabled:
+            return
+        
+        keys = {}
+        if os.path.isdir(self.keys_dir):
+            for name in sorted(os.listdir(self.keys_dir)):
+                if not name.endswith('.pem'):
+                    continue
+                try:
+                    key = self._load_key(os.path.join(self.keys_dir, name))
+                except (OSError, ValueError) as e:
+                    logger.error(f"Erro ao carregar chave JWT {name}: {str(e)}")
+                    continue
+                if key is not None:
+                    keys[key.kid] = key
+        
+        with self._lock:
+            removed = set(self._keys) - set(keys)
+            self._keys = keys
+            self._loaded = True
+        
+        if removed:
+            # Tokens de chaves removidas não podem continuar válidos pelo cache
+            from app import jwt
+            jwt.clear_verified_cache()
+        metrics.inc('jwt.keys_reloads')
+    
+    def _ensure_loaded(self):
+        """Carrega as chaves no primeiro uso (gera uma se o diretório estiver vazio)"""
+        if self._loaded:
+            return
+        self.reload()
+        if not self._signing_candidates():
+            logger.warning(f"Nenhuma chave JWT encontrada em {self.keys_dir}, gerando uma nova")
+            self.generate()
+    
+    def _signing_candidates(self) -> List[SigningKey]:
+        """Chaves do algoritmo configurado, da mais antiga para a mais nova"""
+        return sorted(
+            (key for key in self._keys.values() if key.algorithm == self.algorithm),
+            key=lambda key: (key.created_at, key.kid)
+        )
+    
+    def active_key(self) -> SigningKey:
+        """Chave de assinatura atual (a mais nova publicada há mais de activation_delay)"""
+        self._ensure_loaded()
+        candidates = self._signing_candidates()
+        if not candidates:
+            raise RuntimeError(f"Nenhuma chave {self.algorithm} disponível em {self.keys_dir}")
+        
+        published_before = time.time() - self.activation_delay
+        published = [key for key in candidates if key.created_at <= published_before]
+        # Sem chave publicada ainda (primeira chave), usa a mais nova
+        return published[-1] if published else candidates[-1]
+    
+    def signing_headers(self) -> dict:
+        """Headers do token; fixa a chave usada na assinatura logo em seguida"""
+        key = self.active_key()
+        self._local.signing_key = key
+        return {'kid': key.kid}
+    
+    def signing_key(self):
+        """Chave privada para assinar (a mesma escolhida em signing_headers)"""
+        key = getattr(self._local, 'signing_key', None) or self.active_key()
+        self._local.signing_key = None
+        return key.private_key
+    
+    def verification_key(self, kid: Optional[str]):
+        """Chave pública para o kid do token"""
+        self._ensure_loaded()
+        key = self._keys.get(kid)
+        
+        # kid desconhecido: pode ser uma chave recém-criada por outro worker
+        if key is None and kid and time.monotonic() - self._last_forced_reload > 5:
+            self._last_forced_reload = time.monotonic()
+            self.reload()
+            key = self._keys.get(kid)
+        
+        if key is None:
+            metrics.inc('jwt.unknown_kid')
+            raise InvalidTokenError("Chave de assinatura desconhecida")
+        return key.public_key
+    
+    def jwks(self) -> dict:
+        """Chaves públicas (incluindo as ainda não ativas e as aposentadas)"""
+        self._ensure_loaded()
+        keys = sorted(self._keys.values(), key=lambda key: (key.created_at, key.kid))
+        return {'keys': [key.to_jwk() for key in keys]}
+    
+    def generate(self, algorithm: Optional[str] = None) -> SigningKey:
+        """Gera nova chave e grava no diretório"""
+        algorithm = algorithm or self.algorithm
+        if algorithm == 'EdDSA':
+            private_key = ed25519.Ed25519PrivateKey.generate()
+        elif algorithm.startswith(('RS', 'PS')):
+            private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        else:
+            raise ValueError(f"Algoritmo sem suporte a chaves assimétricas: {algorithm}")
+        
+        kid = f"{datetime.now(timezone.utc).strftime(KID_TIME_FORMAT)}-{secrets.token_hex(4)}"
+        pem = private_key.private_bytes(
+            encoding=serialization.Encoding.PEM,
+            format=serialization.PrivateFormat.PKCS8,
+            encryption_algorithm=serialization.NoEncryption()
+        )
+        
+        os.makedirs(self.keys_dir, mode=0o700, exist_ok=True)
+        path = os.path.join(self.keys_dir, f'{kid}.pem')
+        temp_path = f'{path}.tmp'
+        fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, 'wb') as key_file:
+            key_file.write(pem)
+        os.replace(temp_path, path)
+        
+        self.reload()
+        pubsub_listener.publish(self.channel, kid)
+        logger.info(f"Chave JWT gerada: {kid} ({algorithm})")
+        return self._keys[kid]
+    
+    def prune(self) -> List[str]:
+        """Remove chaves substituídas há mais tempo que a vida máxima dos tokens"""
+        self._ensure_loaded()
+        keys = sorted(self._keys.values(), key=lambda key: (key.created_at, key.kid))
+        now = time.time()
+        removed = []
+        
+        for key, successor in zip(keys, keys[1:]):
+            retired_at = successor.created_at + self.activation_delay
+            if retired_at + self.max_token_lifetime < now:
+                os.remove(os.path.join(self.keys_dir, f'{key.kid}.pem'))
+                removed.append(key.kid)
+        
+        if removed:
+            self.reload()
+            pubsub_listener.publish(self.channel, 'prune')
+            logger.info(f"Chaves JWT removidas: {', '.join(removed)}")
+        return removed
+
+# Instância global do chaveiro
+keyring = KeyRing()
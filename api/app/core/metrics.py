@@ -0,0 +1,85 @@
+"""
+Métricas em processo da aplicação
+"""
+import threading
+from typing import Any, Callable, Dict
+
+class TimingStats:
+    """Agregado simples de latências (em segundos)"""
+    
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = 0.0
+        self.last = 0.0
+    
+    def observe(self, seconds: float):
+        """Registra uma observação"""
+        self.count += 1
+        self.total += seconds
+        self.last = seconds
+        if self.min is None or seconds < self.min:
+            self.min = seconds
+        if seconds > self.max:
+            self.max = seconds
+    
+    def to_dict(self):
+        """Converte para dicionário (valores em milissegundos)"""
+        return {
+            'count': self.count,
+            'avg_ms': round(self.total / self.count * 1000, 3) if self.count else 0.0,
+            'min_ms': round((self.min or 0.0) * 1000, 3),
+            'max_ms': round(self.max * 1000, 3),
+            'last_ms': round(self.last * 1000, 3)
+        }
+
+class MetricsRegistry:
+    """Registro de contadores, gauges e latências por worker"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, int] = {}
+        self._gauges: Dict[str, Callable[[], Any]] = {}
+        self._timings: Dict[str, TimingStats] = {}
+    
+    def inc(self, name: str, value: int = 1):
+        """Incrementa um contador"""
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+    
+    def observe(self, name: str, seconds: float):
+        """Registra uma latência"""
+        with self._lock:
+            stats = self._timings.get(name)
+            if stats is None:
+                stats = self._timings[name] = TimingStats()
+            stats.observe(seconds)
+    
+    def register_gauge(self, name: str, callback: Callable[[], Any]):
+        """Registra um gauge calculado no momento da leitura"""
+        with self._lock:
+            self._gauges[name] = callback
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """Obtém uma cópia de todas as métricas"""
+        with self._lock:
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+            timings = {name: stats.to_dict() for name, stats in self._timings.items()}
+        
+        gauge_values = {}
+        for name, callback in gauges.items():
+            try:
+                gauge_values[name] = callback()
+            except Exception:
+                gauge_values[name] = None
+        
+        return {
+            'counters': counters,
+            'gauges': gauge_values,
+            'timings': timings
+        }
+
+# Instância global de métricas
+metrics = MetricsRegistry()
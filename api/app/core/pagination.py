@@ -1,8 +1,14 @@
 """
 Utilitários de paginação
 """
-from flask import request
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Any, List, Optional
+from flask import current_app, request
+from itsdangerous import BadSignature, URLSafeSerializer
 from math import ceil
+from sqlalchemy import asc, desc, tuple_
+from app.core.exceptions import ValidationError
 
 class Pagination:
     """Classe para paginação"""
@@ -66,3 +72,99 @@ def paginate_list(items, page=None, per_page=None):
     paginated_items = items[start:end]
     
     return Pagination(page=page, per_page=per_page, total=total), paginated_items
+
+@dataclass
+class KeysetPage:
+    """Página obtida por cursor"""
+    items: List[Any]
+    per_page: int
+    has_prev: bool
+    has_next: bool
+    prev_cursor: Optional[str]
+    next_cursor: Optional[str]
+
+class KeysetPaginator:
+    """Paginação por cursor (keyset): WHERE (coluna, id) > (:valor, :id) ORDER BY coluna, id LIMIT n + 1
+    
+    O custo de cada página não depende da sua posição (sem OFFSET nem COUNT) e inserções
+    ou remoções entre requisições não duplicam nem pulam linhas.
+    """
+    
+    salt = 'keyset-pagination'
+    
+    def __init__(self, sort_column, tie_breaker, sort_order: str = 'asc', per_page: int = 10):
+        self.sort_column = sort_column
+        self.tie_breaker = tie_breaker
+        self.descending = sort_order.lower() == 'desc'
+        self.per_page = per_page
+        # Cursor só vale para a mesma ordenação em que foi gerado
+        self.sort_key = f"{sort_column.key}:{'desc' if self.descending else 'asc'}"
+    
+    def _serializer(self) -> URLSafeSerializer:
+        """Serializador assinado com a SECRET_KEY (cursor opaco e à prova de adulteração)"""
+        return URLSafeSerializer(current_app.config['SECRET_KEY'], salt=self.salt)
+    
+    def encode_cursor(self, item, direction: str) -> str:
+        """Gera o cursor apontando para a linha (direction: next/prev)"""
+        value = getattr(item, self.sort_column.key)
+        if isinstance(value, (datetime, date)):
+            value = {'dt': value.isoformat()}
+        return self._serializer().dumps([self.sort_key, direction, value, getattr(item, self.tie_breaker.key)])
+    
+    def decode_cursor(self, cursor: str):
+        """Valida o cursor e retorna (direction, valor, id)"""
+        try:
+            sort_key, direction, value, last_id = self._serializer().loads(cursor)
+        except (BadSignature, TypeError, ValueError):
+            raise ValidationError("Cursor de paginação inválido")
+        if sort_key != self.sort_key or direction not in ('next', 'prev'):
+            raise ValidationError("Cursor de paginação não corresponde à ordenação solicitada")
+        if isinstance(value, dict):
+            value = datetime.fromisoformat(value['dt'])
+        return direction, value, last_id
+    
+    def _keys(self):
+        """Colunas da chave de ordenação (sem repetir o desempate)"""
+        if self.sort_column.key == self.tie_breaker.key:
+            return [self.tie_breaker]
+        return [self.sort_column, self.tie_breaker]
+    
+    def paginate(self, query, cursor: Optional[str] = None) -> KeysetPage:
+        """Executa a query (Query do ORM) a partir do cursor; sem cursor retorna a primeira página"""
+        keys = self._keys()
+        backwards = False
+        if cursor:
+            direction, value, last_id = self.decode_cursor(cursor)
+            backwards = direction == 'prev'
+            bound = tuple_(value, last_id) if len(keys) == 2 else last_id
+            row = tuple_(*keys) if len(keys) == 2 else keys[0]
+            # Anda no sentido da ordenação para "next" e no sentido oposto para "prev"
+            query = query.filter(row < bound if self.descending != backwards else row > bound)
+        
+        order = desc if self.descending != backwards else asc
+        items = query.order_by(None).order_by(*[order(key) for key in keys]).limit(self.per_page + 1).all()
+        
+        more = len(items) > self.per_page
+        items = items[:self.per_page]
+        if backwards:
+            items.reverse()
+            has_prev, has_next = more, True
+        else:
+            has_prev, has_next = bool(cursor), more
+        
+        return KeysetPage(
+            items=items,
+            per_page=self.per_page,
+            has_prev=has_prev and bool(items),
+            has_next=has_next and bool(items),
+            prev_cursor=self.encode_cursor(items[0], 'prev') if has_prev and items else None,
+            next_cursor=self.encode_cursor(items[-1], 'next') if has_next and items else None
+        )
+
+def keyset_paginate_query(query, sort_column, tie_breaker, sort_order='asc', per_page=None, cursor=None):
+    """Pagina uma query do SQLAlchemy por cursor"""
+    if per_page is None:
+        _, per_page = get_pagination_params()
+    if cursor is None:
+        cursor = request.args.get('cursor')
+    return KeysetPaginator(sort_column, tie_breaker, sort_order, per_page).paginate(query, cursor)
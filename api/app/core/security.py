@@ -1,40 +1,205 @@
 """
 Utilitários de segurança
 """
-import bcrypt
+import statistics
+import time
+from abc import ABC, abstractmethod
+from functools import wraps
 from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple, Type
 from flask_jwt_extended import JWTManager, create_access_token, create_refresh_token
 from flask import current_app
+from app import jwt
 from app.domain.models import User
+from app.core.hashing import hashing_executor, bcrypt_hash, bcrypt_verify
+
+class PasswordHasher(ABC):
+    """Interface para algoritmos de hash de senha"""
+    algorithm: str = ''
+    cost_config_key: str = ''
+    cost_range: Tuple[int, int] = (0, 0)
+    
+    def __init__(self, cost: int):
+        self.cost = cost
+    
+    @classmethod
+    @abstractmethod
+    def from_config(cls, config) -> 'PasswordHasher':
+        """Cria hasher com o custo configurado"""
+        raise NotImplementedError
+    
+    @abstractmethod
+    def hash(self, password: str) -> str:
+        """Gera hash da senha"""
+        raise NotImplementedError
+    
+    def hash_many(self, passwords: List[str]) -> List[str]:
+        """Gera hashes de várias senhas (importações), na ordem recebida"""
+        return [self.hash(password) for password in passwords]
+    
+    @abstractmethod
+    def verify(self, password: str, password_hash: str) -> bool:
+        """Verifica senha contra o hash"""
+        raise NotImplementedError
+    
+    @abstractmethod
+    def identify(self, password_hash: str) -> bool:
+        """Verifica se o hash foi gerado por este algoritmo"""
+        raise NotImplementedError
+    
+    @abstractmethod
+    def cost_of(self, password_hash: str) -> Optional[int]:
+        """Extrai o custo usado no hash"""
+        raise NotImplementedError
+    
+    def needs_rehash(self, password_hash: str) -> bool:
+        """Verifica se o hash difere da política atual"""
+        return not self.identify(password_hash) or self.cost_of(password_hash) != self.cost
+
+class BcryptHasher(PasswordHasher):
+    """Hasher bcrypt"""
+    algorithm = 'bcrypt'
+    cost_config_key = 'BCRYPT_ROUNDS'
+    cost_range = (4, 16)
+    prefixes = ('$2a$', '$2b$', '$2y$')
+    
+    @classmethod
+    def from_config(cls, config) -> 'BcryptHasher':
+        """Cria hasher bcrypt com BCRYPT_ROUNDS"""
+        return cls(config.get('BCRYPT_ROUNDS', 12))
+    
+    def hash(self, password: str) -> str:
+        """Gera hash bcrypt"""
+        return hashing_executor.run(bcrypt_hash, password, self.cost)
+    
+    def hash_many(self, passwords: List[str]) -> List[str]:
+        """Gera hashes bcrypt em paralelo, distribuídos pelos processos do pool"""
+        return hashing_executor.map(bcrypt_hash, passwords, [self.cost] * len(passwords))
+    
+    def verify(self, password: str, password_hash: str) -> bool:
+        """Verifica hash bcrypt"""
+        try:
+            return hashing_executor.run(bcrypt_verify, password, password_hash)
+        except ValueError:
+            return False
+    
+    def identify(self, password_hash: str) -> bool:
+        """Identifica hashes bcrypt pelo prefixo"""
+        return bool(password_hash) and password_hash.startswith(self.prefixes)
+    
+    def cost_of(self, password_hash: str) -> Optional[int]:
+        """Extrai o número de rounds do hash"""
+        try:
+            return int(password_hash.split('$')[2])
+        except (IndexError, ValueError):
+            return None
+
+# Algoritmos disponíveis (argon2/scrypt podem ser registrados aqui)
+PASSWORD_HASHERS: Dict[str, Type[PasswordHasher]] = {
+    'bcrypt': BcryptHasher,
+}
+
+def get_password_hasher() -> PasswordHasher:
+    """Obtém o hasher da política atual"""
+    algorithm = current_app.config.get('PASSWORD_HASHER', 'bcrypt')
+    return PASSWORD_HASHERS[algorithm].from_config(current_app.config)
+
+def identify_hasher(password_hash: str) -> Optional[PasswordHasher]:
+    """Obtém o hasher capaz de verificar um hash existente"""
+    current = get_password_hasher()
+    if current.identify(password_hash):
+        return current
+    for hasher_class in PASSWORD_HASHERS.values():
+        hasher = hasher_class.from_config(current_app.config)
+        if hasher.identify(password_hash):
+            return hasher
+    return None
 
 def hash_password(password: str) -> str:
-    """Hash de senha usando bcrypt"""
-    salt = bcrypt.gensalt(rounds=current_app.config.get('BCRYPT_ROUNDS', 12))
-    return bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
+    """Hash de senha com o algoritmo atual (executado no pool de hashing)"""
+    return get_password_hasher().hash(password)
+
+def hash_passwords(passwords: List[str]) -> List[str]:
+    """Hashes de várias senhas com o algoritmo atual (em paralelo no pool de hashing)"""
+    return get_password_hasher().hash_many(passwords)
 
 def verify_password(password: str, password_hash: str) -> bool:
-    """Verifica senha usando bcrypt"""
-    return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8'))
+    """Verifica senha com o algoritmo do hash (executado no pool de hashing)"""
+    hasher = identify_hasher(password_hash)
+    if hasher is None:
+        return False
+    return hasher.verify(password, password_hash)
 
-def create_tokens(user: User) -> dict:
-    """Cria access e refresh tokens para o usuário"""
-    # Dados do usuário para o token
-    user_data = {
+def password_needs_rehash(password_hash: str) -> bool:
+    """Verifica se o hash armazenado difere da política atual (algoritmo ou custo)"""
+    return get_password_hasher().needs_rehash(password_hash)
+
+def calibrate_hasher(hasher_class: Type[PasswordHasher], target_ms: float,
+                     samples: int = 3) -> Tuple[int, List[Tuple[int, float]]]:
+    """Mede o hasher no host e escolhe o maior custo dentro da latência alvo"""
+    password = 'calibracao-de-hash-Senha123'
+    min_cost, max_cost = hasher_class.cost_range
+    chosen = min_cost
+    timings = []
+    
+    for cost in range(min_cost, max_cost + 1):
+        hasher = hasher_class(cost)
+        password_hash = hasher.hash(password)
+        
+        durations = []
+        for _ in range(samples):
+            start = time.perf_counter()
+            hasher.verify(password, password_hash)
+            durations.append((time.perf_counter() - start) * 1000)
+        
+        median_ms = statistics.median(durations)
+        timings.append((cost, median_ms))
+        
+        if median_ms > target_ms:
+            break
+        chosen = cost
+    
+    return chosen, timings
+
+def build_token_claims(user: User) -> dict:
+    """Claims adicionais dos tokens do usuário"""
+    from app.infra.token_store import epoch_store
+    
+    return {
         'user_id': user.id,
         'email': user.email,
         'role': user.role,
-        'is_active': user.is_active
+        'is_active': user.is_active,
+        # O epoch do registro pode estar à frente do store: a propagação só ocorre após o commit
+        'token_epoch': max(user.token_epoch or 0, epoch_store.get(user.id))
     }
+
+def is_token_revoked(jwt_payload: dict) -> bool:
+    """Verifica revogação do token (JTI na blacklist ou epoch do usuário superado)"""
+    from app.infra.token_store import revocation_store, epoch_store
+    
+    if revocation_store.is_revoked(jwt_payload.get('jti')):
+        return True
+    
+    user_id = jwt_payload.get('user_id', jwt_payload.get('sub'))
+    if user_id is None:
+        return False
+    return jwt_payload.get('token_epoch', 0) < epoch_store.get(user_id)
+
+def create_tokens(user: User) -> dict:
+    """Cria access e refresh tokens para o usuário"""
+    # Dados do usuário para o token
+    user_data = build_token_claims(user)
     
     # Criar tokens
     access_token = create_access_token(
-        identity=user.id,
+        identity=str(user.id),
         additional_claims=user_data,
         expires_delta=current_app.config['JWT_ACCESS_TOKEN_EXPIRES']
     )
     
     refresh_token = create_refresh_token(
-        identity=user.id,
+        identity=str(user.id),
         additional_claims=user_data,
         expires_delta=current_app.config['JWT_REFRESH_TOKEN_EXPIRES']
     )
@@ -49,11 +214,28 @@ def create_tokens(user: User) -> dict:
 def jwt_config(app):
     """Configura JWT para a aplicação"""
     
+    from flask_jwt_extended.config import config as jwt_settings
+    from app.core.keyring import keyring
+    
+    @jwt.additional_headers_loader
+    def add_key_id(identity):
+        """Inclui o kid da chave de assinatura no header"""
+        return keyring.signing_headers() if keyring.enabled else {}
+    
+    @jwt.encode_key_loader
+    def load_encode_key(identity):
+        """Chave privada ativa (ou JWT_SECRET_KEY em HS*)"""
+        return keyring.signing_key() if keyring.enabled else jwt_settings.encode_key
+    
+    @jwt.decode_key_loader
+    def load_decode_key(jwt_header, jwt_payload):
+        """Chave pública do kid do token (ou JWT_SECRET_KEY em HS*)"""
+        return keyring.verification_key(jwt_header.get('kid')) if keyring.enabled else jwt_settings.decode_key
+    
     @jwt.token_in_blocklist_loader
     def check_if_token_revoked(jwt_header, jwt_payload):
-        """Verifica se o token está na blacklist"""
-        # Implementar verificação de blacklist se necessário
-        return False
+        """Verifica se o token está na blacklist ou foi revogado pelo epoch do usuário"""
+        return is_token_revoked(jwt_payload)
     
     @jwt.expired_token_loader
     def expired_token_callback(jwt_header, jwt_payload):
@@ -103,6 +285,7 @@ def jwt_config(app):
 def require_roles(*roles):
     """Decorator para verificar roles do usuário"""
     def decorator(f):
+        @wraps(f)
         def decorated_function(*args, **kwargs):
             from flask_jwt_extended import get_jwt_identity, get_jwt
             from app.core.exceptions import AuthorizationError
@@ -0,0 +1,60 @@
+"""
+Serialização JSON direta de linhas do banco
+"""
+from json.encoder import encode_basestring_ascii
+from typing import Iterable, Sequence, Tuple
+
+# Expressão que converte o valor `v` em JSON, por tipo (None vira null)
+ENCODERS = {
+    'int': "('null' if {v} is None else str(int({v})))",
+    'str': "('null' if {v} is None else _string({v}))",
+    'bool': "('null' if {v} is None else ('true' if {v} else 'false'))",
+    'datetime': "('null' if {v} is None else '\"' + {v}.isoformat() + '\"')",
+}
+
+class RowSerializer:
+    """Serializa linhas (Row/tupla na ordem dos campos) em JSON, com código gerado uma vez por formato
+    
+    Evita a hidratação do ORM, DTOs e dicionários intermediários em respostas de listagem.
+    Campos em `omit_empty` ficam fora do objeto quando vazios (como nos `to_dict` dos DTOs).
+    """
+    
+    def __init__(self, fields: Sequence[Tuple[str, str]], omit_empty: Iterable[str] = (),
+                 omit_none: Iterable[str] = ()):
+        self.fields = [name for name, _ in fields]
+        self.kinds = [kind for _, kind in fields]
+        self._serialize = self._compile(fields, set(omit_empty), set(omit_none))
+    
+    @staticmethod
+    def _compile(fields, omit_empty, omit_none):
+        """Gera a função de serialização de uma linha"""
+        lines = ['def serialize(row):']
+        lines.append(f"    {', '.join(f'v{i}' for i in range(len(fields)))}{',' if len(fields) == 1 else ''} = row")
+        lines.append('    parts = []')
+        for index, (name, kind) in enumerate(fields):
+            if kind not in ENCODERS:
+                raise ValueError(f"Tipo de campo não suportado: {kind}")
+            value = f'v{index}'
+            append = f"parts.append({encode_basestring_ascii(name)!r} + ':' + {ENCODERS[kind].format(v=value)})"
+            if name in omit_empty:
+                lines.append(f'    if {value}:')
+                lines.append(f'        {append}')
+            elif name in omit_none:
+                lines.append(f'    if {value} is not None:')
+                lines.append(f'        {append}')
+            else:
+                lines.append(f'    {append}')
+        lines.append("    return '{' + ','.join(parts) + '}'")
+        
+        namespace = {'_string': encode_basestring_ascii}
+        exec(compile('\n'.join(lines), f'<RowSerializer {",".join(name for name, _ in fields)}>', 'exec'), namespace)
+        return namespace['serialize']
+    
+    def serialize(self, row) -> str:
+        """JSON de uma linha"""
+        return self._serialize(row)
+    
+    def serialize_many(self, rows: Iterable) -> bytes:
+        """Array JSON das linhas, já em bytes"""
+        serialize = self._serialize
+        return ('[' + ','.join([serialize(row) for row in rows]) + ']').encode('ascii')
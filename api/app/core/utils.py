@@ -2,6 +2,7 @@
 Utilitários gerais da aplicação
 """
 import re
+import unicodedata
 from datetime import datetime
 from typing import Any, Dict, List, Optional
 from flask import current_app
@@ -45,6 +46,15 @@ def sanitize_string(text: str) -> str:
     
     return text
 
+def normalize_search_text(text: str) -> str:
+    """Normaliza texto para busca: minúsculas, sem acentos e espaços únicos"""
+    if not text:
+        return ""
+    
+    text = unicodedata.normalize('NFKD', text.lower())
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return re.sub(r'\s+', ' ', text).strip()
+
 def format_datetime(dt: datetime, format_str: str = None) -> str:
     """Formata datetime para string"""
     if not dt:
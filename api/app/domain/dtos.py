@@ -2,9 +2,10 @@
 Data Transfer Objects (DTOs) da aplicação
 """
 from dataclasses import dataclass
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Union
 from datetime import datetime
 from enum import Enum
+from app.core.serialization import RowSerializer
 
 class UserRole(str, Enum):
     """Roles de usuário"""
@@ -73,6 +74,21 @@ class UserDTO:
         
         return data
 
+# Mesmo formato de UserDTO.to_dict (com dados sensíveis), direto das colunas selecionadas
+user_row_serializer = RowSerializer([
+    ('id', 'int'),
+    ('email', 'str'),
+    ('name', 'str'),
+    ('role', 'str'),
+    ('status', 'str'),
+    ('is_active', 'bool'),
+    ('created_at', 'datetime'),
+    ('updated_at', 'datetime'),
+    ('last_login', 'datetime'),
+    ('login_count', 'int'),
+    ('last_ip', 'str'),
+], omit_empty=('last_login', 'last_ip'), omit_none=('login_count',))
+
 @dataclass
 class LoginRequestDTO:
     """DTO para requisição de login"""
@@ -94,13 +110,30 @@ class ChangePasswordRequestDTO:
     new_password: str
     confirm_password: str
 
+@dataclass
+class CreateUserRequestDTO:
+    """DTO para criação de usuário (admin)"""
+    email: str
+    password: str
+    name: str
+    role: UserRole = UserRole.USER
+    status: UserStatus = UserStatus.ACTIVE
+
+@dataclass
+class UpdateUserRequestDTO:
+    """DTO para atualização de usuário (admin)"""
+    email: Optional[str] = None
+    name: Optional[str] = None
+    role: Optional[UserRole] = None
+    status: Optional[UserStatus] = None
+
 @dataclass
 class TokenResponseDTO:
     """DTO para resposta de token"""
     access_token: str
     refresh_token: str
-    token_type: str = "Bearer"
     expires_in: int
+    token_type: str = "Bearer"
 
 @dataclass
 class UserQueryDTO:
@@ -112,6 +145,8 @@ class UserQueryDTO:
     status: Optional[UserStatus] = None
     sort_by: str = "created_at"
     sort_order: str = "desc"
+    cursor: Optional[str] = None  # paginação por cursor quando presente ("" = primeira página)
+    count_mode: str = "exact"  # exact, estimated ou none
 
 @dataclass
 class UserStatsDTO:
@@ -149,12 +184,13 @@ class PaginationDTO:
     """DTO para paginação"""
     page: int
     per_page: int
-    total: int
-    pages: int
+    total: Optional[int]
+    pages: Optional[int]
     has_prev: bool
     has_next: bool
     prev_num: Optional[int]
     next_num: Optional[int]
+    total_is_exact: bool = True
     
     def to_dict(self):
         """Converte para dicionário"""
@@ -162,6 +198,7 @@ class PaginationDTO:
             'page': self.page,
             'per_page': self.per_page,
             'total': self.total,
+            'total_is_exact': self.total_is_exact,
             'pages': self.pages,
             'has_prev': self.has_prev,
             'has_next': self.has_next,
@@ -169,11 +206,30 @@ class PaginationDTO:
             'next_num': self.next_num
         }
 
+@dataclass
+class CursorPaginationDTO:
+    """DTO para paginação por cursor"""
+    per_page: int
+    has_prev: bool
+    has_next: bool
+    prev_cursor: Optional[str]
+    next_cursor: Optional[str]
+    
+    def to_dict(self):
+        """Converte para dicionário"""
+        return {
+            'per_page': self.per_page,
+            'has_prev': self.has_prev,
+            'has_next': self.has_next,
+            'prev_cursor': self.prev_cursor,
+            'next_cursor': self.next_cursor
+        }
+
 @dataclass
 class UserListResponseDTO:
     """DTO para resposta de lista de usuários"""
     users: List[UserDTO]
-    pagination: PaginationDTO
+    pagination: Union[PaginationDTO, CursorPaginationDTO]
     
     def to_dict(self):
         """Converte para dicionário"""
@@ -3,6 +3,7 @@ Modelos de domínio da aplicação
 """
 from datetime import datetime
 from app import db
+from app.infra.unit_of_work import unit_of_work
 from sqlalchemy import event
 from sqlalchemy.dialects.postgresql import UUID
 import uuid
@@ -32,6 +33,10 @@ class BaseModel(db.Model):
 class User(BaseModel):
     """Modelo de usuário (Devs/Admins)"""
     __tablename__ = 'users'
+    __table_args__ = (
+        # (created_at, id): intervalos das estatísticas e paginação por cursor na ordenação padrão
+        db.Index('ix_users_created_at', 'created_at', 'id'),
+    )
     
     # Campos obrigatórios
     email = db.Column(db.String(255), unique=True, nullable=False, index=True)
@@ -48,6 +53,9 @@ class User(BaseModel):
     login_count = db.Column(db.Integer, default=0, nullable=False)
     last_ip = db.Column(db.String(45), nullable=True)  # IPv6 support
     
+    # Epoch dos tokens: tokens emitidos com epoch menor estão revogados
+    token_epoch = db.Column(db.Integer, default=0, nullable=False)
+    
     # Relacionamentos
     # Adicionar relacionamentos aqui conforme necessário
     
@@ -109,7 +117,19 @@ class User(BaseModel):
         self.login_count += 1
         if ip_address:
             self.last_ip = ip_address
-        db.session.commit()
+        unit_of_work.commit()
+
+class UserCounter(db.Model):
+    """Contagem de usuários por role/status/is_active (mantida por triggers, ver app/infra/ddl.py)"""
+    __tablename__ = 'user_counters'
+    
+    role = db.Column(db.String(50), primary_key=True)
+    status = db.Column(db.String(50), primary_key=True)
+    is_active = db.Column(db.Boolean, primary_key=True)
+    count = db.Column(db.BigInteger, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<UserCounter {self.role}/{self.status}/{self.is_active}={self.count}>'
 
 class BlacklistedToken(db.Model):
     """Modelo para tokens na blacklist"""
@@ -120,7 +140,7 @@ class BlacklistedToken(db.Model):
     token_type = db.Column(db.String(10), nullable=False)  # access ou refresh
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     revoked_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
-    expires_at = db.Column(db.DateTime, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
     
     # Relacionamento
     user = db.relationship('User', backref='blacklisted_tokens')
@@ -146,9 +166,12 @@ class BlacklistedToken(db.Model):
             expires_at=expires_at
         )
         db.session.add(token)
-        db.session.commit()
+        unit_of_work.commit()
         return token
 
+# DDL dos triggers de contadores (aplicada após create_all)
+import app.infra.ddl  # noqa: E402,F401
+
 # Event listeners
 @event.listens_for(User, 'before_insert')
 def set_user_defaults(mapper, connection, target):
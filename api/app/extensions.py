@@ -1,38 +1,16 @@
 """
 Extensões Flask
 """
-from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
-from flask_jwt_extended import JWTManager
-from flask_marshmallow import Marshmallow
-from celery import Celery
+# As instâncias são as mesmas usadas pela aplicação (criadas em app/__init__.py e app/infra/tasks.py);
+# uma segunda instância de SQLAlchemy aqui teria outro engine e outro pool, sem a configuração da aplicação
+from app import db, migrate, jwt, ma
 
-# Inicializar extensões
-db = SQLAlchemy()
-migrate = Migrate()
-jwt = JWTManager()
-ma = Marshmallow()
+# celery/init_celery ficam fora de __all__: `import *` não deve carregar o módulo de tarefas
+__all__ = ['db', 'migrate', 'jwt', 'ma']
 
-# Celery
-celery = Celery()
-
-def init_celery(app):
-    """Inicializar Celery com a aplicação Flask"""
-    celery.conf.update(
-        broker_url=app.config['CELERY_BROKER_URL'],
-        result_backend=app.config['CELERY_RESULT_BACKEND'],
-        task_serializer='json',
-        accept_content=['json'],
-        result_serializer='json',
-        timezone='UTC',
-        enable_utc=True,
-    )
-    
-    # Contexto da aplicação para tarefas
-    class ContextTask(celery.Task):
-        def __call__(self, *args, **kwargs):
-            with app.app_context():
-                return self.run(*args, **kwargs)
-    
-    celery.Task = ContextTask
-    return celery
+def __getattr__(name):
+    """Celery é importado sob demanda: o módulo de tarefas precisa do contexto da aplicação"""
+    if name in ('celery', 'init_celery'):
+        from app.infra import tasks
+        return getattr(tasks, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,265 @@
+"""
+Índice em memória para autocomplete de usuários
+"""
+import json
+import os
+import socket
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session
+from app import db
+from app.core.logging import get_logger
+from app.core.metrics import metrics
+from app.core.utils import normalize_search_text
+from app.domain.models import User
+from app.infra.pubsub import pubsub_listener
+
+logger = get_logger(__name__)
+
+class AutocompleteIndex:
+    """Prefixos de emails e nomes (e de cada palavra do nome) em arrays ordenados, consultados com bisect
+    
+    Cada worker monta o índice a partir de uma leitura em streaming de users e o mantém com os
+    commits do próprio worker; as alterações são difundidas por pub/sub aos demais workers.
+    Escritas por UPDATE/DELETE ... RETURNING informam as alterações com `publish_changes`;
+    as demais fora da sessão do ORM (SQL manual) são cobertas pela reconstrução periódica.
+    """
+    
+    def __init__(self):
+        self.app = None
+        self.enabled = False
+        self.channel = 'user-autocomplete'
+        self.max_broadcast = 1000
+        # Chaves normalizadas ordenadas e, na mesma posição, o id do usuário
+        self._keys: List[str] = []
+        self._ids = array('l')
+        self._users: Dict[int, Tuple[str, str]] = {}
+        self._lock = threading.RLock()
+        self._ready = False
+        self._building: Optional[list] = None
+        self._pid: Optional[int] = None
+        self.last_build = {'users': 0, 'entries': 0, 'ms': 0.0, 'at': None}
+    
+    def init_app(self, app):
+        """Configura o índice a partir da aplicação"""
+        self.app = app
+        self.enabled = app.config.get('AUTOCOMPLETE_ENABLED', True)
+        self.channel = app.config.get('AUTOCOMPLETE_CHANNEL', 'user-autocomplete')
+        
+        if self.enabled:
+            if not event.contains(Session, 'after_flush', self._after_flush):
+                event.listen(Session, 'after_flush', self._after_flush)
+                event.listen(Session, 'after_commit', self._after_commit)
+                event.listen(Session, 'after_rollback', self._after_rollback)
+            pubsub_listener.subscribe(self.channel, self._on_message, on_reconnect=self._resync)
+            pubsub_listener.add_periodic(app.config.get('AUTOCOMPLETE_REBUILD_SECONDS', 3600), self._resync)
+            metrics.register_gauge('autocomplete.entries', lambda: len(self._keys))
+            metrics.register_gauge('autocomplete.last_build', lambda: dict(self.last_build))
+    
+    @property
+    def started(self) -> bool:
+        """Índice iniciado (montado ou em montagem) neste worker"""
+        return self._pid == os.getpid()
+    
+    @property
+    def ready(self) -> bool:
+        """Índice montado neste worker"""
+        return self._ready and self.started
+    
+    def ensure_started(self):
+        """Monta o índice em segundo plano no worker atual (após o fork)"""
+        if not self.enabled or self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            # Índice herdado do processo pai pode estar desatualizado
+            self._keys, self._ids, self._users, self._ready = [], array('l'), {}, False
+            self._pid = os.getpid()
+        pubsub_listener.ensure_started()
+        threading.Thread(target=self._build_in_background, name='autocomplete-build', daemon=True).start()
+    
+    def _build_in_background(self):
+        """Monta o índice com contexto da aplicação"""
+        try:
+            with self.app.app_context():
+                self.rebuild()
+        except Exception as e:
+            metrics.inc('autocomplete.build_errors')
+            logger.error(f"Erro ao montar índice de autocomplete: {str(e)}")
+    
+    @staticmethod
+    def _user_keys(name: Optional[str], email: Optional[str]) -> List[str]:
+        """Chaves do usuário: email, nome completo e o nome a partir de cada palavra"""
+        keys = set()
+        if email:
+            key = normalize_search_text(email)
+            # Email já normalizado: reaproveita a mesma string em vez de guardar uma cópia
+            keys.add(email if key == email else key)
+        words = normalize_search_text(name or '').split(' ')
+        for start in range(len(words)):
+            keys.add(' '.join(words[start:]))
+        keys.discard('')
+        return list(keys)
+    
+    def rebuild(self) -> int:
+        """Reconstrói o índice a partir de users (leitura em streaming)"""
+        started = time.monotonic()
+        with self._lock:
+            self._building = []
+        
+        entries: List[Tuple[str, int]] = []
+        users: Dict[int, Tuple[str, str]] = {}
+        try:
+            rows = db.session.execute(
+                select(User.id, User.name, User.email).execution_options(yield_per=5000)
+            )
+            for user_id, name, email in rows:
+                users[user_id] = (name, email)
+                entries.extend((key, user_id) for key in self._user_keys(name, email))
+            entries.sort()
+            keys = [key for key, _ in entries]
+            ids = array('l', (user_id for _, user_id in entries))
+            del entries
+        except Exception:
+            with self._lock:
+                self._building = None
+            raise
+        finally:
+            # Roda em threads próprias (montagem, pub/sub) cujo contexto não termina: devolve a
+            # conexão em vez de deixá-la ociosa dentro da transação da leitura
+            db.session.remove()
+        
+        with self._lock:
+            self._keys, self._ids, self._users = keys, ids, users
+            # Commits ocorridos durante a leitura
+            pending, self._building = self._building, None
+            for change in pending:
+                self._apply(*change)
+            self._ready = True
+        
+        elapsed = time.monotonic() - started
+        metrics.observe('autocomplete.build', elapsed)
+        self.last_build = {
+            'users': len(users),
+            'entries': len(keys),
+            'ms': round(elapsed * 1000, 1),
+            'at': time.strftime('%Y-%m-%dT%H:%M:%S')
+        }
+        logger.info(f"Índice de autocomplete montado: {len(users)} usuários, {len(keys)} entradas em {elapsed:.2f}s")
+        return len(users)
+    
+    def _apply(self, user_id: int, name: Optional[str], email: Optional[str]):
+        """Aplica inclusão/alteração (name/email) ou remoção (ambos None) de um usuário"""
+        with self._lock:
+            if self._building is not None:
+                self._building.append((user_id, name, email))
+            
+            previous = self._users.pop(user_id, None)
+            if previous is not None:
+                for key in self._user_keys(*previous):
+                    position = bisect_left(self._keys, key)
+                    while position < len(self._keys) and self._keys[position] == key:
+                        if self._ids[position] == user_id:
+                            del self._keys[position]
+                            del self._ids[position]
+                            break
+                        position += 1
+            
+            if name is not None or email is not None:
+                self._users[user_id] = (name, email)
+                for key in self._user_keys(name, email):
+                    position = bisect_right(self._keys, key)
+                    self._keys.insert(position, key)
+                    self._ids.insert(position, user_id)
+    
+    def search(self, prefix: str, limit: int = 10) -> List[Dict[str, object]]:
+        """Usuários cujo email, nome ou palavra do nome começa com o prefixo (correspondência exata primeiro)"""
+        term = normalize_search_text(prefix)
+        if not term:
+            return []
+        
+        results = []
+        seen = set()
+        with self._lock:
+            keys, ids = self._keys, self._ids
+            for position in range(bisect_left(keys, term), len(keys)):
+                if not keys[position].startswith(term):
+                    break
+                user_id = ids[position]
+                if user_id in seen:
+                    continue
+                seen.add(user_id)
+                name, email = self._users[user_id]
+                results.append({'id': user_id, 'name': name, 'email': email})
+                if len(results) >= limit:
+                    break
+        return results
+    
+    def _after_flush(self, session, flush_context):
+        """Guarda as alterações de usuários do flush até o commit"""
+        for instance in session.new:
+            if isinstance(instance, User):
+                session.info.setdefault('autocomplete_changes', {})[instance.id] = (instance.name, instance.email)
+        for instance in session.dirty:
+            if isinstance(instance, User):
+                state = inspect(instance)
+                if state.attrs.name.history.has_changes() or state.attrs.email.history.has_changes():
+                    session.info.setdefault('autocomplete_changes', {})[instance.id] = (instance.name, instance.email)
+        for instance in session.deleted:
+            if isinstance(instance, User):
+                session.info.setdefault('autocomplete_changes', {})[instance.id] = (None, None)
+    
+    def _after_commit(self, session):
+        """Aplica e difunde as alterações confirmadas"""
+        changes = session.info.pop('autocomplete_changes', None)
+        if changes:
+            self.publish_changes(changes)
+    
+    def publish_changes(self, changes: Dict[int, Tuple[Optional[str], Optional[str]]]):
+        """Aplica e difunde alterações já confirmadas (id -> (nome, email); (None, None) remove)"""
+        if not self.enabled or not changes:
+            return
+        
+        if self.started:
+            for user_id, (name, email) in changes.items():
+                self._apply(user_id, name, email)
+        
+        if len(changes) > self.max_broadcast:
+            message = {'origin': self._origin(), 'rebuild': True}
+        else:
+            message = {'origin': self._origin(), 'changes': [[user_id, name, email] for user_id, (name, email) in changes.items()]}
+        pubsub_listener.publish(self.channel, json.dumps(message))
+    
+    def _after_rollback(self, session):
+        """Descarta alterações não confirmadas"""
+        session.info.pop('autocomplete_changes', None)
+    
+    @staticmethod
+    def _origin() -> str:
+        """Identificador do worker que publicou a mensagem"""
+        return f'{socket.gethostname()}:{os.getpid()}'
+    
+    def _on_message(self, data: str):
+        """Recebe alterações confirmadas em outros workers"""
+        message = json.loads(data)
+        if message.get('origin') == self._origin() or not self.started:
+            return
+        if message.get('rebuild'):
+            self.rebuild()
+            return
+        for user_id, name, email in message.get('changes', []):
+            self._apply(int(user_id), name, email)
+        metrics.inc('autocomplete.remote_changes', len(message.get('changes', [])))
+    
+    def _resync(self):
+        """Reconstrói o índice (mensagens podem ter sido perdidas durante a desconexão)"""
+        if self.ready:
+            self.rebuild()
+
+# Instância global do índice
+autocomplete_index = AutocompleteIndex()
@@ -0,0 +1,127 @@
+"""
+Instrumentação do pool de conexões do banco
+"""
+import threading
+import time
+from typing import Dict
+from flask import has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import Pool, QueuePool
+from app.core.logging import get_logger
+from app.core.metrics import metrics
+
+logger = get_logger(__name__)
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool que mede a espera por conexão em cada checkout"""
+    
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            pool_monitor.observe_timeout(self, time.perf_counter() - started)
+            raise
+        pool_monitor.observe_checkout(self, time.perf_counter() - started)
+        return connection
+
+class PoolMonitor:
+    """Métricas do pool por worker: conexões em uso, espera no checkout e rotatividade
+    
+    Com `SQLALCHEMY_ENGINE_OPTIONS` de pool em fila (`pool_size`), os engines (primário e réplicas)
+    usam `InstrumentedQueuePool`; esperas acima de `DATABASE_POOL_SLOW_CHECKOUT_MS` são registradas
+    no log com o endpoint que esperava. Aberturas, fechamentos e invalidações de conexões são
+    contados em qualquer pool (inclusive `NullPool` com PgBouncer).
+    """
+    
+    def __init__(self):
+        self.app = None
+        self.slow_checkout = 0.1
+        self._lock = threading.Lock()
+        self._peaks: Dict[int, int] = {}
+    
+    def init_app(self, app):
+        """Aplica o pool instrumentado às opções do engine (antes de `db.init_app`)"""
+        self.app = app
+        self.slow_checkout = app.config.get('DATABASE_POOL_SLOW_CHECKOUT_MS', 100) / 1000
+        
+        options = dict(app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+        if 'pool_size' in options:
+            options.setdefault('poolclass', InstrumentedQueuePool)
+            app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+            logger.info(
+                f"Pool do banco por worker: pool_size={options['pool_size']}, "
+                f"max_overflow={options.get('max_overflow', 10)}, pool_timeout={options.get('pool_timeout', 30)}s"
+            )
+        
+        if not event.contains(Pool, 'connect', self._on_connect):
+            event.listen(Pool, 'connect', self._on_connect)
+            event.listen(Pool, 'close', self._on_close)
+            event.listen(Pool, 'close_detached', self._on_close)
+            event.listen(Pool, 'invalidate', self._on_invalidate)
+        metrics.register_gauge('db.pool', self.get_status)
+    
+    def observe_checkout(self, pool, seconds: float):
+        """Registra a espera por uma conexão (e loga esperas lentas com o endpoint)"""
+        metrics.observe('db.pool.checkout_wait', seconds)
+        checked_out = pool.checkedout()
+        with self._lock:
+            if checked_out > self._peaks.get(id(pool), 0):
+                self._peaks[id(pool)] = checked_out
+        if seconds >= self.slow_checkout:
+            metrics.inc('db.pool.slow_checkouts')
+            logger.warning(
+                f"Espera de {seconds * 1000:.0f}ms por conexão do banco em {self._waiter()} ({pool.status()})"
+            )
+    
+    def observe_timeout(self, pool, seconds: float):
+        """Registra um checkout que estourou `pool_timeout`"""
+        metrics.inc('db.pool.timeouts')
+        logger.error(f"Pool do banco esgotado após {seconds:.1f}s em {self._waiter()} ({pool.status()})")
+    
+    @staticmethod
+    def _waiter() -> str:
+        """Endpoint (ou thread, fora de requisição) que está esperando a conexão"""
+        if has_request_context():
+            return f"{request.method} {request.endpoint or request.path}"
+        return f"thread {threading.current_thread().name}"
+    
+    def _on_connect(self, dbapi_connection, connection_record):
+        """Nova conexão aberta com o banco"""
+        metrics.inc('db.pool.connects')
+    
+    def _on_close(self, dbapi_connection, *args):
+        """Conexão fechada (reciclada, excedente devolvida ou descartada)"""
+        metrics.inc('db.pool.closes')
+    
+    def _on_invalidate(self, dbapi_connection, connection_record, exception):
+        """Conexão invalidada (erro de conexão ou falha no pre-ping)"""
+        metrics.inc('db.pool.invalidations')
+    
+    def get_status(self) -> Dict[str, dict]:
+        """Estado de cada pool (primário e réplicas)"""
+        from app import db
+        with self.app.app_context():
+            engines = dict(db.engines)
+        
+        status = {}
+        for key, engine in engines.items():
+            pool = engine.pool
+            name = key or 'default'
+            if not isinstance(pool, QueuePool):
+                status[name] = {'pool': type(pool).__name__}
+                continue
+            status[name] = {
+                'pool': type(pool).__name__,
+                'size': pool.size(),
+                'max_overflow': pool._max_overflow,
+                'checked_out': pool.checkedout(),
+                'checked_in': pool.checkedin(),
+                'overflow': pool.overflow(),
+                'peak_checked_out': self._peaks.get(id(pool), 0)
+            }
+        return status
+
+# Instância global do monitor
+pool_monitor = PoolMonitor()
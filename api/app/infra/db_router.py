@@ -0,0 +1,226 @@
+"""
+Roteamento de leituras para réplicas do banco
+"""
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+import redis
+from flask import g, has_app_context, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event, text
+from app.core.cache import LRUCache, MISSING
+from app.core.logging import get_logger
+from app.core.metrics import metrics
+
+logger = get_logger(__name__)
+
+# Atraso de replicação em segundos (0 se o WAL recebido já foi todo aplicado; o primário também retorna 0)
+PG_REPLICA_LAG_QUERY = """
+SELECT CASE
+    WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+    ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+END
+"""
+
+class DatabaseRouter:
+    """Envia leituras às réplicas (`DATABASE_REPLICA_URLS`) e escritas ao primário
+    
+    Requisições GET/HEAD e blocos `replica()` (tarefas de relatório) leem das réplicas; qualquer
+    escrita (flush, INSERT/UPDATE/DELETE ou SELECT ... FOR UPDATE) vai ao primário e prende a
+    sessão nele, e SQL textual sempre vai ao primário. Depois de uma escrita, o usuário fica no primário por
+    `DATABASE_REPLICA_STICKY_SECONDS` (read-your-writes, registrado no Redis e no worker).
+    Réplicas com atraso acima de `DATABASE_REPLICA_MAX_LAG_SECONDS` ou inacessíveis saem do rodízio.
+    """
+    
+    sticky_prefix = 'db:sticky:'
+    
+    def __init__(self):
+        self.app = None
+        self.replicas: Dict[str, dict] = {}
+        self.max_lag = 5.0
+        self.check_interval = 5.0
+        self.sticky_seconds = 10
+        self.sticky_cache = LRUCache(maxsize=10000, ttl=10)
+        self._lock = threading.Lock()
+        self._pid: Optional[int] = None
+    
+    @property
+    def enabled(self) -> bool:
+        """Há réplicas configuradas"""
+        return bool(self.replicas)
+    
+    def init_app(self, app):
+        """Configura as réplicas a partir da aplicação"""
+        self.app = app
+        self.max_lag = app.config.get('DATABASE_REPLICA_MAX_LAG_SECONDS', 5.0)
+        self.check_interval = app.config.get('DATABASE_REPLICA_CHECK_SECONDS', 5.0)
+        self.sticky_seconds = app.config.get('DATABASE_REPLICA_STICKY_SECONDS', 10)
+        self.sticky_cache = LRUCache(maxsize=10000, ttl=self.sticky_seconds)
+        # Fora do rodízio até a primeira verificação de atraso
+        self.replicas = {
+            key: {'healthy': False, 'lag': None, 'error': None, 'checked_at': None}
+            for key in app.config.get('SQLALCHEMY_BINDS', {}) if key.startswith('replica_')
+        }
+        
+        if self.enabled:
+            app.before_request(self._before_request)
+            if not event.contains(RoutingSession, 'after_commit', self._after_commit):
+                event.listen(RoutingSession, 'after_commit', self._after_commit)
+            metrics.register_gauge('db.replicas', lambda: {key: dict(state) for key, state in self.replicas.items()})
+    
+    def _before_request(self):
+        """Requisições somente leitura podem usar réplicas"""
+        if request.method in ('GET', 'HEAD', 'OPTIONS'):
+            g._db_target = 'replica'
+    
+    @contextmanager
+    def _target(self, target: str):
+        """Define o destino das leituras no contexto atual durante o bloco"""
+        previous = g.get('_db_target')
+        g._db_target = target
+        try:
+            yield
+        finally:
+            g._db_target = previous
+    
+    def replica(self):
+        """Leituras do bloco (ou da função decorada) vão às réplicas"""
+        return self._target('replica')
+    
+    def primary(self):
+        """Leituras do bloco (ou da função decorada) vão ao primário"""
+        return self._target('primary')
+    
+    def engine_for(self, session, clause):
+        """Engine de réplica para a consulta, ou None para usar o primário"""
+        if session._flushing or getattr(clause, 'is_dml', False) or getattr(clause, '_for_update_arg', None) is not None:
+            session.info['db_wrote'] = True
+            return None
+        if clause is None or not getattr(clause, 'is_select', False):
+            # get_bind() sem consulta (dialeto) ou SQL textual, que pode escrever
+            return None
+        if session.info.get('db_wrote') or not self._reads_from_replica():
+            return None
+        
+        key = session.info.get('db_replica')
+        if key is None or not self.replicas[key]['healthy']:
+            key = self._choose_replica()
+            if key is None:
+                metrics.inc('db.replica_unavailable')
+                return None
+            session.info['db_replica'] = key
+        metrics.inc('db.replica_reads')
+        return session._db.engines[key]
+    
+    def _reads_from_replica(self) -> bool:
+        """Contexto atual permite ler das réplicas (e o usuário não escreveu há pouco)"""
+        if not has_app_context() or g.get('_db_target') != 'replica':
+            return False
+        sticky = g.get('_db_sticky')
+        if sticky is None:
+            identity = self._identity()
+            if identity is None:
+                return True
+            sticky = g._db_sticky = self._is_sticky(identity)
+        return not sticky
+    
+    def _choose_replica(self) -> Optional[str]:
+        """Réplica saudável aleatória (inicia a verificação de atraso neste worker)"""
+        self.ensure_started()
+        healthy = [key for key, state in self.replicas.items() if state['healthy']]
+        return random.choice(healthy) if healthy else None
+    
+    @staticmethod
+    def _identity() -> Optional[str]:
+        """Usuário autenticado da requisição (se o JWT já foi verificado)"""
+        if not has_request_context():
+            return None
+        try:
+            from flask_jwt_extended import get_jwt_identity
+            identity = get_jwt_identity()
+        except RuntimeError:
+            return None
+        return str(identity) if identity is not None else None
+    
+    def _is_sticky(self, identity: str) -> bool:
+        """Usuário escreveu nos últimos segundos (worker -> Redis; sem Redis, primário)"""
+        if self.sticky_cache.get(identity) is not MISSING:
+            return True
+        try:
+            from app.infra.redis_client import get_redis
+            return bool(get_redis().exists(f'{self.sticky_prefix}{identity}'))
+        except redis.RedisError as e:
+            metrics.inc('db.sticky_errors')
+            logger.warning(f"Redis indisponível ao verificar leitura pós-escrita: {str(e)}")
+            return True
+    
+    def _after_commit(self, session):
+        """Mantém no primário, por alguns segundos, o usuário que acabou de escrever"""
+        if not session.info.get('db_wrote'):
+            return
+        identity = self._identity()
+        if identity is None:
+            return
+        self.sticky_cache.set(identity, True)
+        try:
+            from app.infra.redis_client import get_redis
+            get_redis().set(f'{self.sticky_prefix}{identity}', 1, ex=self.sticky_seconds)
+        except redis.RedisError as e:
+            metrics.inc('db.sticky_errors')
+            logger.warning(f"Erro ao registrar leitura pós-escrita no Redis: {str(e)}")
+    
+    def ensure_started(self):
+        """Inicia a verificação periódica de atraso das réplicas no worker atual (após o fork)"""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+        threading.Thread(target=self._check_loop, name='replica-lag-check', daemon=True).start()
+    
+    def _check_loop(self):
+        """Verifica o atraso das réplicas a cada `DATABASE_REPLICA_CHECK_SECONDS`"""
+        while self._pid == os.getpid():
+            with self.app.app_context():
+                self.check_replicas()
+            time.sleep(self.check_interval)
+    
+    def check_replicas(self) -> Dict[str, dict]:
+        """Mede o atraso de cada réplica e atualiza o rodízio"""
+        from app import db
+        for key, state in self.replicas.items():
+            try:
+                engine = db.engines[key]
+                with engine.connect() as connection:
+                    lag = float(connection.execute(text(PG_REPLICA_LAG_QUERY)).scalar() or 0) \
+                        if engine.dialect.name == 'postgresql' else 0.0
+                healthy = lag <= self.max_lag
+                state.update(lag=round(lag, 3), error=None)
+            except Exception as e:
+                healthy = False
+                state.update(lag=None, error=str(e))
+            
+            if healthy != state['healthy']:
+                if healthy:
+                    logger.info(f"Réplica {key} no rodízio (atraso {state['lag']}s)")
+                else:
+                    logger.warning(f"Réplica {key} fora do rodízio (atraso {state['lag']}s, erro {state['error']})")
+            state.update(healthy=healthy, checked_at=time.strftime('%Y-%m-%dT%H:%M:%S'))
+        return self.replicas
+
+# Instância global do roteador
+db_router = DatabaseRouter()
+
+class RoutingSession(Session):
+    """Sessão do Flask-SQLAlchemy que consulta o roteador antes do bind padrão"""
+    
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and db_router.enabled:
+            engine = db_router.engine_for(self, clause)
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
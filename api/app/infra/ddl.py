@@ -0,0 +1,190 @@
+"""
+DDL fora do alcance do ORM (triggers, funções, índices especiais)
+"""
+from typing import Dict, List
+from sqlalchemy import event, text
+from app import db
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+class DDLRegistry:
+    """Blocos de DDL idempotentes por dialeto, aplicados após create_all e por `flask apply-ddl`"""
+    
+    def __init__(self):
+        self._blocks: Dict[str, Dict[str, List[str]]] = {}
+        event.listen(db.metadata, 'after_create', self._after_create)
+    
+    def register(self, name: str, statements: Dict[str, List[str]]):
+        """Registra DDL (dialeto -> comandos)"""
+        self._blocks[name] = statements
+    
+    def _after_create(self, target, connection, **kwargs):
+        """Aplica a DDL logo depois de create_all"""
+        self.apply(connection)
+    
+    def apply(self, connection=None) -> List[str]:
+        """Aplica todos os blocos do dialeto da conexão"""
+        if connection is None:
+            with db.engine.begin() as connection:
+                return self.apply(connection)
+        
+        applied = []
+        for name, statements in self._blocks.items():
+            commands = statements.get(connection.dialect.name, [])
+            for command in commands:
+                connection.execute(text(command))
+            if commands:
+                applied.append(name)
+                logger.info(f"DDL aplicada: {name}")
+        return applied
+
+# Instância global do registro
+ddl_registry = DDLRegistry()
+
+# Busca de usuários sem acento e por substring. No PostgreSQL: índices GIN pg_trgm sobre
+# f_unaccent(lower(name)) e lower(email), que atendem LIKE '%termo%' e similarity(). unaccent()
+# não é IMMUTABLE e não pode ser usado em índice, daí o wrapper com dicionário fixo.
+# No SQLite (testes): tabela FTS5 externa sobre users, sincronizada por triggers.
+ddl_registry.register('user_search', {
+    'postgresql': [
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+        "CREATE EXTENSION IF NOT EXISTS unaccent",
+        """
+        CREATE OR REPLACE FUNCTION f_unaccent(text) RETURNS text
+        LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT AS
+        $$ SELECT public.unaccent('public.unaccent'::regdictionary, $1) $$
+        """,
+        "CREATE INDEX IF NOT EXISTS ix_users_name_trgm ON users USING gin (f_unaccent(lower(name)) gin_trgm_ops)",
+        "CREATE INDEX IF NOT EXISTS ix_users_email_trgm ON users USING gin (lower(email) gin_trgm_ops)",
+    ],
+    'sqlite': [
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS users_fts USING fts5(
+            name, email, content='users', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+        )
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS users_fts_insert AFTER INSERT ON users
+        BEGIN
+            INSERT INTO users_fts (rowid, name, email) VALUES (NEW.id, NEW.name, NEW.email);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS users_fts_delete AFTER DELETE ON users
+        BEGIN
+            INSERT INTO users_fts (users_fts, rowid, name, email) VALUES ('delete', OLD.id, OLD.name, OLD.email);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS users_fts_update AFTER UPDATE OF name, email ON users
+        BEGIN
+            INSERT INTO users_fts (users_fts, rowid, name, email) VALUES ('delete', OLD.id, OLD.name, OLD.email);
+            INSERT INTO users_fts (rowid, name, email) VALUES (NEW.id, NEW.name, NEW.email);
+        END
+        """,
+        "INSERT INTO users_fts (users_fts) VALUES ('rebuild')",
+    ],
+})
+
+# Contadores de usuários por (role, status, is_active), mantidos pelo banco em qualquer
+# escrita (ORM, Core, SQL manual). No PostgreSQL os triggers são por comando, com
+# tabelas de transição: um INSERT/UPDATE em lote gera um único upsert agregado.
+# A contagem inicial é semeada na mesma transação que instala os triggers, com escritas em
+# users bloqueadas até o commit (reaplicar a DDL também reconcilia os contadores).
+USER_COUNTERS_SEED = [
+    "DELETE FROM user_counters",
+    """
+    INSERT INTO user_counters (role, status, is_active, count)
+    SELECT role, status, is_active, COUNT(*) FROM users GROUP BY role, status, is_active
+    """,
+]
+
+ddl_registry.register('user_counters', {
+    'postgresql': [
+        "LOCK TABLE users IN SHARE ROW EXCLUSIVE MODE",
+        """
+        CREATE OR REPLACE FUNCTION user_counters_sync() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                INSERT INTO user_counters (role, status, is_active, count)
+                SELECT role, status, is_active, COUNT(*) FROM new_rows GROUP BY role, status, is_active
+                ON CONFLICT (role, status, is_active) DO UPDATE SET count = user_counters.count + EXCLUDED.count;
+            ELSIF TG_OP = 'DELETE' THEN
+                INSERT INTO user_counters (role, status, is_active, count)
+                SELECT role, status, is_active, -COUNT(*) FROM old_rows GROUP BY role, status, is_active
+                ON CONFLICT (role, status, is_active) DO UPDATE SET count = user_counters.count + EXCLUDED.count;
+            ELSIF TG_OP = 'UPDATE' THEN
+                INSERT INTO user_counters (role, status, is_active, count)
+                SELECT role, status, is_active, SUM(delta) FROM (
+                    SELECT role, status, is_active, 1 AS delta FROM new_rows
+                    UNION ALL
+                    SELECT role, status, is_active, -1 AS delta FROM old_rows
+                ) changes
+                GROUP BY role, status, is_active
+                HAVING SUM(delta) <> 0
+                ON CONFLICT (role, status, is_active) DO UPDATE SET count = user_counters.count + EXCLUDED.count;
+            ELSE
+                DELETE FROM user_counters;
+            END IF;
+            RETURN NULL;
+        END;
+        $$
+        """,
+        "DROP TRIGGER IF EXISTS users_counters_insert ON users",
+        "DROP TRIGGER IF EXISTS users_counters_update ON users",
+        "DROP TRIGGER IF EXISTS users_counters_delete ON users",
+        "DROP TRIGGER IF EXISTS users_counters_truncate ON users",
+        """
+        CREATE TRIGGER users_counters_insert AFTER INSERT ON users
+        REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION user_counters_sync()
+        """,
+        """
+        CREATE TRIGGER users_counters_update AFTER UPDATE ON users
+        REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION user_counters_sync()
+        """,
+        """
+        CREATE TRIGGER users_counters_delete AFTER DELETE ON users
+        REFERENCING OLD TABLE AS old_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION user_counters_sync()
+        """,
+        """
+        CREATE TRIGGER users_counters_truncate AFTER TRUNCATE ON users
+        FOR EACH STATEMENT EXECUTE FUNCTION user_counters_sync()
+        """,
+        *USER_COUNTERS_SEED,
+    ],
+    'sqlite': [
+        """
+        CREATE TRIGGER IF NOT EXISTS users_counters_insert AFTER INSERT ON users
+        BEGIN
+            INSERT INTO user_counters (role, status, is_active, count)
+            VALUES (NEW.role, NEW.status, NEW.is_active, 1)
+            ON CONFLICT (role, status, is_active) DO UPDATE SET count = count + 1;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS users_counters_delete AFTER DELETE ON users
+        BEGIN
+            INSERT INTO user_counters (role, status, is_active, count)
+            VALUES (OLD.role, OLD.status, OLD.is_active, -1)
+            ON CONFLICT (role, status, is_active) DO UPDATE SET count = count - 1;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS users_counters_update AFTER UPDATE OF role, status, is_active ON users
+        WHEN OLD.role IS NOT NEW.role OR OLD.status IS NOT NEW.status OR OLD.is_active IS NOT NEW.is_active
+        BEGIN
+            INSERT INTO user_counters (role, status, is_active, count)
+            VALUES (OLD.role, OLD.status, OLD.is_active, -1)
+            ON CONFLICT (role, status, is_active) DO UPDATE SET count = count - 1;
+            INSERT INTO user_counters (role, status, is_active, count)
+            VALUES (NEW.role, NEW.status, NEW.is_active, 1)
+            ON CONFLICT (role, status, is_active) DO UPDATE SET count = count + 1;
+        END
+        """,
+        *USER_COUNTERS_SEED,
+    ],
+})
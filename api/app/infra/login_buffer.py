@@ -0,0 +1,144 @@
+"""
+Buffer write-behind das informações de login
+"""
+import atexit
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Optional
+from app.core.logging import get_logger
+from app.core.metrics import metrics
+from app.infra.repositories.user_repo import UserRepository
+
+logger = get_logger(__name__)
+
+class LoginWriteBuffer:
+    """Agrega last_login/login_count/last_ip por usuário e grava em lote periodicamente"""
+    
+    def __init__(self):
+        self.app = None
+        self.enabled = False
+        self.flush_interval = 5.0
+        self.max_pending = 5000
+        self._pending: Dict[int, list] = {}
+        self._oldest: Optional[float] = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self.last_flush = {'rows': 0, 'logins': 0, 'lag_ms': 0.0, 'at': None}
+    
+    def init_app(self, app):
+        """Configura o buffer a partir da aplicação"""
+        self.app = app
+        self.enabled = app.config.get('LOGIN_BUFFER_ENABLED', True)
+        self.flush_interval = app.config.get('LOGIN_BUFFER_FLUSH_SECONDS', 5.0)
+        self.max_pending = app.config.get('LOGIN_BUFFER_MAX_PENDING', 5000)
+        
+        if self.enabled:
+            atexit.register(self.flush)
+            metrics.register_gauge('login_buffer.pending', lambda: len(self._pending))
+            metrics.register_gauge('login_buffer.last_flush', lambda: dict(self.last_flush))
+    
+    def _ensure_started(self):
+        """Inicia a thread de flush no worker atual (após o fork)"""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            # Pendências herdadas do processo pai pertencem a ele
+            self._pending = {}
+            self._oldest = None
+            self._thread = threading.Thread(target=self._run, name='login-buffer', daemon=True)
+            self._thread.start()
+            self._pid = os.getpid()
+    
+    def record(self, user_id: int, ip_address: Optional[str] = None, at: Optional[datetime] = None):
+        """Registra um login (gravado no próximo flush)"""
+        at = at or datetime.utcnow()
+        if not self.enabled:
+            UserRepository().update_last_login(user_id, ip_address)
+            return
+        
+        self._ensure_started()
+        with self._lock:
+            entry = self._pending.get(user_id)
+            if entry is None:
+                self._pending[user_id] = [at, 1, ip_address]
+                if self._oldest is None:
+                    self._oldest = time.monotonic()
+            else:
+                entry[0] = max(entry[0], at)
+                entry[1] += 1
+                if ip_address:
+                    entry[2] = ip_address
+            full = len(self._pending) >= self.max_pending
+        
+        metrics.inc('login_buffer.recorded')
+        if full:
+            self._wakeup.set()
+    
+    def _run(self):
+        """Loop de flush periódico"""
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Erro no flush do buffer de logins: {str(e)}")
+    
+    def flush(self) -> int:
+        """Grava os logins pendentes em lote"""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+                oldest, self._oldest = self._oldest, None
+            
+            if not pending:
+                return 0
+            
+            logins = [(user_id, at, count, ip) for user_id, (at, count, ip) in pending.items()]
+            started = time.monotonic()
+            try:
+                with self.app.app_context():
+                    updated = UserRepository().apply_login_batch(logins)
+            except Exception as e:
+                self._requeue(pending, oldest)
+                metrics.inc('login_buffer.flush_errors')
+                logger.error(f"Erro ao gravar logins em lote ({len(logins)} usuários): {str(e)}")
+                raise
+            
+            lag = time.monotonic() - oldest if oldest is not None else 0.0
+            total_logins = sum(count for _, _, count, _ in logins)
+            metrics.observe('login_buffer.flush', time.monotonic() - started)
+            metrics.observe('login_buffer.lag', lag)
+            metrics.inc('login_buffer.flushes')
+            metrics.inc('login_buffer.flushed_rows', updated)
+            self.last_flush = {
+                'rows': updated,
+                'logins': total_logins,
+                'lag_ms': round(lag * 1000, 3),
+                'at': datetime.utcnow().isoformat()
+            }
+            return updated
+    
+    def _requeue(self, pending: Dict[int, list], oldest: Optional[float]):
+        """Devolve ao buffer os logins de um flush que falhou"""
+        with self._lock:
+            for user_id, (at, count, ip_address) in pending.items():
+                entry = self._pending.get(user_id)
+                if entry is None:
+                    self._pending[user_id] = [at, count, ip_address]
+                else:
+                    entry[0] = max(entry[0], at)
+                    entry[1] += count
+                    entry[2] = entry[2] or ip_address
+            if oldest is not None:
+                self._oldest = min(oldest, self._oldest) if self._oldest is not None else oldest
+
+# Instância global do buffer
+login_buffer = LoginWriteBuffer()
@@ -0,0 +1,114 @@
+"""
+Listener Redis pub/sub por worker
+"""
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+import redis
+from app.core.logging import get_logger
+from app.core.metrics import metrics
+from app.infra.redis_client import get_redis
+
+logger = get_logger(__name__)
+
+class PubSubListener:
+    """Thread de pub/sub compartilhada pelos caches em memória do worker"""
+    
+    def __init__(self):
+        self.app = None
+        self._handlers: Dict[str, List[Callable[[str], None]]] = {}
+        self._reconnect_callbacks: List[Callable[[], None]] = []
+        self._periodic: List[list] = []
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+    
+    def init_app(self, app):
+        """Associa o listener à aplicação"""
+        self.app = app
+    
+    def subscribe(self, channel: str, handler: Callable[[str], None],
+                  on_reconnect: Optional[Callable[[], None]] = None):
+        """Registra handler para um canal (e callback de reconexão)"""
+        self._handlers.setdefault(channel, []).append(handler)
+        if on_reconnect is not None:
+            self._reconnect_callbacks.append(on_reconnect)
+    
+    def add_periodic(self, interval: float, callback: Callable[[], None]):
+        """Registra tarefa periódica executada na thread do listener"""
+        self._periodic.append([interval, callback, time.monotonic() + interval])
+    
+    def publish(self, channel: str, message: str) -> bool:
+        """Publica mensagem para todos os workers"""
+        try:
+            get_redis().publish(channel, message)
+            return True
+        except redis.RedisError as e:
+            metrics.inc('pubsub.publish_errors')
+            logger.warning(f"Erro ao publicar em {channel}: {str(e)}")
+            return False
+    
+    def ensure_started(self):
+        """Inicia a thread no worker atual (após o fork)"""
+        if self._pid == os.getpid() or self.app is None or not self._handlers:
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._thread = threading.Thread(target=self._run, name='redis-pubsub', daemon=True)
+            self._thread.start()
+            self._pid = os.getpid()
+    
+    def _run(self):
+        """Loop de escuta com reconexão automática"""
+        backoff = 1.0
+        while True:
+            try:
+                with self.app.app_context():
+                    client = redis.Redis.from_url(
+                        self.app.config['REDIS_URL'], decode_responses=True, health_check_interval=30
+                    )
+                    pubsub = client.pubsub(ignore_subscribe_messages=True)
+                    pubsub.subscribe(*self._handlers.keys())
+                    backoff = 1.0
+                    self._run_callbacks(self._reconnect_callbacks)
+                    
+                    while True:
+                        message = pubsub.get_message(timeout=1.0)
+                        if message and message.get('type') == 'message':
+                            self._dispatch(message['channel'], message['data'])
+                        self._run_due_periodic()
+            except Exception as e:
+                metrics.inc('pubsub.reconnects')
+                logger.warning(f"Listener pub/sub desconectado: {str(e)}")
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 30.0)
+    
+    def _dispatch(self, channel: str, data: str):
+        """Entrega mensagem aos handlers do canal"""
+        for handler in self._handlers.get(channel, []):
+            try:
+                handler(data)
+            except Exception as e:
+                logger.error(f"Erro no handler de {channel}: {str(e)}")
+    
+    def _run_due_periodic(self):
+        """Executa tarefas periódicas vencidas"""
+        now = time.monotonic()
+        for entry in self._periodic:
+            interval, callback, due = entry
+            if now >= due:
+                entry[2] = now + interval
+                self._run_callbacks([callback])
+    
+    def _run_callbacks(self, callbacks):
+        """Executa callbacks isolando erros"""
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"Erro em callback do listener pub/sub: {str(e)}")
+
+# Instância global do listener
+pubsub_listener = PubSubListener()
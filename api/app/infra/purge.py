@@ -0,0 +1,126 @@
+"""
+Expurgo de registros expirados em blocos
+"""
+import re
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import List, Optional
+from sqlalchemy import Table, delete, select, text
+from app import db
+from app.core.logging import get_logger
+from app.core.metrics import metrics
+
+logger = get_logger(__name__)
+
+# Limite superior de partições por intervalo: FOR VALUES FROM (...) TO ('2026-02-01 00:00:00')
+PARTITION_UPPER_BOUND = re.compile(r"TO \('([^']+)'\)")
+
+@dataclass
+class PurgeResult:
+    """Resultado de um expurgo"""
+    table: str
+    deleted: int = 0
+    batches: int = 0
+    seconds: float = 0.0
+    partitions_dropped: List[str] = field(default_factory=list)
+    
+    @property
+    def rows_per_second(self) -> float:
+        """Vazão do expurgo"""
+        return self.deleted / self.seconds if self.seconds > 0 else 0.0
+    
+    def to_dict(self) -> dict:
+        """Converte para dicionário"""
+        return {
+            'table': self.table,
+            'deleted': self.deleted,
+            'batches': self.batches,
+            'seconds': round(self.seconds, 3),
+            'rows_per_second': round(self.rows_per_second, 1),
+            'partitions_dropped': self.partitions_dropped
+        }
+
+class PurgeEngine:
+    """Remove linhas expiradas em blocos curtos, liberando locks entre os blocos"""
+    
+    def purge(self, table: Table, column_name: str, cutoff: datetime, batch_size: int = 5000,
+              pause: float = 0.1, max_batches: Optional[int] = None,
+              drop_partitions: bool = False) -> PurgeResult:
+        """Remove linhas com column < cutoff"""
+        result = PurgeResult(table=table.name)
+        started = time.monotonic()
+        
+        if drop_partitions:
+            result.partitions_dropped = self.drop_expired_partitions(table.name, cutoff)
+        
+        column = table.c[column_name]
+        primary_key = table.primary_key.columns.values()[0]
+        # DELETE ... WHERE id IN (SELECT id ... LIMIT n): cada bloco é uma transação curta
+        statement = delete(table).where(
+            primary_key.in_(
+                select(primary_key).where(column < cutoff).limit(batch_size).scalar_subquery()
+            )
+        )
+        
+        while max_batches is None or result.batches < max_batches:
+            with db.engine.begin() as connection:
+                deleted = connection.execute(statement).rowcount
+            result.batches += 1
+            result.deleted += deleted
+            if deleted < batch_size:
+                break
+            if pause:
+                time.sleep(pause)
+        
+        result.seconds = time.monotonic() - started
+        metrics.inc(f'purge.{table.name}.deleted', result.deleted)
+        metrics.observe(f'purge.{table.name}', result.seconds)
+        logger.info(
+            f"Expurgo de {table.name}: {result.deleted} linhas em {result.batches} blocos, "
+            f"{result.seconds:.1f}s ({result.rows_per_second:.0f} linhas/s)"
+            + (f", partições removidas: {', '.join(result.partitions_dropped)}" if result.partitions_dropped else "")
+        )
+        return result
+    
+    def drop_expired_partitions(self, table_name: str, cutoff: datetime) -> List[str]:
+        """Remove partições por intervalo cujo limite superior é <= cutoff (apenas PostgreSQL)"""
+        if db.engine.dialect.name != 'postgresql':
+            return []
+        
+        with db.engine.begin() as connection:
+            rows = connection.execute(text("""
+                SELECT child.relname AS name, pg_get_expr(child.relpartbound, child.oid) AS bound
+                FROM pg_inherits
+                JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+                JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+                WHERE parent.relname = :table_name
+            """), {'table_name': table_name}).all()
+        
+        dropped = []
+        for row in rows:
+            match = PARTITION_UPPER_BOUND.search(row.bound or '')
+            if not match:
+                continue  # partição DEFAULT ou sem limite de tempo
+            try:
+                upper_bound = datetime.fromisoformat(match.group(1))
+            except ValueError:
+                continue
+            if upper_bound.tzinfo is not None:
+                upper_bound = upper_bound.replace(tzinfo=None)
+            if upper_bound > cutoff:
+                continue
+            
+            preparer = db.engine.dialect.identifier_preparer
+            with db.engine.begin() as connection:
+                connection.execute(text(
+                    f'ALTER TABLE {preparer.quote(table_name)} DETACH PARTITION {preparer.quote(row.name)}'
+                ))
+                connection.execute(text(f'DROP TABLE {preparer.quote(row.name)}'))
+            dropped.append(row.name)
+            metrics.inc(f'purge.{table_name}.partitions_dropped')
+        
+        return dropped
+
+# Instância global do expurgo
+purge_engine = PurgeEngine()
@@ -0,0 +1,30 @@
+"""
+Cliente Redis compartilhado
+"""
+import os
+import threading
+import redis
+from flask import current_app
+
+_clients = {}
+_lock = threading.Lock()
+
+def get_redis(url: str = None) -> redis.Redis:
+    """Obtém cliente Redis (um pool de conexões por processo)"""
+    url = url or current_app.config['REDIS_URL']
+    key = (os.getpid(), url)
+    
+    client = _clients.get(key)
+    if client is None:
+        with _lock:
+            client = _clients.get(key)
+            if client is None:
+                client = redis.Redis.from_url(
+                    url,
+                    decode_responses=True,
+                    socket_timeout=current_app.config.get('REDIS_SOCKET_TIMEOUT', 0.5),
+                    socket_connect_timeout=current_app.config.get('REDIS_SOCKET_TIMEOUT', 0.5),
+                    health_check_interval=30
+                )
+                _clients[key] = client
+    return client
@@ -1,27 +1,99 @@
 """
 Repositório base com operações CRUD genéricas
 """
-from typing import Type, TypeVar, Generic, List, Optional, Dict, Any
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Type, TypeVar, Generic, List, Optional, Dict, Any, Hashable, Tuple
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, desc, asc
+from sqlalchemy import (
+    ARRAY, and_, or_, desc, asc, any_, bindparam, case, column, delete, func, insert, select, text, update, values
+)
 from app import db
+from app.core.cache import LRUCache, MISSING
+from app.core.exceptions import ConflictError
+from app.core.metrics import metrics
 from app.domain.models import BaseModel
+from app.infra.unit_of_work import unit_of_work
 
 T = TypeVar('T', bound=BaseModel)
 
+COUNT_MODES = ('exact', 'estimated', 'none')
+
+# Totais recentes por conjunto de filtros (TTL curto, por worker)
+count_cache = LRUCache(maxsize=1024)
+metrics.register_gauge('count_cache', count_cache.stats)
+
+def is_unique_violation(error: IntegrityError) -> bool:
+    """Indica se o IntegrityError é violação de unicidade (SQLSTATE 23505 no PostgreSQL)"""
+    code = getattr(error.orig, 'sqlstate', None) or getattr(error.orig, 'pgcode', None)
+    if code:
+        return code == '23505'
+    return 'UNIQUE constraint failed' in str(error.orig) or 'Duplicate entry' in str(error.orig)
+
+@dataclass
+class BulkResult:
+    """Resultado de uma operação em lote"""
+    requested: int = 0
+    affected: int = 0
+    ids: List[int] = field(default_factory=list)  # ids criados/alterados/removidos (se o banco suporta RETURNING)
+    missing: List[int] = field(default_factory=list)  # ids pedidos que não existiam
+    
+    def to_dict(self) -> dict:
+        """Converte para dicionário"""
+        return {
+            'requested': self.requested,
+            'affected': self.affected,
+            'ids': self.ids,
+            'missing': self.missing
+        }
+
 class BaseRepository(Generic[T]):
     """Repositório base com operações CRUD"""
     
+    # Mensagem do ConflictError quando uma escrita viola uma restrição de unicidade
+    conflict_message = "Registro já existe"
+    
     def __init__(self, model_class: Type[T]):
         self.model_class = model_class
     
+    @contextmanager
+    def _conflict_on_unique(self):
+        """Converte violação de unicidade em ConflictError
+        
+        Dentro da unidade de trabalho a escrita roda num savepoint: o conflito desfaz só ela,
+        preservando o que a requisição já enviou ao banco. Fora dela desfaz a transação.
+        """
+        if not unit_of_work.active:
+            try:
+                yield
+            except IntegrityError as e:
+                db.session.rollback()
+                if is_unique_violation(e):
+                    raise ConflictError(self.conflict_message)
+                raise
+            return
+        
+        try:
+            with db.session.begin_nested():
+                yield
+        except IntegrityError as e:
+            if is_unique_violation(e):
+                raise ConflictError(self.conflict_message)
+            raise
+    
     def create(self, **kwargs) -> T:
-        """Cria um novo registro"""
+        """Cria um novo registro (INSERT ... RETURNING id; unicidade verificada pelo banco)"""
         instance = self.model_class(**kwargs)
-        db.session.add(instance)
-        db.session.commit()
+        with self._conflict_on_unique():
+            db.session.add(instance)
+            unit_of_work.commit()
         return instance
     
+    def _invalidate(self, ids):
+        """Ids alterados por uma escrita fora do flush do ORM (repositórios com cache sobrescrevem)"""
+    
     def get_by_id(self, id: int) -> Optional[T]:
         """Busca registro por ID"""
         return self.model_class.query.get(id)
@@ -40,28 +112,100 @@ class BaseRepository(Generic[T]):
         return query.all()
     
     def update(self, id: int, **kwargs) -> Optional[T]:
-        """Atualiza registro por ID"""
-        instance = self.get_by_id(id)
-        if instance:
-            for key, value in kwargs.items():
-                if hasattr(instance, key):
-                    setattr(instance, key, value)
-            db.session.commit()
+        """Atualiza registro por ID num único UPDATE ... RETURNING (valores podem ser expressões SQL)"""
+        values = {key: value for key, value in kwargs.items() if hasattr(self.model_class, key)}
+        if not values:
+            return self.get_by_id(id)
+        
+        statement = update(self.model_class).where(self.model_class.id == id).values(**values)
+        with self._conflict_on_unique():
+            if db.session.get_bind().dialect.update_returning:
+                instance = db.session.execute(
+                    statement.returning(self.model_class).execution_options(populate_existing=True)
+                ).scalar_one_or_none()
+            else:
+                instance = self.get_by_id(id) if db.session.execute(statement).rowcount else None
+            if instance is not None:
+                self._invalidate([id])
+            unit_of_work.commit()
         return instance
     
     def delete(self, id: int) -> bool:
-        """Remove registro por ID"""
-        instance = self.get_by_id(id)
-        if instance:
-            db.session.delete(instance)
-            db.session.commit()
-            return True
-        return False
+        """Remove registro por ID (um único DELETE)"""
+        deleted = db.session.execute(delete(self.model_class).where(self.model_class.id == id)).rowcount
+        if deleted:
+            self._invalidate([id])
+        unit_of_work.commit()
+        return deleted > 0
     
     def count(self) -> int:
         """Conta total de registros"""
         return self.model_class.query.count()
     
+    def count_where(self, conditions: Dict[str, Any], where: Any = None) -> Dict[str, int]:
+        """Conta vários filtros em uma única varredura (nome -> condição; None conta tudo)"""
+        if db.session.get_bind().dialect.name == 'postgresql':
+            columns = [
+                (func.count() if condition is None else func.count().filter(condition)).label(name)
+                for name, condition in conditions.items()
+            ]
+        else:
+            # Fallback portável: SUM(CASE ...) (COALESCE para tabela vazia)
+            columns = [
+                (func.count() if condition is None
+                 else func.coalesce(func.sum(case((condition, 1), else_=0)), 0)).label(name)
+                for name, condition in conditions.items()
+            ]
+        
+        query = select(*columns).select_from(self.model_class)
+        if where is not None:
+            query = query.where(where)
+        row = db.session.execute(query).one()
+        return {name: int(row._mapping[name]) for name in conditions}
+    
+    def count_query(self, query, mode: str = 'exact', cache_key: Optional[Hashable] = None) -> Tuple[Optional[int], bool]:
+        """Total de uma query no modo pedido (exact, estimated, none) -> (total, exato)"""
+        if mode == 'none':
+            return None, False
+        
+        ttl = current_app.config.get('COUNT_CACHE_SECONDS', 30)
+        key = (self.model_class.__tablename__, mode, cache_key) if cache_key is not None and ttl else None
+        if key is not None:
+            cached = count_cache.get(key)
+            if cached is not MISSING:
+                return cached
+        
+        result = None
+        if mode == 'estimated':
+            estimate = self.estimate_count(query)
+            # Estimativas de tabelas pequenas são imprecisas e a contagem exata é barata
+            if estimate is not None and estimate >= current_app.config.get('COUNT_EXACT_THRESHOLD', 10000):
+                result = (estimate, False)
+        if result is None:
+            result = (query.order_by(None).count(), True)
+        
+        if key is not None:
+            count_cache.set(key, result, ttl=ttl)
+        return result
+    
+    def estimate_count(self, query) -> Optional[int]:
+        """Estimativa do planejador do PostgreSQL (reltuples sem filtro, EXPLAIN com filtro)"""
+        connection = db.session.connection()
+        if connection.dialect.name != 'postgresql':
+            return None
+        
+        if query.whereclause is None:
+            estimate = connection.execute(
+                text('SELECT reltuples::bigint FROM pg_class WHERE oid = CAST(:table AS regclass)'),
+                {'table': self.model_class.__tablename__}
+            ).scalar()
+            # -1: tabela nunca analisada
+            return int(estimate) if estimate is not None and estimate >= 0 else None
+        
+        compiled = query.order_by(None).statement.compile(dialect=connection.dialect)
+        plan = connection.exec_driver_sql(f'EXPLAIN (FORMAT JSON) {compiled}', compiled.params).scalar()
+        return int(plan[0]['Plan']['Plan Rows'])
+    
     def exists(self, **kwargs) -> bool:
         """Verifica se registro existe"""
         return self.model_class.query.filter_by(**kwargs).first() is not None
@@ -74,12 +218,15 @@ class BaseRepository(Generic[T]):
         """Filtra registros por condições SQLAlchemy"""
         return self.model_class.query.filter(and_(*conditions)).all()
     
-    def search(self, search_term: str, fields: List[str]) -> List[T]:
+    def search(self, search_term: str, fields: List[str], limit: Optional[int] = None) -> List[T]:
         """Busca por termo em campos específicos"""
         conditions = []
-        for field in fields:
-            conditions.append(getattr(self.model_class, field).ilike(f'%{search_term}%'))
-        return self.model_class.query.filter(or_(*conditions)).all()
+        for column_name in fields:
+            conditions.append(getattr(self.model_class, column_name).ilike(f'%{search_term}%'))
+        query = self.model_class.query.filter(or_(*conditions))
+        if limit is not None:
+            query = query.limit(limit)
+        return query.all()
     
     def paginate(self, page: int = 1, per_page: int = 10, order_by: Optional[str] = None, 
                 order_direction: str = 'asc') -> tuple[List[T], int]:
@@ -102,26 +249,116 @@ class BaseRepository(Generic[T]):
         
         return items, total
     
-    def bulk_create(self, items: List[Dict[str, Any]]) -> List[T]:
-        """Cria múltiplos registros"""
-        instances = [self.model_class(**item) for item in items]
-        db.session.add_all(instances)
-        db.session.commit()
-        return instances
-    
-    def bulk_update(self, updates: List[Dict[str, Any]]) -> int:
-        """Atualiza múltiplos registros"""
-        count = 0
-        for update in updates:
-            id = update.pop('id')
-            if self.update(id, **update):
-                count += 1
-        return count
-    
-    def bulk_delete(self, ids: List[int]) -> int:
-        """Remove múltiplos registros"""
-        count = 0
-        for id in ids:
-            if self.delete(id):
-                count += 1
-        return count
+    def bulk_create(self, items: List[Dict[str, Any]], chunk_size: int = 1000) -> BulkResult:
+        """Cria múltiplos registros em uma transação (INSERT em executemany/insertmanyvalues)"""
+        table = self.model_class.__table__
+        result = BulkResult(requested=len(items))
+        if not items:
+            return result
+        
+        # RETURNING id: ids sem reler os registros depois do commit. Ordem garantida pelo
+        # insertmanyvalues no PostgreSQL; no SQLite pedir a ordem faria um INSERT por linha,
+        # e o VALUES de várias linhas já retorna na ordem de inserção.
+        dialect = db.session.get_bind().dialect
+        returning = dialect.insert_executemany_returning
+        statement = insert(table)
+        if returning:
+            statement = statement.returning(table.c.id, sort_by_parameter_order=dialect.name == 'postgresql')
+        
+        try:
+            for start in range(0, len(items), chunk_size):
+                executed = db.session.execute(statement, items[start:start + chunk_size])
+                if returning:
+                    result.ids.extend(executed.scalars())
+                else:
+                    result.affected += executed.rowcount
+            unit_of_work.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+    
+        if returning:
+            result.affected = len(result.ids)
+        return result
+    
+    def bulk_update(self, updates: List[Dict[str, Any]], chunk_size: int = 1000) -> BulkResult:
+        """Atualiza múltiplos registros (dicionários com id e colunas; ValueError se faltar o id) em uma transação"""
+        table = self.model_class.__table__
+        primary_key = table.c.id
+        result = BulkResult(requested=len(updates))
+        dialect = db.session.get_bind().dialect
+        
+        # Um comando por conjunto de colunas alteradas
+        groups: Dict[Tuple[str, ...], List[Dict[str, Any]]] = {}
+        for position, item in enumerate(updates):
+            if item.get('id') is None:
+                raise ValueError(f"Item {position} da atualização em lote sem 'id'")
+            columns = tuple(sorted(key for key in item if key != 'id' and key in table.c))
+            if columns:
+                groups.setdefault(columns, []).append(item)
+        
+        try:
+            for columns, items in groups.items():
+                for start in range(0, len(items), chunk_size):
+                    chunk = items[start:start + chunk_size]
+                    if dialect.name == 'postgresql':
+                        # UPDATE ... FROM (VALUES ...) AS changes(id, ...) WHERE id = changes.id
+                        changes = values(
+                            column('id', primary_key.type), *[column(name, table.c[name].type) for name in columns],
+                            name='changes'
+                        ).data([(item['id'], *[item[name] for name in columns]) for item in chunk])
+                        statement = update(table).where(primary_key == changes.c.id).values(
+                            {name: changes.c[name] for name in columns}
+                        )
+                    else:
+                        # Fallback portável: SET coluna = CASE id WHEN ... END WHERE id IN (...)
+                        statement = update(table).where(primary_key.in_([item['id'] for item in chunk])).values({
+                            name: case({item['id']: item[name] for item in chunk}, value=primary_key, else_=table.c[name])
+                            for name in columns
+                        })
+                    
+                    if dialect.update_returning:
+                        result.ids.extend(db.session.execute(statement.returning(primary_key)).scalars())
+                    else:
+                        result.affected += db.session.execute(statement).rowcount
+            self._invalidate(result.ids if dialect.update_returning else [item['id'] for item in updates])
+            unit_of_work.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        
+        if dialect.update_returning:
+            result.affected = len(result.ids)
+            result.missing = sorted({item['id'] for item in updates} - set(result.ids))
+        return result
+    
+    def bulk_delete(self, ids: List[int], chunk_size: int = 10000) -> BulkResult:
+        """Remove múltiplos registros em uma transação"""
+        table = self.model_class.__table__
+        primary_key = table.c.id
+        result = BulkResult(requested=len(ids))
+        dialect = db.session.get_bind().dialect
+        
+        try:
+            for start in range(0, len(ids), chunk_size):
+                chunk = list(ids[start:start + chunk_size])
+                if dialect.name == 'postgresql':
+                    # Um único parâmetro (array): mesmo SQL, e mesmo plano, para qualquer quantidade de ids
+                    statement = delete(table).where(primary_key == any_(bindparam('ids', chunk, type_=ARRAY(primary_key.type))))
+                else:
+                    statement = delete(table).where(primary_key.in_(chunk))
+                
+                if dialect.delete_returning:
+                    result.ids.extend(db.session.execute(statement.returning(primary_key)).scalars())
+                else:
+                    result.affected += db.session.execute(statement).rowcount
+            self._invalidate(result.ids if dialect.delete_returning else ids)
+            unit_of_work.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        
+        if dialect.delete_returning:
+            result.affected = len(result.ids)
+            result.missing = sorted(set(ids) - set(result.ids))
+        return result
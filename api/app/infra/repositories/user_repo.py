@@ -1,19 +1,55 @@
 """
 Repositório específico para usuários
 """
-from typing import List, Optional, Tuple
-from sqlalchemy import and_, or_, desc, asc, func
+import csv
+import io
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from sqlalchemy import (
+    and_, or_, desc, asc, case, func, select, update, delete, insert, text, values, column, bindparam, literal,
+    Boolean, Column, Integer, DateTime, MetaData, String, Table
+)
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.schema import CreateTable
 from datetime import datetime, timedelta
-from app.domain.models import User
+from app import db
+from app.domain.models import User, UserCounter
+from app.infra.search import user_search
+from app.infra.user_cache import user_cache
+from app.infra.unit_of_work import unit_of_work
+from app.core.pagination import KeysetPage, KeysetPaginator
 from app.domain.dtos import UserQueryDTO, UserStatsDTO, UserRole, UserStatus
 from .base import BaseRepository
 
+# Tabela temporária da importação (uma por conexão; fora do db.metadata, não entra no create_all)
+user_import_staging = Table(
+    'user_import_staging', MetaData(),
+    Column('line', Integer),
+    Column('email', String(255)),
+    Column('password_hash', String(255)),
+    Column('name', String(255)),
+    Column('role', String(50)),
+    Column('status', String(50)),
+    Column('is_active', Boolean),
+    prefixes=['TEMPORARY']
+)
+
 class UserRepository(BaseRepository[User]):
     """Repositório para usuários"""
     
+    conflict_message = "Email já está em uso"
+    
     def __init__(self):
         super().__init__(User)
     
+    def _invalidate(self, ids):
+        """Usuários alterados saem do cache de identidade após o commit"""
+        user_cache.invalidate(ids)
+    
+    def get_cached(self, user_id: int) -> Optional[User]:
+        """Busca usuário pelo cache de identidade (somente leitura, sem password_hash)"""
+        return user_cache.get(user_id)
+    
     def find_by_email(self, email: str) -> Optional[User]:
         """Busca usuário por email"""
         return self.get_by_field('email', email)
@@ -34,21 +70,24 @@ class UserRepository(BaseRepository[User]):
         """Busca usuários inativos"""
         return self.filter_by(is_active=False)
     
-    def search_users(self, search_term: str) -> List[User]:
-        """Busca usuários por termo"""
-        return self.search(search_term, ['name', 'email'])
+    def search_users(self, search_term: str, limit: Optional[int] = None) -> List[User]:
+        """Busca usuários por termo: email exato, depois prefixo, depois substring (sem acento)"""
+        query, rank = user_search.apply(User.query, search_term)
+        # Ordenação e LIMIT no banco: o custo depende de limit, não da quantidade de resultados
+        ordering = [user_search.tier(search_term)] + ([desc(rank)] if rank is not None else []) + [User.id]
+        query = query.order_by(*ordering)
+        if limit is not None:
+            query = query.limit(limit)
+        return query.all()
     
-    def get_users_with_pagination(self, query_dto: UserQueryDTO) -> Tuple[List[User], int]:
-        """Busca usuários com paginação e filtros"""
+    def _filtered_users_query(self, query_dto: UserQueryDTO, columns: Optional[Sequence[str]] = None):
+        """Query de usuários com os filtros da listagem (apenas as colunas pedidas, como Row, se informadas)"""
         query = User.query
+        if columns:
+            query = query.with_entities(*[getattr(User, name) for name in columns])
         
-        # Filtros
         if query_dto.search:
-            search_conditions = [
-                User.name.ilike(f'%{query_dto.search}%'),
-                User.email.ilike(f'%{query_dto.search}%')
-            ]
-            query = query.filter(or_(*search_conditions))
+            query, _ = user_search.apply(query, query_dto.search)
         
         if query_dto.role:
             query = query.filter(User.role == query_dto.role.value)
@@ -56,6 +95,13 @@ class UserRepository(BaseRepository[User]):
         if query_dto.status:
             query = query.filter(User.status == query_dto.status.value)
         
+        return query
+    
+    def get_users_with_pagination(self, query_dto: UserQueryDTO,
+                                  columns: Optional[Sequence[str]] = None) -> Tuple[List[User], Optional[int], bool, bool]:
+        """Busca usuários com paginação e filtros -> (usuários, total, total exato, há próxima página)"""
+        query = self._filtered_users_query(query_dto, columns)
+        
         # Ordenação
         if hasattr(User, query_dto.sort_by):
             if query_dto.sort_order.lower() == 'desc':
@@ -63,62 +109,130 @@ class UserRepository(BaseRepository[User]):
             else:
                 query = query.order_by(asc(getattr(User, query_dto.sort_by)))
         
-        # Contar total
-        total = query.count()
+        # Contar total (exato, estimado ou nenhum), reaproveitando contagens recentes do mesmo filtro
+        total, total_is_exact = self.count_filtered_users(query_dto, query_dto.count_mode, query)
         
-        # Aplicar paginação
+        # Aplicar paginação (uma linha a mais indica se há próxima página sem depender do total)
         offset = (query_dto.page - 1) * query_dto.per_page
-        users = query.offset(offset).limit(query_dto.per_page).all()
+        users = query.offset(offset).limit(query_dto.per_page + 1).all()
+        has_next = len(users) > query_dto.per_page
         
-        return users, total
+        return users[:query_dto.per_page], total, total_is_exact, has_next
+    
+    def count_filtered_users(self, query_dto: UserQueryDTO, mode: str = 'exact', query=None) -> Tuple[Optional[int], bool]:
+        """Total de usuários dos filtros da listagem no modo pedido -> (total, exato), com cache por filtro"""
+        filters = (
+            query_dto.search,
+            query_dto.role.value if query_dto.role else None,
+            query_dto.status.value if query_dto.status else None
+        )
+        if query is None:
+            query = self._filtered_users_query(query_dto)
+        return self.count_query(query, mode, cache_key=filters)
+    
+    def stream_users(self, query_dto: UserQueryDTO, columns: Sequence[str], batch_size: int = 1000):
+        """Rows dos usuários dos filtros da listagem, na ordem dela, lidas com cursor no servidor (yield_per)"""
+        order = desc if query_dto.sort_order.lower() == 'desc' else asc
+        query = self._filtered_users_query(query_dto, columns).order_by(
+            order(getattr(User, query_dto.sort_by)), order(User.id)
+        )
+        return query.yield_per(batch_size)
+    
+    def get_users_with_cursor(self, query_dto: UserQueryDTO, columns: Optional[Sequence[str]] = None) -> KeysetPage:
+        """Busca usuários por cursor (keyset), com id como desempate da ordenação"""
+        return KeysetPaginator(
+            getattr(User, query_dto.sort_by), User.id, query_dto.sort_order, query_dto.per_page
+        ).paginate(self._filtered_users_query(query_dto, columns), query_dto.cursor)
     
     def get_user_stats(self) -> UserStatsDTO:
-        """Obtém estatísticas de usuários"""
+        """Obtém estatísticas de usuários (contadores mantidos por triggers + índice de created_at)"""
         now = datetime.utcnow()
-        today = now.date()
+        today_start = datetime.combine(now.date(), datetime.min.time())
         week_ago = now - timedelta(days=7)
         month_ago = now - timedelta(days=30)
         
-        # Contagens básicas
-        total_users = User.query.count()
-        active_users = User.query.filter_by(is_active=True).count()
-        inactive_users = User.query.filter_by(is_active=False).count()
-        
-        # Contagens por status
-        pending_users = User.query.filter_by(status='pending').count()
-        suspended_users = User.query.filter_by(status='suspended').count()
-        
-        # Contagens por role
-        admin_users = User.query.filter_by(role='admin').count()
-        developer_users = User.query.filter_by(role='developer').count()
-        user_users = User.query.filter_by(role='user').count()
-        
-        # Contagens por período
-        users_created_today = User.query.filter(
-            func.date(User.created_at) == today
-        ).count()
-        
-        users_created_this_week = User.query.filter(
-            User.created_at >= week_ago
-        ).count()
-        
-        users_created_this_month = User.query.filter(
-            User.created_at >= month_ago
-        ).count()
-        
-        return UserStatsDTO(
-            total_users=total_users,
-            active_users=active_users,
-            inactive_users=inactive_users,
-            pending_users=pending_users,
-            suspended_users=suspended_users,
-            admin_users=admin_users,
-            developer_users=developer_users,
-            user_users=user_users,
-            users_created_today=users_created_today,
-            users_created_this_week=users_created_this_week,
-            users_created_this_month=users_created_this_month
-        )
+        totals = self.get_counter_totals()
+        if totals is None:
+            # Triggers ainda não aplicados (`flask apply-ddl`): uma varredura da tabela
+            totals = self.count_where({
+                # Contagens básicas
+                'total_users': None,
+                'active_users': User.is_active.is_(True),
+                'inactive_users': User.is_active.is_(False),
+                # Contagens por status
+                'pending_users': User.status == 'pending',
+                'suspended_users': User.status == 'suspended',
+                # Contagens por role
+                'admin_users': User.role == 'admin',
+                'developer_users': User.role == 'developer',
+                'user_users': User.role == 'user',
+            })
+        
+        # Contagens por período: só lê o intervalo do último mês (ix_users_created_at)
+        recent = self.count_where({
+            'users_created_today': and_(User.created_at >= today_start,
+                                        User.created_at < today_start + timedelta(days=1)),
+            'users_created_this_week': User.created_at >= week_ago,
+            'users_created_this_month': None,
+        }, where=User.created_at >= month_ago)
+        
+        return UserStatsDTO(**totals, **recent)
+    
+    def get_counter_totals(self) -> Optional[Dict[str, int]]:
+        """Totais a partir de user_counters (None se os contadores não estiverem populados)"""
+        rows = db.session.execute(
+            select(UserCounter.role, UserCounter.status, UserCounter.is_active, UserCounter.count)
+        ).all()
+        if not rows and db.session.execute(select(User.id).limit(1)).first() is not None:
+            return None
+        
+        totals = dict.fromkeys((
+            'total_users', 'active_users', 'inactive_users', 'pending_users', 'suspended_users',
+            'admin_users', 'developer_users', 'user_users'
+        ), 0)
+        for role, status, is_active, count in rows:
+            totals['total_users'] += count
+            totals['active_users' if is_active else 'inactive_users'] += count
+            if status in ('pending', 'suspended'):
+                totals[f'{status}_users'] += count
+            if role in ('admin', 'developer', 'user'):
+                totals[f'{role}_users'] += count
+        return totals
+    
+    def rebuild_user_counters(self) -> List[Tuple[str, str, bool, int, int]]:
+        """Recalcula user_counters a partir de users e retorna as divergências encontradas"""
+        counters = UserCounter.__table__
+        users = User.__table__
+        
+        if db.session.get_bind().dialect.name == 'postgresql':
+            # Bloqueia escritas em users até o commit para a contagem não ficar defasada
+            db.session.execute(text('LOCK TABLE users IN SHARE MODE'))
+        
+        before = {
+            (row.role, row.status, row.is_active): row.count
+            for row in db.session.execute(select(counters))
+        }
+        actual = {
+            (row.role, row.status, row.is_active): row.count
+            for row in db.session.execute(
+                select(users.c.role, users.c.status, users.c.is_active, func.count().label('count'))
+                .group_by(users.c.role, users.c.status, users.c.is_active)
+            )
+        }
+        
+        db.session.execute(delete(counters))
+        if actual:
+            db.session.execute(insert(counters), [
+                {'role': role, 'status': status, 'is_active': is_active, 'count': count}
+                for (role, status, is_active), count in actual.items()
+            ])
+        unit_of_work.commit()
+        
+        return [
+            (role, status, is_active, before.get((role, status, is_active), 0), actual.get((role, status, is_active), 0))
+            for role, status, is_active in sorted(set(before) | set(actual), key=str)
+            if before.get((role, status, is_active), 0) != actual.get((role, status, is_active), 0)
+        ]
     
     def get_recent_logins(self, days: int = 7) -> List[User]:
         """Busca usuários que fizeram login recentemente"""
@@ -136,56 +250,232 @@ class UserRepository(BaseRepository[User]):
             )
         ).order_by(desc(User.created_at)).all()
     
+    def update_user(self, user_id: int, revoke_tokens: bool = False, **values) -> Optional[User]:
+        """Atualiza usuário num único UPDATE ... RETURNING, incrementando o epoch de tokens se pedido
+        
+        Com `role`, o epoch também sobe quando a role muda de fato (comparada à atual no próprio
+        UPDATE): os tokens trazem a role nos claims e não podem continuar valendo com a antiga.
+        """
+        if revoke_tokens:
+            values['token_epoch'] = User.token_epoch + 1
+        elif 'role' in values:
+            values['token_epoch'] = User.token_epoch + case((User.role != values['role'], 1), else_=0)
+        return self.update(user_id, **values)
+    
+    def set_status(self, user_id: int, status: str, revoke_tokens: bool = False) -> Optional[Tuple[str, int]]:
+        """Altera status (e is_active) num único UPDATE ... RETURNING -> (email, token_epoch)"""
+        values = {'status': status, 'is_active': status == 'active'}
+        if revoke_tokens:
+            values['token_epoch'] = User.token_epoch + 1
+        row = db.session.execute(
+            update(User).where(User.id == user_id).values(**values).returning(User.email, User.token_epoch)
+        ).one_or_none()
+        if row:
+            self._invalidate([user_id])
+        unit_of_work.commit()
+        return tuple(row) if row else None
+    
+    def delete_user(self, user_id: int) -> Optional[Tuple[str, int]]:
+        """Remove usuário num único DELETE ... RETURNING -> (email, token_epoch)"""
+        row = db.session.execute(
+            delete(User).where(User.id == user_id).returning(User.email, User.token_epoch)
+        ).one_or_none()
+        if row:
+            self._invalidate([user_id])
+        unit_of_work.commit()
+        return tuple(row) if row else None
+    
     def activate_user(self, user_id: int) -> bool:
         """Ativa usuário"""
-        user = self.get_by_id(user_id)
-        if user:
-            user.is_active = True
-            user.status = 'active'
-            db.session.commit()
-            return True
-        return False
+        return self.set_status(user_id, 'active') is not None
     
     def deactivate_user(self, user_id: int) -> bool:
         """Desativa usuário"""
-        user = self.get_by_id(user_id)
-        if user:
-            user.is_active = False
-            user.status = 'inactive'
-            db.session.commit()
-            return True
-        return False
+        return self.set_status(user_id, 'inactive') is not None
     
     def suspend_user(self, user_id: int) -> bool:
         """Suspende usuário"""
-        user = self.get_by_id(user_id)
-        if user:
-            user.is_active = False
-            user.status = 'suspended'
-            db.session.commit()
-            return True
-        return False
+        return self.set_status(user_id, 'suspended') is not None
     
     def update_user_role(self, user_id: int, role: str) -> bool:
         """Atualiza role do usuário"""
         user = self.get_by_id(user_id)
         if user:
             user.role = role
-            db.session.commit()
+            unit_of_work.commit()
             return True
         return False
     
+    def _bulk_target(self, ids: Optional[Sequence[int]] = None, query_dto: Optional[UserQueryDTO] = None,
+                     exclude_ids: Sequence[int] = ()):
+        """Condição dos usuários de uma operação em lote (lista de ids ou filtros da listagem)"""
+        if ids is not None:
+            condition = User.id.in_(ids)
+        else:
+            matched = self._filtered_users_query(query_dto, ['id']).subquery()
+            condition = User.id.in_(select(matched.c.id))
+        if exclude_ids:
+            condition = and_(condition, User.id.not_in(exclude_ids))
+        return condition
+    
+    def count_bulk_targets(self, ids: Optional[Sequence[int]] = None, query_dto: Optional[UserQueryDTO] = None,
+                           exclude_ids: Sequence[int] = ()) -> int:
+        """Quantidade de usuários alcançados por uma operação em lote"""
+        return db.session.execute(
+            select(func.count()).select_from(User).where(self._bulk_target(ids, query_dto, exclude_ids))
+        ).scalar_one()
+    
+    def get_bulk_target_ids(self, ids: Optional[Sequence[int]] = None, query_dto: Optional[UserQueryDTO] = None,
+                            exclude_ids: Sequence[int] = ()) -> List[int]:
+        """Ids dos usuários alcançados por uma operação em lote, em ordem"""
+        return list(db.session.execute(
+            select(User.id).where(self._bulk_target(ids, query_dto, exclude_ids)).order_by(User.id)
+        ).scalars())
+    
+    def bulk_update_users(self, changes: Dict[str, Any], ids: Optional[Sequence[int]] = None,
+                          query_dto: Optional[UserQueryDTO] = None, exclude_ids: Sequence[int] = (),
+                          bump_token_epoch: bool = False) -> List[Tuple[int, int]]:
+        """Aplica as alterações num único UPDATE, pulando quem já está no estado pedido -> [(id, token_epoch)]"""
+        values = dict(changes)
+        if bump_token_epoch:
+            values['token_epoch'] = User.token_epoch + 1
+        
+        statement = (
+            update(User)
+            .where(self._bulk_target(ids, query_dto, exclude_ids))
+            .where(or_(*[getattr(User, name).is_distinct_from(value) for name, value in changes.items()]))
+            .values(**values)
+            .returning(User.id, User.token_epoch)
+            .execution_options(synchronize_session=False)
+        )
+        rows = db.session.execute(statement).all()
+        self._invalidate([user_id for user_id, _ in rows])
+        unit_of_work.commit()
+        return [(user_id, epoch) for user_id, epoch in rows]
+    
+    def find_existing_emails(self, emails: Sequence[str]) -> set:
+        """Emails da lista que já pertencem a algum usuário (uma consulta por lote)"""
+        if not emails:
+            return set()
+        return set(db.session.execute(select(User.email).where(User.email.in_(emails))).scalars())
+    
+    def import_users(self, rows: List[Dict[str, Any]]) -> List[Tuple[int, str, str]]:
+        """Carrega usuários via tabela temporária e um INSERT ... SELECT ... ON CONFLICT DO NOTHING
+        
+        No PostgreSQL a tabela temporária é preenchida com COPY (psycopg2 `copy_expert`); nos demais
+        bancos, com um INSERT em executemany. Emails já existentes são ignorados pelo índice único,
+        inclusive os cadastrados depois da verificação prévia -> [(id, email, nome)] dos criados.
+        """
+        if not rows:
+            return []
+        
+        staging = user_import_staging
+        columns = [column.name for column in staging.columns]
+        connection = db.session.connection()
+        dialect = connection.dialect.name
+        connection.execute(CreateTable(staging, if_not_exists=True))
+        
+        if dialect == 'postgresql':
+            buffer = io.StringIO()
+            csv.writer(buffer).writerows([row[name] for name in columns] for row in rows)
+            buffer.seek(0)
+            with connection.connection.cursor() as cursor:
+                cursor.copy_expert(f"COPY {staging.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+        else:
+            connection.execute(insert(staging), rows)
+        
+        now = datetime.utcnow()
+        dialect_insert = pg_insert if dialect == 'postgresql' else sqlite_insert
+        statement = (
+            dialect_insert(User.__table__)
+            .from_select(
+                ['email', 'password_hash', 'name', 'role', 'status', 'is_active',
+                 'login_count', 'token_epoch', 'created_at', 'updated_at'],
+                select(
+                    staging.c.email, staging.c.password_hash, staging.c.name, staging.c.role,
+                    staging.c.status, staging.c.is_active,
+                    literal(0), literal(0), literal(now, DateTime), literal(now, DateTime)
+                ).order_by(staging.c.line)
+            )
+            .on_conflict_do_nothing(index_elements=['email'])
+            .returning(User.id, User.email, User.name)
+        )
+        created = [tuple(row) for row in db.session.execute(statement)]
+        db.session.execute(delete(staging))
+        unit_of_work.commit()
+        return created
+    
     def update_last_login(self, user_id: int, ip_address: Optional[str] = None) -> bool:
         """Atualiza informações de último login"""
-        user = self.get_by_id(user_id)
-        if user:
-            user.last_login = datetime.utcnow()
-            user.login_count += 1
-            if ip_address:
-                user.last_ip = ip_address
-            db.session.commit()
-            return True
-        return False
+        return self.apply_login_batch([(user_id, datetime.utcnow(), 1, ip_address)]) == 1
+    
+    def apply_login_batch(self, logins: List[Tuple[int, datetime, int, Optional[str]]],
+                          chunk_size: int = 1000) -> int:
+        """Aplica logins agregados (user_id, último login, quantidade, último IP) em lote"""
+        users = User.__table__
+        updated = 0
+        
+        if db.session.get_bind().dialect.name == 'postgresql':
+            # Um UPDATE ... FROM (VALUES ...) por bloco
+            for start in range(0, len(logins), chunk_size):
+                batch = values(
+                    column('id', Integer), column('last_login', DateTime),
+                    column('login_count', Integer), column('last_ip', String(45)),
+                    name='logins'
+                ).data(logins[start:start + chunk_size])
+                result = db.session.execute(
+                    update(users)
+                    .where(users.c.id == batch.c.id)
+                    .values(
+                        last_login=func.greatest(func.coalesce(users.c.last_login, batch.c.last_login), batch.c.last_login),
+                        login_count=users.c.login_count + batch.c.login_count,
+                        last_ip=func.coalesce(batch.c.last_ip, users.c.last_ip)
+                    )
+                )
+                updated += result.rowcount
+        else:
+            # Sem suporte a VALUES nomeado: mesmo UPDATE em executemany
+            result = db.session.execute(
+                update(users)
+                .where(users.c.id == bindparam('b_id'))
+                .values(
+                    last_login=bindparam('b_last_login'),
+                    login_count=users.c.login_count + bindparam('b_login_count'),
+                    last_ip=func.coalesce(bindparam('b_last_ip'), users.c.last_ip)
+                ),
+                [
+                    {'b_id': user_id, 'b_last_login': last_login, 'b_login_count': count, 'b_last_ip': ip_address}
+                    for user_id, last_login, count, ip_address in logins
+                ]
+            )
+            updated += result.rowcount
+        
+        self._invalidate([user_id for user_id, _, _, _ in logins])
+        unit_of_work.commit()
+        return updated
+    
+    def update_password_hash_if_unchanged(self, user_id: int, old_hash: str, new_hash: str) -> bool:
+        """Substitui o hash da senha apenas se ele não foi alterado no meio tempo"""
+        updated = User.query.filter_by(id=user_id, password_hash=old_hash).update(
+            {'password_hash': new_hash}, synchronize_session=False
+        )
+        if updated:
+            self._invalidate([user_id])
+        unit_of_work.commit()
+        return updated == 1
+    
+    def bump_token_epoch(self, user_id: int) -> Optional[int]:
+        """Incrementa o epoch de tokens do usuário e retorna o novo valor"""
+        epoch = db.session.execute(
+            update(User)
+            .where(User.id == user_id)
+            .values(token_epoch=User.token_epoch + 1)
+            .returning(User.token_epoch)
+        ).scalar_one_or_none()
+        if epoch is not None:
+            self._invalidate([user_id])
+        unit_of_work.commit()
+        return epoch
     
     def get_admins(self) -> List[User]:
         """Busca todos os administradores"""
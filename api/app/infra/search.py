@@ -0,0 +1,82 @@
+"""
+Busca textual de usuários
+"""
+import re
+from typing import Optional, Tuple
+from sqlalchemy import case, column, false, func, or_, select, table
+from sqlalchemy.sql import ColumnElement
+from app import db
+from app.core.utils import normalize_search_text
+from app.domain.models import User
+
+# Tabela FTS5 do SQLite (criada pelo bloco 'user_search' do ddl_registry)
+users_fts = table('users_fts', column('rowid'), column('users_fts'))
+
+class UserSearchBackend:
+    """Filtro e relevância da busca por nome/email conforme o banco
+    
+    - trigram: PostgreSQL com pg_trgm + unaccent (substring sem acento, ranking por similarity)
+    - fts: SQLite FTS5 com remove_diacritics (prefixo de palavra, ranking por bm25)
+    - like: ILIKE '%termo%' (sem índice, sem ranking)
+    """
+    
+    def __init__(self):
+        self.backend = 'auto'
+    
+    def init_app(self, app):
+        """Configura o backend a partir da aplicação"""
+        self.backend = app.config.get('USER_SEARCH_BACKEND', 'auto')
+    
+    def resolve(self) -> str:
+        """Backend efetivo para o banco da sessão"""
+        if self.backend != 'auto':
+            return self.backend
+        dialect = db.session.get_bind().dialect.name
+        return {'postgresql': 'trigram', 'sqlite': 'fts'}.get(dialect, 'like')
+    
+    def apply(self, query, search_term: str) -> Tuple[object, Optional[ColumnElement]]:
+        """Filtra a query (Query do ORM) pelo termo -> (query, relevância; maior é melhor, None sem ranking)"""
+        backend = self.resolve()
+        term = normalize_search_text(search_term)
+        if not term:
+            return query, None
+        
+        if backend == 'trigram':
+            name = func.f_unaccent(func.lower(User.name))
+            email = func.lower(User.email)
+            query = query.filter(or_(name.contains(term, autoescape=True), email.contains(term, autoescape=True)))
+            return query, func.greatest(func.similarity(name, term), func.similarity(email, term))
+        
+        if backend == 'fts':
+            match = self.fts_query(term)
+            if not match:
+                return query.filter(false()), None
+            ranked = (
+                select(users_fts.c.rowid.label('id'), (-func.bm25(users_fts.c.users_fts)).label('rank'))
+                .where(users_fts.c.users_fts.op('MATCH')(match))
+                .subquery('search_rank')
+            )
+            return query.join(ranked, User.id == ranked.c.id), ranked.c.rank
+        
+        query = query.filter(or_(User.name.ilike(f'%{search_term}%'), User.email.ilike(f'%{search_term}%')))
+        return query, None
+    
+    def tier(self, search_term: str) -> ColumnElement:
+        """Faixa de relevância: 0 = email igual ao termo, 1 = prefixo do email ou do nome, 2 = demais"""
+        term = normalize_search_text(search_term)
+        email = func.lower(User.email)
+        name = func.f_unaccent(func.lower(User.name)) if self.resolve() == 'trigram' else func.lower(User.name)
+        return case(
+            (email == term, 0),
+            (or_(email.startswith(term, autoescape=True), name.startswith(term, autoescape=True)), 1),
+            else_=2
+        )
+    
+    @staticmethod
+    def fts_query(term: str) -> str:
+        """Consulta FTS5: todas as palavras do termo como prefixo ("joao"* "silva"*)"""
+        tokens = re.findall(r'\w+', term)
+        return ' '.join(f'"{token}"*' for token in tokens)
+
+# Instância global da busca
+user_search = UserSearchBackend()
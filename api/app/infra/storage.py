@@ -3,7 +3,7 @@ Sistema de armazenamento da aplicação
 """
 import os
 import uuid
-from typing import Optional, BinaryIO
+from typing import Iterable, Optional, BinaryIO
 from flask import current_app
 from werkzeug.utils import secure_filename
 from app.core.logging import get_logger
@@ -84,6 +84,34 @@ class StorageManager:
             logger.error(f"Erro ao salvar arquivo {filename}: {str(e)}")
             return None
     
+    def save_stream(self, chunks: Iterable[bytes], filename: str, file_type: str = 'exports',
+                    max_size: Optional[int] = None) -> Optional[str]:
+        """Salva arquivo recebido ou gerado em blocos (importações, exportações), sem montá-lo em memória"""
+        upload_path = os.path.join(self.upload_folder, file_type)
+        os.makedirs(upload_path, exist_ok=True)
+        file_path = os.path.join(upload_path, self._generate_unique_filename(secure_filename(filename)))
+        
+        try:
+            written = 0
+            with open(file_path, 'wb') as file:
+                for chunk in chunks:
+                    written += len(chunk)
+                    if max_size is not None and written > max_size:
+                        break
+                    file.write(chunk)
+            if max_size is not None and written > max_size:
+                os.remove(file_path)
+                logger.warning(f"Arquivo muito grande: mais de {max_size} bytes")
+                return None
+        except Exception:
+            if os.path.exists(file_path):
+                os.remove(file_path)
+            raise
+        
+        relative_path = os.path.relpath(file_path, self.upload_folder)
+        logger.info(f"Arquivo salvo: {relative_path}")
+        return relative_path
+    
     def delete_file(self, file_path: str) -> bool:
         """Remove arquivo do sistema"""
         try:
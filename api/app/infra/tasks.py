@@ -7,6 +7,8 @@ from app.core.logging import get_logger
 from app.infra.mailer import mailer
 from app.infra.storage import storage
 from app.infra.repositories.user_repo import UserRepository
+from app.infra.unit_of_work import unit_of_work
+from app.infra.db_router import db_router
 
 logger = get_logger(__name__)
 
@@ -25,10 +27,10 @@ def init_celery(app):
         enable_utc=True,
     )
     
-    # Contexto da aplicação para tarefas
+    # Contexto da aplicação e unidade de trabalho (um commit por tarefa) para tarefas
     class ContextTask(celery.Task):
         def __call__(self, *args, **kwargs):
-            with app.app_context():
+            with app.app_context(), unit_of_work.scope():
                 return self.run(*args, **kwargs)
     
     celery.Task = ContextTask
@@ -88,6 +90,7 @@ def cleanup_old_files_task(days: int = 30):
         return 0
 
 @celery.task
+@db_router.replica()
 def generate_user_report_task(user_id: int, report_type: str = 'summary'):
     """Tarefa para gerar relatório de usuário"""
     try:
@@ -123,6 +126,7 @@ def backup_database_task():
         return False
 
 @celery.task
+@db_router.replica()
 def send_daily_stats_task():
     """Tarefa para enviar estatísticas diárias"""
     try:
@@ -152,20 +156,84 @@ def cleanup_expired_tokens_task():
     """Tarefa para limpeza de tokens expirados"""
     try:
         from app.domain.models import BlacklistedToken
+        from app.infra.purge import purge_engine
         from datetime import datetime
         
-        # Remover tokens expirados da blacklist
-        expired_tokens = BlacklistedToken.query.filter(
-            BlacklistedToken.expires_at < datetime.utcnow()
-        ).all()
+        # Remover tokens expirados da blacklist em blocos
+        result = purge_engine.purge(
+            BlacklistedToken.__table__,
+            'expires_at',
+            datetime.utcnow(),
+            batch_size=current_app.config.get('TOKEN_PURGE_BATCH_SIZE', 5000),
+            pause=current_app.config.get('TOKEN_PURGE_PAUSE_SECONDS', 0.1),
+            drop_partitions=current_app.config.get('TOKEN_PURGE_DROP_PARTITIONS', False)
+        )
         
-        for token in expired_tokens:
-            db.session.delete(token)
-        
-        db.session.commit()
-        
-        logger.info(f"Limpeza de tokens: {len(expired_tokens)} tokens removidos")
-        return len(expired_tokens)
+        logger.info(f"Limpeza de tokens: {result.deleted} tokens removidos ({result.rows_per_second:.0f}/s)")
+        return result.deleted
     except Exception as e:
         logger.error(f"Erro na tarefa de limpeza de tokens: {str(e)}")
         return 0
+
+@celery.task(bind=True)
+def bulk_user_action_task(self, action: str, role: str = None, ids: list = None, filters: dict = None,
+                          exclude_ids: list = None):
+    """Tarefa para ação em lote sobre usuários, em blocos de ids com progresso consultável"""
+    from app.api.v1.users.service import UserService
+    
+    def report(processed, total, affected):
+        self.update_state(state='PROGRESS', meta={'processed': processed, 'total': total, 'affected': affected})
+    
+    try:
+        # Um commit por bloco: transações curtas e progresso visível para outras conexões
+        with unit_of_work.autocommit():
+            affected = UserService().apply_bulk_user_action(
+                action, role, ids, filters, exclude_ids or [],
+                chunk_size=current_app.config.get('USER_BULK_CHUNK_SIZE', 1000),
+                progress=report
+            )
+        logger.info(f"Ação em lote {action} concluída: {affected} usuários alterados")
+        return {'action': action, 'affected': affected}
+    except Exception as e:
+        logger.error(f"Erro na tarefa de ação em lote {action}: {str(e)}")
+        raise
+
+@celery.task(bind=True)
+@db_router.replica()
+def export_users_task(self, fmt: str, filters: dict = None, sort_by: str = 'id', sort_order: str = 'asc',
+                      owner_id: int = None):
+    """Tarefa para exportação grande de usuários, gravada no storage com progresso consultável"""
+    from app.api.v1.users.service import UserService
+    
+    # Tipo e dono acompanham progresso e resultado: a consulta só responde a quem enfileirou
+    owner = {'task_type': 'export', 'owner_id': owner_id}
+    
+    def report(rows):
+        self.update_state(state='PROGRESS', meta={'rows': rows, **owner})
+    
+    try:
+        result = UserService().export_users_to_storage(fmt, filters, sort_by, sort_order, progress=report)
+        return dict(result, **owner)
+    except Exception as e:
+        logger.error(f"Erro na tarefa de exportação de usuários ({fmt}): {str(e)}")
+        raise
+
+@celery.task(bind=True)
+def import_users_task(self, path: str, fmt: str, owner_id: int = None):
+    """Tarefa para importação de usuários a partir de um arquivo do storage, com progresso consultável"""
+    from app.api.v1.users.service import UserService
+    
+    owner = {'task_type': 'import', 'owner_id': owner_id}
+    
+    def report(total, created, rejected):
+        self.update_state(state='PROGRESS', meta={'total': total, 'created': created, 'rejected': rejected, **owner})
+    
+    try:
+        # Um commit por lote: transações curtas e usuários visíveis enquanto a importação avança
+        with unit_of_work.autocommit():
+            summary = UserService().import_users_from_storage(path, fmt, progress=report)
+        logger.info(f"Importação de usuários concluída: {summary['created']} criados, {summary['rejected']} rejeitados")
+        return dict(summary, **owner)
+    except Exception as e:
+        logger.error(f"Erro na tarefa de importação de usuários ({fmt}): {str(e)}")
+        raise
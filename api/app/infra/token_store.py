@@ -0,0 +1,349 @@
+"""
+Revogação de tokens JWT (Redis + filtro de Bloom por worker)
+"""
+import os
+import threading
+from datetime import datetime
+from functools import partial
+from typing import Optional, Sequence, Tuple
+import redis
+from sqlalchemy import select
+from app import db
+from app.core.bloom import BloomFilter
+from app.core.cache import LRUCache, MISSING
+from app.core.logging import get_logger
+from app.core.metrics import metrics
+from app.domain.models import BlacklistedToken, User
+from app.infra.db_router import db_router
+from app.infra.pubsub import pubsub_listener
+from app.infra.redis_client import get_redis
+from app.infra.unit_of_work import unit_of_work
+from app.infra.repositories.user_repo import UserRepository
+
+logger = get_logger(__name__)
+
+class TokenRevocationStore:
+    """Tokens revogados em Redis (TTL = expiração do token) com filtro de Bloom na frente"""
+    key_prefix = 'revoked:jti:'
+    
+    def __init__(self):
+        self.enabled = True
+        self.db_log = True
+        self.channel = 'token-revocations'
+        self.capacity = 100000
+        self.error_rate = 0.001
+        self.bloom = BloomFilter(self.capacity, self.error_rate)
+        self._loaded_pid: Optional[int] = None
+        self._lock = threading.Lock()
+        self._rebuilding = False
+        self._added_during_rebuild = []
+    
+    def init_app(self, app):
+        """Configura o store a partir da aplicação"""
+        self.enabled = app.config.get('JWT_BLACKLIST_ENABLED', True)
+        self.db_log = app.config.get('TOKEN_REVOCATION_DB_LOG', True)
+        self.channel = app.config.get('TOKEN_REVOCATION_CHANNEL', 'token-revocations')
+        self.capacity = app.config.get('TOKEN_BLOOM_CAPACITY', 100000)
+        self.error_rate = app.config.get('TOKEN_BLOOM_ERROR_RATE', 0.001)
+        self.bloom = BloomFilter(self.capacity, self.error_rate)
+        
+        pubsub_listener.subscribe(self.channel, self._on_revoked_message, on_reconnect=self.rebuild)
+        pubsub_listener.add_periodic(app.config.get('TOKEN_BLOOM_REBUILD_SECONDS', 3600), self.rebuild)
+        
+        metrics.register_gauge('revocation.bloom_entries', lambda: self.bloom.count)
+        metrics.register_gauge('revocation.bloom_capacity', lambda: self.bloom.capacity)
+    
+    def _key(self, jti: str) -> str:
+        """Chave Redis do JTI"""
+        return f'{self.key_prefix}{jti}'
+    
+    def _add_local(self, jti: str):
+        """Adiciona JTI ao filtro do worker"""
+        with self._lock:
+            self.bloom.add(jti)
+            if self._rebuilding:
+                self._added_during_rebuild.append(jti)
+    
+    def _on_revoked_message(self, jti: str):
+        """Recebe revogações feitas em outros workers"""
+        self._add_local(jti)
+        # Acima da capacidade a taxa de falsos positivos cresce: reconstrói (thread do pub/sub)
+        # com um filtro dimensionado para as entradas atuais
+        if self.bloom.is_saturated() and not self._rebuilding:
+            metrics.inc('revocation.bloom_saturated')
+            logger.warning(f"Filtro de tokens revogados saturado ({self.bloom.count} entradas), reconstruindo")
+            self.rebuild()
+    
+    def _ensure_loaded(self):
+        """Carrega o filtro no primeiro uso do worker (após o fork)"""
+        if self._loaded_pid == os.getpid():
+            return
+        self._loaded_pid = os.getpid()
+        self.rebuild()
+        pubsub_listener.ensure_started()
+    
+    def revoke(self, jti: str, token_type: str, user_id: int, expires_at: datetime):
+        """Revoga token até sua expiração"""
+        ttl = int((expires_at - datetime.utcnow()).total_seconds())
+        if ttl <= 0:
+            return
+        
+        self._add_local(jti)
+        
+        try:
+            client = get_redis()
+            client.set(self._key(jti), user_id, ex=ttl)
+            client.publish(self.channel, jti)
+        except redis.RedisError as e:
+            metrics.inc('revocation.redis_errors')
+            logger.error(f"Erro ao revogar token no Redis: {str(e)}")
+            if not self.db_log:
+                raise
+        
+        if self.db_log:
+            BlacklistedToken.add_to_blacklist(
+                jti=jti,
+                token_type=token_type,
+                user_id=user_id,
+                expires_at=expires_at
+            )
+    
+    def is_revoked(self, jti: str) -> bool:
+        """Verifica revogação (sem rede quando o filtro descarta o JTI)"""
+        if not self.enabled or not jti:
+            return False
+        
+        self._ensure_loaded()
+        
+        if jti not in self.bloom:
+            metrics.inc('revocation.bloom_negative')
+            return False
+        
+        try:
+            revoked = bool(get_redis().exists(self._key(jti)))
+            if not revoked:
+                metrics.inc('revocation.bloom_false_positive')
+            return revoked
+        except redis.RedisError as e:
+            metrics.inc('revocation.redis_errors')
+            logger.warning(f"Redis indisponível na verificação de revogação: {str(e)}")
+            if self.db_log:
+                return BlacklistedToken.is_blacklisted(jti)
+            # Sem log durável, na dúvida o token é tratado como revogado
+            return True
+    
+    def rebuild(self):
+        """Reconstrói o filtro a partir do Redis e do log no banco"""
+        with self._lock:
+            self._rebuilding = True
+            self._added_during_rebuild = []
+        
+        try:
+            jtis = self._load_revoked_jtis()
+        except Exception as e:
+            logger.error(f"Erro ao reconstruir filtro de tokens revogados: {str(e)}")
+            with self._lock:
+                self._rebuilding = False
+            return
+        
+        bloom = BloomFilter(max(self.capacity, len(jtis) * 2), self.error_rate)
+        for jti in jtis:
+            bloom.add(jti)
+        
+        with self._lock:
+            for jti in self._added_during_rebuild:
+                bloom.add(jti)
+            self.bloom = bloom
+            self._rebuilding = False
+            self._added_during_rebuild = []
+        
+        metrics.inc('revocation.bloom_rebuilds')
+        logger.info(f"Filtro de tokens revogados reconstruído: {bloom.count} entradas")
+    
+    def _load_revoked_jtis(self):
+        """Lista JTIs revogados ainda válidos (união do Redis com o log no banco)
+        
+        Revogações feitas com o Redis fora do ar só existem no banco: entram no filtro e são
+        regravadas no Redis, para que a verificação volte a encontrá-las.
+        """
+        redis_jtis = None
+        try:
+            prefix_length = len(self.key_prefix)
+            redis_jtis = {
+                key[prefix_length:]
+                for key in get_redis().scan_iter(match=f'{self.key_prefix}*', count=1000)
+            }
+        except redis.RedisError as e:
+            if not self.db_log:
+                raise
+            logger.warning(f"Redis indisponível, carregando revogações do banco: {str(e)}")
+        
+        if not self.db_log:
+            return redis_jtis
+        
+        # Conexão própria para não interferir na sessão da requisição/tarefa
+        with db.engine.connect() as connection:
+            rows = connection.execute(
+                select(BlacklistedToken.jti, BlacklistedToken.user_id, BlacklistedToken.expires_at)
+                .where(BlacklistedToken.expires_at > datetime.utcnow())
+            ).all()
+        
+        if redis_jtis is None:
+            return {row.jti for row in rows}
+        self._backfill_redis([row for row in rows if row.jti not in redis_jtis])
+        return redis_jtis.union(row.jti for row in rows)
+    
+    def _backfill_redis(self, rows):
+        """Regrava no Redis revogações registradas apenas no banco"""
+        if not rows:
+            return
+        
+        now = datetime.utcnow()
+        try:
+            pipeline = get_redis().pipeline(transaction=False)
+            for row in rows:
+                ttl = int((row.expires_at - now).total_seconds())
+                if ttl > 0:
+                    pipeline.set(self._key(row.jti), row.user_id, ex=ttl, nx=True)
+            pipeline.execute()
+        except redis.RedisError as e:
+            metrics.inc('revocation.redis_errors')
+            logger.error(f"Erro ao regravar revogações no Redis: {str(e)}")
+            return
+        
+        metrics.inc('revocation.redis_backfilled', len(rows))
+        logger.info(f"{len(rows)} revogações regravadas no Redis a partir do banco")
+
+class TokenEpochStore:
+    """Epoch de tokens por usuário: tokens com epoch menor que o atual estão revogados"""
+    key_prefix = 'token:epoch:'
+    
+    # Só grava se o epoch for maior que o armazenado (epochs nunca diminuem)
+    SET_MAX_SCRIPT = """
+    local current = tonumber(redis.call('GET', KEYS[1]) or '-1')
+    local new = tonumber(ARGV[1])
+    if new > current then
+        redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2])
+        return new
+    end
+    redis.call('EXPIRE', KEYS[1], ARGV[2])
+    return current
+    """
+    
+    def __init__(self):
+        self.channel = 'token-epochs'
+        self.redis_ttl = 2592000
+        self.cache = LRUCache(maxsize=10000, ttl=30)
+    
+    def init_app(self, app):
+        """Configura o store a partir da aplicação"""
+        self.channel = app.config.get('TOKEN_EPOCH_CHANNEL', 'token-epochs')
+        self.redis_ttl = int(app.config['JWT_REFRESH_TOKEN_EXPIRES'].total_seconds())
+        self.cache = LRUCache(
+            maxsize=app.config.get('TOKEN_EPOCH_CACHE_SIZE', 10000),
+            ttl=app.config.get('TOKEN_EPOCH_CACHE_SECONDS', 30)
+        )
+        
+        pubsub_listener.subscribe(self.channel, self._on_epoch_message, on_reconnect=self.cache.clear)
+        metrics.register_gauge('token_epoch.cache', self.cache.stats)
+    
+    def _key(self, user_id: int) -> str:
+        """Chave Redis do epoch do usuário"""
+        return f'{self.key_prefix}{user_id}'
+    
+    def _remember(self, user_id: int, epoch: int):
+        """Guarda epoch na memória do worker sem nunca regredir"""
+        cached = self.cache.get(user_id)
+        if cached is MISSING or epoch > cached:
+            self.cache.set(user_id, epoch)
+    
+    def _on_epoch_message(self, data: str):
+        """Recebe epochs incrementados em outros workers (um ou vários `id:epoch` separados por vírgula)"""
+        for item in data.split(','):
+            user_id, epoch = item.split(':', 1)
+            self._remember(int(user_id), int(epoch))
+    
+    def _store_in_redis(self, user_id: int, epoch: int) -> int:
+        """Grava epoch no Redis mantendo o maior valor"""
+        client = get_redis()
+        return int(client.register_script(self.SET_MAX_SCRIPT)(
+            keys=[self._key(user_id)], args=[epoch, self.redis_ttl]
+        ))
+    
+    def get(self, user_id: int) -> int:
+        """Obtém epoch atual (memória -> Redis -> banco)"""
+        user_id = int(user_id)
+        pubsub_listener.ensure_started()
+        
+        epoch = self.cache.get(user_id)
+        if epoch is not MISSING:
+            return epoch
+        
+        try:
+            value = get_redis().get(self._key(user_id))
+            if value is not None:
+                epoch = int(value)
+                self._remember(user_id, epoch)
+                return epoch
+        except redis.RedisError as e:
+            metrics.inc('token_epoch.redis_errors')
+            logger.warning(f"Redis indisponível ao obter epoch de tokens: {str(e)}")
+        
+        # Primário: uma réplica atrasada devolveria um epoch anterior à revogação
+        with db_router.primary():
+            epoch = db.session.execute(
+                select(User.token_epoch).where(User.id == user_id)
+            ).scalar_one_or_none() or 0
+        metrics.inc('token_epoch.db_loads')
+        
+        try:
+            epoch = self._store_in_redis(user_id, epoch)
+        except redis.RedisError:
+            pass
+        
+        self._remember(user_id, epoch)
+        return epoch
+    
+    def bump(self, user_id: int) -> int:
+        """Incrementa o epoch, revogando todos os tokens emitidos antes"""
+        user_id = int(user_id)
+        epoch = UserRepository().bump_token_epoch(user_id)
+        if epoch is None:
+            return 0
+        
+        # Propaga só depois do commit: um rollback não pode deixar o epoch à frente do banco
+        unit_of_work.on_commit(partial(self.publish_bumps, [(user_id, epoch)]))
+        return epoch
+    
+    def publish_bumps(self, epochs: Sequence[Tuple[int, int]], chunk_size: int = 1000):
+        """Propaga epochs já incrementados no banco em lote (memória, Redis em pipeline e pub/sub)
+        
+        Chamar após o commit (`unit_of_work.on_commit`): antes dele outros workers passariam a
+        rejeitar tokens de uma alteração que ainda pode ser desfeita.
+        """
+        if not epochs:
+            return
+        
+        for user_id, epoch in epochs:
+            self._remember(user_id, epoch)
+        try:
+            client = get_redis()
+            script = client.register_script(self.SET_MAX_SCRIPT)
+            pipeline = client.pipeline(transaction=False)
+            for user_id, epoch in epochs:
+                script(keys=[self._key(user_id)], args=[epoch, self.redis_ttl], client=pipeline)
+            pipeline.execute()
+        except redis.RedisError as e:
+            metrics.inc('token_epoch.redis_errors')
+            logger.error(f"Erro ao gravar epochs de tokens no Redis: {str(e)}")
+        for start in range(0, len(epochs), chunk_size):
+            pubsub_listener.publish(
+                self.channel, ','.join(f'{user_id}:{epoch}' for user_id, epoch in epochs[start:start + chunk_size])
+            )
+        
+        metrics.inc('token_epoch.bumps', len(epochs))
+        logger.info(f"Tokens de {len(epochs)} usuários revogados em lote")
+
+# Instâncias globais dos stores de tokens
+revocation_store = TokenRevocationStore()
+epoch_store = TokenEpochStore()
@@ -0,0 +1,205 @@
+"""
+Unidade de trabalho por requisição/tarefa (um único commit no final)
+"""
+import sqlite3
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Callable, List
+from flask import g, has_app_context, jsonify, make_response
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.core.logging import get_logger
+from app.core.metrics import metrics
+
+logger = get_logger(__name__)
+
+@dataclass
+class UnitOfWorkState:
+    """Estado da unidade de trabalho no contexto atual"""
+    depth: int = 0
+    suspended: int = 0
+    deferred: int = 0  # commits de repositórios absorvidos pela unidade de trabalho
+    callbacks: List[Callable[[], None]] = field(default_factory=list)
+
+class UnitOfWork:
+    """Agrupa as escritas de uma requisição (ou tarefa Celery) numa única transação
+    
+    Dentro da unidade de trabalho, `commit()` dos repositórios apenas envia as alterações
+    (flush); o commit real acontece uma vez no fim da requisição, se a resposta não for erro
+    (status < 400), ou da tarefa, se ela não levantar exceção. Fora dela (threads de fundo,
+    CLI) `commit()` confirma na hora. `autocommit()` desliga a unidade de trabalho num trecho.
+    """
+    
+    def __init__(self):
+        self.enabled = True
+        self._lock = threading.Lock()
+        self.stats = {'scopes': 0, 'commits': 0, 'deferred': 0, 'rollbacks': 0}
+    
+    def init_app(self, app):
+        """Configura a unidade de trabalho nas requisições da aplicação"""
+        self.enabled = app.config.get('UNIT_OF_WORK_ENABLED', True)
+        
+        if not event.contains(Engine, 'commit', self._on_database_commit):
+            event.listen(Engine, 'commit', self._on_database_commit)
+        # Savepoints (conflitos dentro da unidade de trabalho) no SQLite exigem que o BEGIN
+        # seja emitido pelo SQLAlchemy, e não adiado pelo pysqlite até o primeiro INSERT
+        if not event.contains(Engine, 'connect', self._on_sqlite_connect):
+            event.listen(Engine, 'connect', self._on_sqlite_connect)
+            event.listen(Engine, 'begin', self._on_sqlite_begin)
+        metrics.register_gauge('unit_of_work', self.get_stats)
+        
+        if self.enabled:
+            app.before_request(self.begin)
+            app.after_request(self._after_request)
+            app.teardown_request(self._teardown_request)
+    
+    @property
+    def _state(self) -> UnitOfWorkState:
+        """Estado do contexto atual (criado sob demanda)"""
+        state = g.get('_unit_of_work')
+        if state is None:
+            state = g._unit_of_work = UnitOfWorkState()
+        return state
+    
+    @property
+    def active(self) -> bool:
+        """Há unidade de trabalho aberta (e não suspensa) no contexto atual"""
+        if not has_app_context():
+            return False
+        state = g.get('_unit_of_work')
+        return state is not None and state.depth > 0 and not state.suspended
+    
+    def begin(self):
+        """Abre (ou aninha) a unidade de trabalho"""
+        if not self.enabled:
+            return
+        state = self._state
+        state.depth += 1
+        if state.depth == 1:
+            self._count('scopes')
+    
+    def end(self, commit: bool = True):
+        """Fecha a unidade de trabalho; a mais externa confirma ou desfaz a transação"""
+        state = g.get('_unit_of_work')
+        if state is None or state.depth == 0:
+            return
+        state.depth -= 1
+        if state.depth > 0:
+            return
+        
+        callbacks, state.callbacks = state.callbacks, []
+        if not commit:
+            db.session.rollback()
+            self._count('rollbacks')
+            return
+        
+        try:
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            self._count('rollbacks')
+            raise
+        
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"Erro em ação pós-commit: {str(e)}")
+    
+    @contextmanager
+    def scope(self):
+        """Unidade de trabalho num bloco (tarefas Celery): commit ao sair, rollback em exceção"""
+        self.begin()
+        try:
+            yield
+        except Exception:
+            self.end(commit=False)
+            raise
+        self.end(commit=True)
+    
+    @contextmanager
+    def autocommit(self):
+        """Opt-out: dentro do bloco cada `commit()` confirma na hora (inclusive o que já estava pendente)"""
+        state = self._state
+        state.suspended += 1
+        try:
+            yield
+        finally:
+            state.suspended -= 1
+    
+    def commit(self):
+        """Commit dos repositórios: flush dentro da unidade de trabalho, commit real fora dela"""
+        if self.active:
+            db.session.flush()
+            self._state.deferred += 1
+            self._count('deferred')
+        else:
+            db.session.commit()
+    
+    def on_commit(self, callback: Callable[[], None]):
+        """Executa o callback depois do commit (na hora, se não há unidade de trabalho aberta)"""
+        if self.active:
+            self._state.callbacks.append(callback)
+        else:
+            callback()
+    
+    def _after_request(self, response):
+        """Confirma a transação da requisição (desfaz em respostas de erro)"""
+        try:
+            self.end(commit=response.status_code < 400)
+        except IntegrityError as e:
+            logger.warning(f"Conflito ao confirmar a requisição: {str(e.orig)}")
+            return make_response(jsonify({
+                'success': False,
+                'error': 'ConflictError',
+                'message': 'Conflito ao gravar os dados'
+            }), 409)
+        except Exception as e:
+            logger.error(f"Erro ao confirmar a requisição: {str(e)}")
+            return make_response(jsonify({
+                'success': False,
+                'error': 'InternalServerError',
+                'message': 'Erro interno do servidor'
+            }), 500)
+        return response
+    
+    def _teardown_request(self, exception=None):
+        """Desfaz a transação se a requisição terminou sem passar por after_request"""
+        state = g.get('_unit_of_work')
+        if state is not None and state.depth > 0:
+            state.depth = 1
+            self.end(commit=False)
+    
+    @staticmethod
+    def _on_sqlite_connect(dbapi_connection, connection_record):
+        """Desliga o controle de transação implícito do pysqlite"""
+        if isinstance(dbapi_connection, sqlite3.Connection):
+            dbapi_connection.isolation_level = None
+    
+    @staticmethod
+    def _on_sqlite_begin(connection):
+        """Abre a transação explicitamente no SQLite"""
+        if connection.dialect.name == 'sqlite':
+            connection.exec_driver_sql('BEGIN')
+    
+    def _on_database_commit(self, connection):
+        """Conta os COMMITs efetivamente enviados ao banco"""
+        self._count('commits')
+    
+    def _count(self, name: str):
+        """Incrementa uma estatística"""
+        with self._lock:
+            self.stats[name] += 1
+    
+    def get_stats(self) -> dict:
+        """Estatísticas (commits por unidade de trabalho e commits evitados)"""
+        with self._lock:
+            stats = dict(self.stats)
+        stats['commits_per_scope'] = round(stats['commits'] / stats['scopes'], 3) if stats['scopes'] else 0.0
+        return stats
+
+# Instância global da unidade de trabalho
+unit_of_work = UnitOfWork()
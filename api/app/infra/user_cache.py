@@ -0,0 +1,239 @@
+"""
+Cache de identidade de usuários (memo da requisição, LRU do worker e Redis)
+"""
+import json
+import threading
+from concurrent.futures import Future
+from datetime import datetime
+from typing import Dict, Iterable, Optional
+import redis
+from flask import g
+from sqlalchemy import DateTime, event, select
+from sqlalchemy.orm import Session, object_session
+from app import db
+from app.core.cache import LRUCache, MISSING
+from app.core.logging import get_logger
+from app.core.metrics import metrics
+from app.domain.models import User
+from app.infra.db_router import db_router
+from app.infra.pubsub import pubsub_listener
+from app.infra.redis_client import get_redis
+
+logger = get_logger(__name__)
+
+class UserCache:
+    """Leitura de usuários por id: memo da requisição -> LRU do worker -> Redis -> banco
+    
+    No Redis, a entrada é guardada sob `user:cache:<id>:<versão>`; a versão (`user:version:<id>`)
+    é incrementada depois do commit de qualquer escrita no usuário (eventos before_update/before_delete
+    do ORM e `invalidate()` nos UPDATE/DELETE diretos dos repositórios), e o incremento é difundido por
+    pub/sub para limpar o LRU dos workers. Uma leitura gravada com uma versão antiga nunca é servida.
+    Misses simultâneos do mesmo id no worker fazem uma única consulta (ao primário). O `password_hash`
+    não entra no cache.
+    """
+    
+    version_prefix = 'user:version:'
+    entry_prefix = 'user:cache:'
+    
+    # Versão atual e entrada dessa versão numa única ida ao Redis
+    GET_SCRIPT = """
+    local version = redis.call('GET', KEYS[1]) or '0'
+    return {version, redis.call('GET', ARGV[1] .. version)}
+    """
+    
+    def __init__(self):
+        self.enabled = False
+        self.channel = 'user-cache'
+        self.redis_ttl = 300
+        self.wait_timeout = 5.0
+        self.local = LRUCache(maxsize=10000, ttl=30)
+        self._lock = threading.Lock()
+        self._inflight: Dict[int, Future] = {}
+        self._generation = 0
+        self._columns = [column for column in User.__table__.columns if column.name != 'password_hash']
+        self._datetimes = {column.name for column in self._columns if isinstance(column.type, DateTime)}
+    
+    def init_app(self, app):
+        """Configura o cache a partir da aplicação"""
+        self.enabled = app.config.get('USER_CACHE_ENABLED', True)
+        self.channel = app.config.get('USER_CACHE_CHANNEL', 'user-cache')
+        self.redis_ttl = app.config.get('USER_CACHE_REDIS_SECONDS', 300)
+        self.local = LRUCache(
+            maxsize=app.config.get('USER_CACHE_SIZE', 10000),
+            ttl=app.config.get('USER_CACHE_LOCAL_SECONDS', 30)
+        )
+        
+        if self.enabled:
+            if not event.contains(User, 'before_update', self._on_user_changed):
+                event.listen(User, 'before_update', self._on_user_changed)
+                event.listen(User, 'before_delete', self._on_user_changed)
+                event.listen(Session, 'after_commit', self._after_commit)
+                event.listen(Session, 'after_rollback', self._after_rollback)
+            pubsub_listener.subscribe(self.channel, self._on_message, on_reconnect=self.local.clear)
+            metrics.register_gauge('user_cache.local', self.local.stats)
+    
+    def _version_key(self, user_id: int) -> str:
+        """Chave Redis da versão do usuário"""
+        return f'{self.version_prefix}{user_id}'
+    
+    def _entry_prefix(self, user_id: int) -> str:
+        """Prefixo da chave Redis da entrada (completado com a versão)"""
+        return f'{self.entry_prefix}{user_id}:'
+    
+    def get(self, user_id: int) -> Optional[User]:
+        """Usuário por id (objeto fora da sessão, sem password_hash), ou None se não existe"""
+        user_id = int(user_id)
+        if not self.enabled:
+            return db.session.get(User, user_id)
+        
+        # Escrito nesta transação (ainda não confirmado): lê da sessão, sem passar pelo cache
+        if user_id in db.session.info.get('user_cache_invalidate', ()):
+            return db.session.get(User, user_id)
+        
+        memo = g.setdefault('_user_cache', {})
+        if user_id in memo:
+            return memo[user_id]
+        
+        pubsub_listener.ensure_started()
+        data = self.local.get(user_id)
+        if data is MISSING:
+            data = self._load_once(user_id)
+        user = User(**data) if data is not None else None
+        memo[user_id] = user
+        return user
+    
+    def _load_once(self, user_id: int) -> Optional[dict]:
+        """Carrega do Redis/banco; misses simultâneos do mesmo id esperam a primeira consulta"""
+        with self._lock:
+            future = self._inflight.get(user_id)
+            leader = future is None
+            if leader:
+                future = self._inflight[user_id] = Future()
+                generation = self._generation
+        
+        if not leader:
+            metrics.inc('user_cache.collapsed')
+            try:
+                return future.result(timeout=self.wait_timeout)
+            except Exception:
+                return self._load(user_id)
+        
+        try:
+            data = self._load(user_id)
+        except Exception as e:
+            with self._lock:
+                self._inflight.pop(user_id, None)
+            future.set_exception(e)
+            raise
+        
+        with self._lock:
+            self._inflight.pop(user_id, None)
+            # Invalidação durante a carga: o valor pode ser anterior a ela
+            if data is not None and generation == self._generation:
+                self.local.set(user_id, data)
+        future.set_result(data)
+        return data
+    
+    def _load(self, user_id: int) -> Optional[dict]:
+        """Entrada da versão atual no Redis ou, na falta dela, leitura do banco (gravada no Redis)"""
+        version = None
+        try:
+            client = get_redis()
+            version, cached = client.register_script(self.GET_SCRIPT)(
+                keys=[self._version_key(user_id)], args=[self._entry_prefix(user_id)]
+            )
+            if cached is not None:
+                metrics.inc('user_cache.redis_hits')
+                return self._decode(cached)
+        except redis.RedisError as e:
+            metrics.inc('user_cache.redis_errors')
+            logger.warning(f"Redis indisponível no cache de usuários: {str(e)}")
+        
+        # Primário: uma réplica atrasada gravaria um valor antigo sob a versão nova
+        with db_router.primary():
+            row = db.session.execute(select(*self._columns).where(User.id == user_id)).one_or_none()
+        metrics.inc('user_cache.db_loads')
+        if row is None:
+            return None
+        
+        data = dict(row._mapping)
+        if version is not None:
+            try:
+                get_redis().set(f'{self._entry_prefix(user_id)}{version}', self._encode(data), ex=self.redis_ttl)
+            except redis.RedisError as e:
+                metrics.inc('user_cache.redis_errors')
+                logger.warning(f"Erro ao gravar usuário no cache Redis: {str(e)}")
+        return data
+    
+    def _encode(self, data: dict) -> str:
+        """JSON da entrada (datas em ISO 8601)"""
+        return json.dumps({
+            name: value.isoformat() if name in self._datetimes and value is not None else value
+            for name, value in data.items()
+        })
+    
+    def _decode(self, raw) -> dict:
+        """Entrada a partir do JSON"""
+        data = json.loads(raw)
+        for name in self._datetimes:
+            if data.get(name) is not None:
+                data[name] = datetime.fromisoformat(data[name])
+        return data
+    
+    def invalidate(self, user_ids: Iterable[int], session=None):
+        """Marca usuários alterados na transação; a versão é incrementada depois do commit"""
+        session = session or db.session
+        user_ids = {int(user_id) for user_id in user_ids}
+        if not self.enabled or not user_ids:
+            return
+        session.info.setdefault('user_cache_invalidate', set()).update(user_ids)
+        memo = g.get('_user_cache')
+        if memo:
+            for user_id in user_ids:
+                memo.pop(user_id, None)
+    
+    def _on_user_changed(self, mapper, connection, target):
+        """Escrita de usuário pelo flush do ORM"""
+        self.invalidate([target.id], session=object_session(target))
+    
+    def _after_commit(self, session):
+        """Incrementa as versões dos usuários alterados e avisa os demais workers"""
+        user_ids = session.info.pop('user_cache_invalidate', None)
+        if user_ids:
+            self.publish_invalidations(sorted(user_ids))
+    
+    def _after_rollback(self, session):
+        """Descarta marcações não confirmadas"""
+        session.info.pop('user_cache_invalidate', None)
+    
+    def publish_invalidations(self, user_ids: list, chunk_size: int = 1000):
+        """Invalida usuários já alterados no banco (worker, versões no Redis e pub/sub)"""
+        self._forget(user_ids)
+        try:
+            pipeline = get_redis().pipeline(transaction=False)
+            for user_id in user_ids:
+                key = self._version_key(user_id)
+                pipeline.incr(key)
+                # Sobrevive às entradas: uma versão expirada volta a 0 só quando não há entradas antigas
+                pipeline.expire(key, self.redis_ttl * 2)
+            pipeline.execute()
+        except redis.RedisError as e:
+            metrics.inc('user_cache.redis_errors')
+            logger.error(f"Erro ao incrementar versões do cache de usuários: {str(e)}")
+        for start in range(0, len(user_ids), chunk_size):
+            pubsub_listener.publish(self.channel, ','.join(str(user_id) for user_id in user_ids[start:start + chunk_size]))
+        metrics.inc('user_cache.invalidations', len(user_ids))
+    
+    def _forget(self, user_ids: Iterable[int]):
+        """Remove usuários do LRU do worker"""
+        with self._lock:
+            self._generation += 1
+            for user_id in user_ids:
+                self.local.delete(user_id)
+    
+    def _on_message(self, data: str):
+        """Recebe invalidações feitas em outros workers (ids separados por vírgula)"""
+        self._forget(int(user_id) for user_id in data.split(','))
+
+# Instância global do cache
+user_cache = UserCache()
@@ -0,0 +1,51 @@
+"""
+Benchmark: autocomplete em memória (memória do índice e latência por prefixo vs. banco)
+
+Uso: python -m benchmarks.autocomplete --rows 100000 [--database-url postgresql://...]
+"""
+import argparse
+import time
+import tracemalloc
+from app.infra.autocomplete import AutocompleteIndex
+from app.infra.repositories.user_repo import UserRepository
+from benchmarks.common import create_bench_app, seed_users, measure
+
+PREFIXES = ['u', 'usuario 42', 'user4242', 'usuario 99999']
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=1000)
+    parser.add_argument('--database-url', default=None)
+    args = parser.parse_args()
+    
+    app = create_bench_app(args.database_url)
+    with app.app_context():
+        print(f"Populando {args.rows} usuários...")
+        seed_users(args.rows)
+        
+        index = AutocompleteIndex()
+        started = time.perf_counter()
+        index.rebuild()
+        build_ms = (time.perf_counter() - started) * 1000
+        
+        # Memória medida em uma segunda montagem (tracemalloc deixa a montagem mais lenta)
+        index = AutocompleteIndex()
+        tracemalloc.start()
+        index.rebuild()
+        memory, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        
+        print(f"Índice: {index.last_build['users']} usuários, {index.last_build['entries']} entradas, "
+              f"{memory / 1024 / 1024:.1f} MiB ({memory / index.last_build['users']:.0f} bytes/usuário), "
+              f"montado em {build_ms:.0f} ms")
+        
+        repo = UserRepository()
+        print(f"{'Prefixo':<16} {'Memória (µs)':>14} {'Banco (µs)':>12}")
+        for prefix in PREFIXES:
+            memory_timing = measure(lambda: index.search(prefix, 10), args.repeat)
+            database_timing = measure(lambda: repo.search_users(prefix, limit=10), max(args.repeat // 100, 3))
+            print(f"{prefix:<16} {memory_timing['median_ms'] * 1000:>14.1f} {database_timing['median_ms'] * 1000:>12.0f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""
+Utilitários compartilhados pelos benchmarks
+"""
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+from flask import Flask
+from app import db
+from app.domain.models import User
+
+def create_bench_app(database_url: str = None) -> Flask:
+    """Aplicação mínima apenas com o banco"""
+    app = Flask('benchmarks')
+    app.config.update(
+        SQLALCHEMY_DATABASE_URI=database_url or os.environ.get('BENCH_DATABASE_URL')
+        or f"sqlite:///{os.path.join(tempfile.gettempdir(), 'api_bench.db')}",
+        SQLALCHEMY_TRACK_MODIFICATIONS=False
+    )
+    db.init_app(app)
+    return app
+
+def seed_users(rows: int, chunk_size: int = 20000, seed: int = 42) -> int:
+    """Popula users com dados sintéticos (reaproveita a tabela se já tiver o tamanho pedido)"""
+    db.create_all()
+    existing = db.session.query(User).count()
+    if existing == rows:
+        return existing
+    if existing:
+        db.session.execute(User.__table__.delete())
+        db.session.commit()
+    
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    roles = ['admin', 'developer', 'user']
+    statuses = ['active', 'active', 'active', 'inactive', 'pending', 'suspended']
+    insert = User.__table__.insert()
+    
+    for start in range(0, rows, chunk_size):
+        batch = []
+        for i in range(start, min(start + chunk_size, rows)):
+            status = rng.choice(statuses)
+            created_at = now - timedelta(seconds=rng.randint(0, 365 * 86400))
+            batch.append({
+                'email': f'user{i}@bench.local',
+                'password_hash': 'x',
+                'name': f'Usuário {i}',
+                'role': rng.choice(roles),
+                'status': status,
+                'is_active': status == 'active',
+                'login_count': 0,
+                'token_epoch': 0,
+                'created_at': created_at,
+                'updated_at': created_at
+            })
+        db.session.execute(insert, batch)
+        db.session.commit()
+    return rows
+
+def measure(function, repeat: int = 5) -> dict:
+    """Mede a função (mediana e melhor tempo em ms)"""
+    timings = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function()
+        timings.append((time.perf_counter() - started) * 1000)
+    return {'median_ms': statistics.median(timings), 'best_ms': min(timings), 'result': result}
@@ -0,0 +1,67 @@
+"""
+Benchmark: exportação de usuários (lista inteira em memória vs. cursor no servidor em blocos)
+
+Uso: python -m benchmarks.export --rows 100000 --format csv [--database-url postgresql://...]
+Mede tempo e pico de memória Python (tracemalloc) de cada modo; o streaming deve ficar
+praticamente constante ao aumentar --rows.
+"""
+import argparse
+import csv
+import io
+import tracemalloc
+from app.api.v1.users.service import UserService
+from app.domain.dtos import UserQueryDTO
+from app.domain.models import User
+from benchmarks.common import create_bench_app, seed_users, measure
+
+def peak_memory(function):
+    """Executa a função e retorna (resultado, pico de memória em MiB)"""
+    tracemalloc.start()
+    try:
+        result = function()
+        return result, tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+    finally:
+        tracemalloc.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--format', default='csv', choices=['csv', 'ndjson', 'parquet'])
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--database-url', default=None)
+    args = parser.parse_args()
+    
+    app = create_bench_app(args.database_url)
+    app.config['USER_EXPORT_BATCH_SIZE'] = args.batch_size
+    service = UserService()
+    with app.app_context():
+        seed_users(args.rows)
+    
+    def materialized():
+        """Exportação ingênua: carrega todos os usuários e monta o arquivo inteiro"""
+        with app.app_context():
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            for user in User.query.order_by(User.id).all():
+                writer.writerow([user.id, user.email, user.name, user.role, user.status, user.created_at])
+            return len(buffer.getvalue().encode())
+    
+    def streamed():
+        """Exportação em blocos (descarta os bytes, como a resposta enviada ao cliente)"""
+        with app.app_context():
+            query_dto = UserQueryDTO(sort_by='id', sort_order='asc')
+            return sum(len(chunk) for chunk in service.stream_users_export(query_dto, args.format))
+    
+    naive = measure(materialized, args.repeat)
+    stream = measure(streamed, args.repeat)
+    _, naive_peak = peak_memory(materialized)
+    size, stream_peak = peak_memory(streamed)
+    
+    print(f"{'Modo':<30} {'Mediana (ms)':>14} {'Pico (MiB)':>12}   ({args.rows} usuários)")
+    print(f"{'Lista inteira (CSV)':<30} {naive['median_ms']:>14.2f} {naive_peak:>12.1f}")
+    print(f"{'Cursor em blocos (' + args.format + ')':<30} {stream['median_ms']:>14.2f} {stream_peak:>12.1f}")
+    print(f"Arquivo exportado: {size / (1024 * 1024):.1f} MiB")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+"""
+Benchmark: commits por requisição (commit a cada chamada de repositório vs. unidade de trabalho)
+
+Uso: python -m benchmarks.unit_of_work --writes 5 --repeat 200 [--database-url postgresql://...]
+"""
+import argparse
+import itertools
+from contextlib import nullcontext
+from app import db
+from app.domain.models import User
+from app.infra.repositories.user_repo import UserRepository
+from app.infra.unit_of_work import unit_of_work
+from benchmarks.common import create_bench_app, seed_users, measure
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--writes', type=int, default=5)
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--database-url', default=None)
+    args = parser.parse_args()
+    
+    app = create_bench_app(args.database_url)
+    unit_of_work.init_app(app)
+    with app.app_context():
+        seed_users(args.rows)
+        repo = UserRepository()
+        user_ids = [user_id for (user_id,) in db.session.query(User.id).limit(args.writes)]
+        counter = itertools.count()
+        
+        def request(scope) -> int:
+            """Uma "requisição" com várias escritas de repositório"""
+            before = unit_of_work.get_stats()['commits']
+            with scope:
+                for user_id in user_ids:
+                    repo.update(user_id, last_ip=f'10.0.0.{next(counter) % 250}')
+            db.session.remove()
+            return unit_of_work.get_stats()['commits'] - before
+        
+        per_call = measure(lambda: request(nullcontext()), args.repeat)
+        grouped = measure(lambda: request(unit_of_work.scope()), args.repeat)
+        
+        print(f"{'Modo':<28} {'Commits':>8} {'Mediana (ms)':>14} {'Melhor (ms)':>14}")
+        print(f"{'Commit por chamada':<28} {per_call['result']:>8} {per_call['median_ms']:>14.2f} {per_call['best_ms']:>14.2f}")
+        print(f"{'Unidade de trabalho':<28} {grouped['result']:>8} {grouped['median_ms']:>14.2f} {grouped['best_ms']:>14.2f}")
+        print(f"Speedup: {per_call['median_ms'] / grouped['median_ms']:.1f}x ({args.writes} escritas por requisição)")
+
+if __name__ == '__main__':
+    main()
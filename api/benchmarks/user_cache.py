@@ -0,0 +1,70 @@
+"""
+Benchmark: leitura de usuário por id (banco a cada chamada vs. cache de identidade)
+
+Uso: python -m benchmarks.user_cache --lookups 100 --threads 16 [--database-url postgresql://...]
+Com REDIS_URL acessível, a camada Redis também é exercitada nos misses.
+"""
+import argparse
+import os
+import threading
+from app import db
+from app.core.metrics import metrics
+from app.domain.models import User
+from app.infra.repositories.user_repo import UserRepository
+from app.infra.user_cache import user_cache
+from benchmarks.common import create_bench_app, seed_users, measure
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--lookups', type=int, default=100)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--database-url', default=None)
+    args = parser.parse_args()
+    
+    app = create_bench_app(args.database_url)
+    app.config['REDIS_URL'] = os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
+    user_cache.init_app(app)
+    repo = UserRepository()
+    with app.app_context():
+        seed_users(args.rows)
+        user_ids = [user_id for (user_id,) in db.session.query(User.id).limit(args.lookups)]
+    
+    def request(lookup):
+        """Uma "requisição" por id, como /auth/me"""
+        for user_id in user_ids:
+            with app.test_request_context():
+                lookup(user_id)
+                db.session.remove()
+    
+    uncached = measure(lambda: request(repo.get_by_id), args.repeat)
+    request(repo.get_cached)
+    cached = measure(lambda: request(repo.get_cached), args.repeat)
+    
+    # Misses simultâneos do mesmo id: uma consulta por worker
+    user_cache.local.clear()
+    before = metrics.snapshot()['counters'].get('user_cache.db_loads', 0)
+    barrier = threading.Barrier(args.threads)
+    
+    def concurrent_miss():
+        with app.test_request_context():
+            barrier.wait()
+            repo.get_cached(user_ids[0])
+            db.session.remove()
+    
+    threads = [threading.Thread(target=concurrent_miss) for _ in range(args.threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    loads = metrics.snapshot()['counters'].get('user_cache.db_loads', 0) - before
+    
+    print(f"{'Modo':<28} {'Mediana (ms)':>14} {'Melhor (ms)':>14}   ({len(user_ids)} leituras)")
+    print(f"{'Banco (get_by_id)':<28} {uncached['median_ms']:>14.2f} {uncached['best_ms']:>14.2f}")
+    print(f"{'Cache (LRU do worker)':<28} {cached['median_ms']:>14.2f} {cached['best_ms']:>14.2f}")
+    print(f"Speedup: {uncached['median_ms'] / cached['median_ms']:.1f}x")
+    print(f"Misses simultâneos: {args.threads} threads -> {loads} consulta(s) ao banco")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""
+Benchmark: cadastro de usuários em massa (create_user por linha vs. importação em lote)
+
+Uso: python -m benchmarks.user_import --rows 2000 --rounds 10 [--workers 4] [--database-url postgresql://...]
+O arquivo sintético tem ~2% de emails já cadastrados e ~1% de linhas inválidas; a importação
+usa o pool de hashing (--workers processos) e COPY no PostgreSQL.
+"""
+import argparse
+import io
+import time
+from app import db
+from app.api.v1.users.service import UserService
+from app.core.exceptions import ConflictError, ValidationError
+from app.core.hashing import hashing_executor
+from app.domain.dtos import CreateUserRequestDTO, UserRole, UserStatus
+from app.domain.models import User
+from benchmarks.common import create_bench_app, seed_users
+
+def build_csv(rows: int, prefix: str) -> bytes:
+    """CSV sintético com algumas linhas duplicadas ou inválidas"""
+    lines = ['email,password,name,role,status']
+    for i in range(rows):
+        if i % 50 == 0:
+            email = f'user{i}@bench.local'  # já cadastrado por seed_users
+        else:
+            email = f'{prefix}{i}@bench.local'
+        password = 'fraca' if i % 100 == 1 else f'Senha@Forte{i}'
+        lines.append(f'{email},{password},Importado {i},developer,active')
+    return ('\n'.join(lines) + '\n').encode('utf-8')
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=2000)
+    parser.add_argument('--rounds', type=int, default=10, help='BCRYPT_ROUNDS dos hashes')
+    parser.add_argument('--workers', type=int, default=None, help='Processos do pool de hashing (padrão: núcleos)')
+    parser.add_argument('--database-url', default=None)
+    args = parser.parse_args()
+    
+    app = create_bench_app(args.database_url)
+    app.config.update(
+        SECRET_KEY='benchmark', REDIS_URL='redis://localhost:6379/0', BCRYPT_ROUNDS=args.rounds,
+        HASHING_POOL_ENABLED=True, HASHING_POOL_WORKERS=args.workers
+    )
+    hashing_executor.init_app(app)
+    
+    with app.app_context():
+        seed_users(args.rows)
+        service = UserService()
+        
+        def cleanup(prefix: str):
+            db.session.execute(User.__table__.delete().where(User.email.like(f'{prefix}%')))
+            db.session.commit()
+        
+        def per_row() -> int:
+            """Uma chamada de create_user por linha (hash, INSERT e commit individuais)"""
+            created = 0
+            for line in build_csv(args.rows, 'row').decode('utf-8').splitlines()[1:]:
+                email, password, name, role, status = line.split(',')
+                try:
+                    service.create_user(CreateUserRequestDTO(
+                        email=email, password=password, name=name, role=UserRole(role), status=UserStatus(status)
+                    ))
+                    created += 1
+                except (ConflictError, ValidationError):
+                    db.session.rollback()
+            return created
+        
+        def batched() -> int:
+            """Importação: validação em uma passada, hash em paralelo, COPY + INSERT por lote"""
+            return service.import_users(io.BytesIO(build_csv(args.rows, 'batch')), 'csv').created
+        
+        results = []
+        for label, prefix, function in (('create_user por linha', 'row', per_row), ('Importação em lote', 'batch', batched)):
+            cleanup(prefix)
+            started = time.perf_counter()
+            created = function()
+            results.append((label, created, time.perf_counter() - started))
+            cleanup(prefix)
+        
+        print(f"{'Modo':<26} {'Criados':>8} {'Tempo (s)':>10} {'Usuários/s':>11}   ({args.rows} linhas, rounds={args.rounds})")
+        for label, created, seconds in results:
+            print(f"{label:<26} {created:>8} {seconds:>10.2f} {created / seconds:>11.0f}")
+        print(f"Speedup: {results[0][2] / results[1][2]:.1f}x")
+
+if __name__ == '__main__':
+    main()
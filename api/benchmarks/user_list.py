@@ -0,0 +1,56 @@
+"""
+Benchmark: listagem de usuários (ORM + DTO + dict + json vs. projeção serializada direto em JSON)
+
+Uso: python -m benchmarks.user_list --rows 100000 --per-page 100 [--database-url postgresql://...]
+"""
+import argparse
+import json
+from app import db
+from app.api.v1.users.service import UserService
+from app.domain.dtos import UserQueryDTO
+from benchmarks.common import create_bench_app, seed_users, measure
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--per-page', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--database-url', default=None)
+    args = parser.parse_args()
+    
+    app = create_bench_app(args.database_url)
+    app.config['SECRET_KEY'] = 'benchmark'
+    with app.app_context():
+        print(f"Populando {args.rows} usuários...")
+        seed_users(args.rows)
+        
+        service = UserService()
+        query_dto = UserQueryDTO(page=3, per_page=args.per_page, count_mode='none')
+        
+        def orm_path() -> bytes:
+            """Caminho anterior: modelos completos -> UserDTO -> dict -> json"""
+            result = service.get_users(query_dto)
+            body = json.dumps({'success': True, 'data': result.to_dict()}).encode()
+            db.session.remove()
+            return body
+        
+        def projection_path() -> bytes:
+            """Colunas da resposta como Rows -> serializador compilado -> bytes"""
+            users_json, pagination = service.get_users_json(query_dto)
+            body = b'{"success":true,"data":{"users":%s,"pagination":%s}}' % (
+                users_json, json.dumps(pagination.to_dict()).encode()
+            )
+            db.session.remove()
+            return body
+        
+        orm = measure(orm_path, args.repeat)
+        projection = measure(projection_path, args.repeat)
+        assert json.loads(orm['result']) == json.loads(projection['result']), "Respostas divergentes"
+        
+        print(f"{'Caminho':<24} {'Mediana (ms)':>14} {'Melhor (ms)':>14}")
+        print(f"{'ORM + DTO + dict':<24} {orm['median_ms']:>14.2f} {orm['best_ms']:>14.2f}")
+        print(f"{'Projeção + serializador':<24} {projection['median_ms']:>14.2f} {projection['best_ms']:>14.2f}")
+        print(f"Speedup: {orm['median_ms'] / projection['median_ms']:.1f}x (per_page={args.per_page})")
+
+if __name__ == '__main__':
+    main()
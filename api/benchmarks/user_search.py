@@ -0,0 +1,51 @@
+"""
+Benchmark: busca de usuários (ILIKE '%termo%' vs. backend de busca indexado)
+
+Uso: python -m benchmarks.user_search --rows 1000000 [--database-url postgresql://...]
+"""
+import argparse
+from sqlalchemy import or_
+from app.domain.models import User
+from app.infra.ddl import ddl_registry
+from app.infra.repositories.user_repo import UserRepository
+from app.infra.search import user_search
+from benchmarks.common import create_bench_app, seed_users, measure
+
+TERMS = ['usuario 4242', 'user4242@', '99999', 'bench.local']
+
+def legacy_search(term: str) -> int:
+    """Implementação anterior: ILIKE em name e email (varredura sequencial)"""
+    return User.query.filter(or_(User.name.ilike(f'%{term}%'), User.email.ilike(f'%{term}%'))).count()
+
+def indexed_search(term: str) -> int:
+    """Backend configurado (pg_trgm no PostgreSQL, FTS5 no SQLite)"""
+    query, _ = user_search.apply(User.query, term)
+    return query.count()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--database-url', default=None)
+    args = parser.parse_args()
+    
+    app = create_bench_app(args.database_url)
+    with app.app_context():
+        print(f"Populando {args.rows} usuários...")
+        seed_users(args.rows)
+        # Índices de busca (e reconstrução do FTS5 após o seed)
+        ddl_registry.apply()
+        print(f"Backend: {user_search.resolve()}")
+        
+        print(f"{'Termo':<16} {'Linhas':>8} {'ILIKE (ms)':>12} {'Índice (ms)':>12} {'Speedup':>8}")
+        for term in TERMS:
+            legacy = measure(lambda: legacy_search(term), args.repeat)
+            indexed = measure(lambda: indexed_search(term), args.repeat)
+            print(f"{term:<16} {indexed['result']:>8} {legacy['median_ms']:>12.1f} "
+                  f"{indexed['median_ms']:>12.1f} {legacy['median_ms'] / indexed['median_ms']:>7.1f}x")
+        
+        ranked = UserRepository().search_users('usuario 4242')[:5]
+        print("Mais relevantes para 'usuario 4242':", ', '.join(user.name for user in ranked))
+
+if __name__ == '__main__':
+    main()
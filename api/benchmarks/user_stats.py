@@ -0,0 +1,59 @@
+"""
+Benchmark: estatísticas de usuários (11 COUNTs vs. varredura única)
+
+Uso: python -m benchmarks.user_stats --rows 1000000 [--database-url postgresql://...]
+"""
+import argparse
+from datetime import datetime, timedelta
+from sqlalchemy import func
+from app.domain.dtos import UserStatsDTO
+from app.domain.models import User
+from app.infra.repositories.user_repo import UserRepository
+from benchmarks.common import create_bench_app, seed_users, measure
+
+def legacy_user_stats() -> UserStatsDTO:
+    """Implementação anterior: um COUNT(*) por estatística"""
+    now = datetime.utcnow()
+    today = now.date()
+    week_ago = now - timedelta(days=7)
+    month_ago = now - timedelta(days=30)
+    
+    return UserStatsDTO(
+        total_users=User.query.count(),
+        active_users=User.query.filter_by(is_active=True).count(),
+        inactive_users=User.query.filter_by(is_active=False).count(),
+        pending_users=User.query.filter_by(status='pending').count(),
+        suspended_users=User.query.filter_by(status='suspended').count(),
+        admin_users=User.query.filter_by(role='admin').count(),
+        developer_users=User.query.filter_by(role='developer').count(),
+        user_users=User.query.filter_by(role='user').count(),
+        users_created_today=User.query.filter(func.date(User.created_at) == today).count(),
+        users_created_this_week=User.query.filter(User.created_at >= week_ago).count(),
+        users_created_this_month=User.query.filter(User.created_at >= month_ago).count()
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--database-url', default=None)
+    args = parser.parse_args()
+    
+    app = create_bench_app(args.database_url)
+    with app.app_context():
+        print(f"Populando {args.rows} usuários...")
+        seed_users(args.rows)
+        
+        repo = UserRepository()
+        legacy = measure(legacy_user_stats, args.repeat)
+        single = measure(repo.get_user_stats, args.repeat)
+        
+        assert legacy['result'].to_dict() == single['result'].to_dict(), "Resultados divergentes"
+        
+        print(f"{'Implementação':<20} {'Mediana (ms)':>14} {'Melhor (ms)':>14}")
+        print(f"{'11 x COUNT(*)':<20} {legacy['median_ms']:>14.1f} {legacy['best_ms']:>14.1f}")
+        print(f"{'Varredura única':<20} {single['median_ms']:>14.1f} {single['best_ms']:>14.1f}")
+        print(f"Speedup: {legacy['median_ms'] / single['median_ms']:.1f}x")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""
+Benchmark: comandos SQL por caminho de escrita de usuários
+
+Cada caminho tem um número mínimo de comandos (um INSERT/UPDATE/DELETE ... RETURNING);
+o script falha se algum caminho emitir mais comandos que o esperado.
+
+Uso: python -m benchmarks.write_paths [--database-url postgresql://...] [--verbose]
+"""
+import argparse
+import sys
+from contextlib import contextmanager
+from sqlalchemy import event
+from app import db
+from app.api.v1.users.service import UserService
+from app.domain.dtos import CreateUserRequestDTO, UpdateUserRequestDTO, UserRole, UserStatus
+from benchmarks.common import create_bench_app, seed_users
+
+# Caminho -> comandos esperados
+EXPECTED = {
+    'create_user': 1,
+    'get_user_by_id': 1,
+    'update_user': 1,
+    'update_user (status)': 1,
+    'activate_user': 1,
+    'deactivate_user': 1,
+    'suspend_user': 1,
+    'reset_user_password': 1,
+    'delete_user': 1,
+}
+
+@contextmanager
+def count_statements(statements: list):
+    """Registra os comandos enviados ao banco enquanto o bloco executa"""
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--database-url', default=None)
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args()
+    
+    app = create_bench_app(args.database_url)
+    app.config.update(SECRET_KEY='benchmark', REDIS_URL='redis://localhost:6379/0', HASHING_POOL_ENABLED=False)
+    with app.app_context():
+        seed_users(100)
+        service = UserService()
+        created = {}
+        
+        paths = {
+            'create_user': lambda: created.setdefault('user', service.create_user(CreateUserRequestDTO(
+                email='write-paths@bench.local', password='Senha@Forte123', name='Write Paths',
+                role=UserRole.DEVELOPER, status=UserStatus.ACTIVE
+            ))),
+            'get_user_by_id': lambda: service.get_user_by_id(created['user'].id),
+            'update_user': lambda: service.update_user(created['user'].id, UpdateUserRequestDTO(name='Write Paths 2')),
+            'update_user (status)': lambda: service.update_user(
+                created['user'].id, UpdateUserRequestDTO(status=UserStatus.INACTIVE)
+            ),
+            'activate_user': lambda: service.activate_user(created['user'].id),
+            'deactivate_user': lambda: service.deactivate_user(created['user'].id),
+            'suspend_user': lambda: service.suspend_user(created['user'].id),
+            'reset_user_password': lambda: service.reset_user_password(created['user'].id, 'Outra@Senha456'),
+            'delete_user': lambda: service.delete_user(created['user'].id),
+        }
+        
+        failures = 0
+        print(f"{'Caminho':<24} {'Comandos':>9} {'Esperado':>9}")
+        for name, path in paths.items():
+            # Sessão nova por caminho: nada reaproveitado do identity map
+            db.session.remove()
+            with count_statements([]) as statements:
+                path()
+            ok = len(statements) <= EXPECTED[name]
+            failures += not ok
+            print(f"{name:<24} {len(statements):>9} {EXPECTED[name]:>9}{'' if ok else '  <- acima do esperado'}")
+            if args.verbose:
+                for statement in statements:
+                    print(f"    {' '.join(statement.split())}")
+        
+        sys.exit(1 if failures else 0)
+
+if __name__ == '__main__':
+    main()
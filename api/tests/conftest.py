@@ -0,0 +1,108 @@
+"""
+Fixtures dos testes (SQLite em memória, Redis simulado com fakeredis, Celery em memória)
+"""
+from contextlib import contextmanager
+import fakeredis
+import pytest
+import redis
+from sqlalchemy import event
+from app import create_app, db as _db
+from app.core.security import create_tokens, hash_password
+from app.domain.models import User
+
+# Comandos de controle de transação não contam como ida ao banco com dados
+TRANSACTION_CONTROL = ('BEGIN', 'COMMIT', 'ROLLBACK', 'SAVEPOINT', 'RELEASE')
+
+@pytest.fixture(scope='session')
+def redis_server():
+    """Servidor Redis simulado compartilhado por todos os clientes"""
+    server = fakeredis.FakeServer()
+    original = redis.Redis.from_url
+    
+    def from_url(url, **kwargs):
+        return fakeredis.FakeRedis(server=server, decode_responses=kwargs.get('decode_responses', False))
+    
+    redis.Redis.from_url = from_url
+    yield server
+    redis.Redis.from_url = original
+
+@pytest.fixture(scope='session', autouse=True)
+def pubsub_thread_disabled():
+    """Sem a thread de pub/sub: ela dividiria a conexão única do SQLite em memória com o teste"""
+    from app.infra.pubsub import pubsub_listener
+    
+    original = pubsub_listener.ensure_started
+    pubsub_listener.ensure_started = lambda: None
+    yield
+    pubsub_listener.ensure_started = original
+
+@pytest.fixture
+def app(redis_server):
+    """Aplicação de testes com banco recriado a cada teste"""
+    app = create_app('testing')
+    
+    with app.app_context():
+        _db.create_all()
+        yield app
+        _db.session.remove()
+        _db.drop_all()
+    
+    fakeredis.FakeRedis(server=redis_server).flushall()
+
+@pytest.fixture
+def db(app):
+    """Instância do SQLAlchemy da aplicação"""
+    return _db
+
+@pytest.fixture
+def make_user(db):
+    """Cria usuário direto no banco"""
+    created = []
+    
+    def make_user(email=None, name=None, password='Senha@Forte1', role='developer', status='active'):
+        user = User(
+            email=email or f'usuario{len(created)}@example.com',
+            name=name or f'Usuário {len(created)}',
+            password_hash=hash_password(password),
+            role=role,
+            status=status,
+            is_active=status == 'active'
+        )
+        db.session.add(user)
+        db.session.commit()
+        created.append(user)
+        return user
+    
+    return make_user
+
+@pytest.fixture
+def admin(make_user):
+    """Usuário administrador"""
+    return make_user(email='admin@example.com', name='Administradora', role='admin')
+
+@pytest.fixture
+def auth_headers(app):
+    """Cabeçalhos com access token do usuário"""
+    def auth_headers(user):
+        return {'Authorization': f"Bearer {create_tokens(user)['access_token']}"}
+    
+    return auth_headers
+
+@pytest.fixture
+def count_queries(db):
+    """Conta os comandos enviados ao banco dentro do bloco (sem BEGIN/COMMIT/SAVEPOINT)"""
+    @contextmanager
+    def count_queries():
+        statements = []
+        
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            if not statement.lstrip().upper().startswith(TRANSACTION_CONTROL):
+                statements.append(statement)
+        
+        event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            yield statements
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+    
+    return count_queries
@@ -0,0 +1,32 @@
+"""
+Login: rehash da senha em segundo plano apenas quando o acesso é concedido
+"""
+from unittest.mock import patch
+import pytest
+
+@pytest.fixture
+def rehash():
+    """Hash armazenado fora da política atual e agendamento do rehash observado"""
+    with patch('app.api.v1.auth.service.password_needs_rehash', return_value=True), \
+         patch('app.api.v1.auth.service.AuthService._schedule_rehash') as schedule:
+        yield schedule
+
+def login(client, email):
+    """POST /auth/login com a senha padrão dos usuários de teste"""
+    return client.post('/api/v1/auth/login', json={'email': email, 'password': 'Senha@Forte1'})
+
+def test_accepted_login_schedules_rehash(client, make_user, rehash):
+    user = make_user(email='dev@example.com', role='developer')
+    
+    assert login(client, 'dev@example.com').status_code == 200
+    rehash.assert_called_once()
+    assert rehash.call_args.args[:2] == (user.id, 'Senha@Forte1')
+
+def test_refused_login_does_not_rehash(client, make_user, rehash):
+    make_user(email='comum@example.com', role='user')
+    
+    response = login(client, 'comum@example.com')
+    
+    assert response.status_code == 401
+    assert response.json['message'] == 'Acesso negado'
+    rehash.assert_not_called()
@@ -0,0 +1,99 @@
+"""
+Paginação por cursor (keyset) da listagem de usuários
+"""
+import pytest
+
+@pytest.fixture
+def headers(admin, auth_headers):
+    """Token do admin"""
+    return auth_headers(admin)
+
+def list_users(client, headers, cursor='', **params):
+    """Uma página da listagem por cursor"""
+    params = {'per_page': 4, 'sort_by': 'name', 'sort_order': 'asc', 'cursor': cursor, **params}
+    response = client.get('/api/v1/users/', headers=headers, query_string=params)
+    assert response.status_code == 200, response.json
+    return [user['name'] for user in response.json['data']['users']], response.json['data']['pagination']
+
+def walk(client, headers, **params):
+    """Percorre todas as páginas seguindo next_cursor"""
+    names, pages, cursor = [], 0, ''
+    while cursor is not None:
+        page, pagination = list_users(client, headers, cursor, **params)
+        names.extend(page)
+        pages += 1
+        cursor = pagination['next_cursor']
+    return names, pages
+
+def test_walks_every_row_once_in_order(client, headers, make_user):
+    for i in range(10):
+        make_user(name=f'Pessoa {i:02d}')
+    
+    names, pages = walk(client, headers)
+    
+    assert names == sorted(['Administradora'] + [f'Pessoa {i:02d}' for i in range(10)])
+    assert pages == 3
+
+def test_descending_order(client, headers, make_user):
+    for i in range(6):
+        make_user(name=f'Pessoa {i:02d}')
+    
+    names, _ = walk(client, headers, sort_order='desc')
+    
+    assert names == sorted(['Administradora'] + [f'Pessoa {i:02d}' for i in range(6)], reverse=True)
+
+def test_ties_on_sort_column_are_broken_by_id(client, headers, make_user):
+    # Nomes repetidos atravessando a fronteira das páginas
+    for _ in range(7):
+        make_user(name='Mesmo Nome')
+    
+    names, _ = walk(client, headers)
+    
+    assert names == ['Administradora'] + ['Mesmo Nome'] * 7
+
+def test_prev_cursor_returns_previous_page(client, headers, make_user):
+    for i in range(10):
+        make_user(name=f'Pessoa {i:02d}')
+    
+    first, pagination = list_users(client, headers)
+    second, pagination = list_users(client, headers, pagination['next_cursor'])
+    again, pagination = list_users(client, headers, pagination['prev_cursor'])
+    
+    assert again == first
+    assert pagination['has_next'] is True
+    assert pagination['has_prev'] is False
+    assert set(first).isdisjoint(second)
+
+def test_inserts_between_requests_do_not_shift_pages(client, headers, make_user):
+    for i in range(8):
+        make_user(name=f'Pessoa {i:02d}')
+    
+    first, pagination = list_users(client, headers)
+    # Linha que cairia antes do cursor: com OFFSET a próxima página repetiria um nome
+    make_user(name='Aaron')
+    second, _ = list_users(client, headers, pagination['next_cursor'])
+    
+    assert first == ['Administradora', 'Pessoa 00', 'Pessoa 01', 'Pessoa 02']
+    assert second == ['Pessoa 03', 'Pessoa 04', 'Pessoa 05', 'Pessoa 06']
+
+def test_tampered_cursor_is_rejected(client, headers, make_user):
+    for i in range(6):
+        make_user(name=f'Pessoa {i:02d}')
+    _, pagination = list_users(client, headers)
+    
+    response = client.get('/api/v1/users/', headers=headers, query_string={
+        'per_page': 4, 'sort_by': 'name', 'sort_order': 'asc', 'cursor': pagination['next_cursor'][:-2] + 'xx'
+    })
+    
+    assert response.status_code == 400
+
+def test_cursor_from_another_ordering_is_rejected(client, headers, make_user):
+    for i in range(6):
+        make_user(name=f'Pessoa {i:02d}')
+    _, pagination = list_users(client, headers)
+    
+    response = client.get('/api/v1/users/', headers=headers, query_string={
+        'per_page': 4, 'sort_by': 'email', 'sort_order': 'asc', 'cursor': pagination['next_cursor']
+    })
+    
+    assert response.status_code == 400
@@ -0,0 +1,114 @@
+"""
+Ações em lote sobre usuários (ids ou filtros, admin fora do lote, revogação dos tokens afetados)
+"""
+from unittest.mock import patch
+import pytest
+from app.domain.models import User
+
+@pytest.fixture
+def headers(admin, auth_headers):
+    """Token do admin"""
+    return auth_headers(admin)
+
+def bulk(client, headers, **payload):
+    """POST /users/bulk"""
+    return client.post('/api/v1/users/bulk', headers=headers, json=payload)
+
+def statuses(db):
+    """Email -> status de todos os usuários"""
+    db.session.expire_all()
+    return {user.email: user.status for user in db.session.query(User)}
+
+def test_action_by_ids_changes_only_the_listed_users(client, headers, make_user, db):
+    first, second, untouched = make_user(), make_user(), make_user()
+    
+    response = bulk(client, headers, action='suspend', ids=[first.id, second.id, 999])
+    
+    assert response.status_code == 200
+    assert response.json['data'] == {
+        'action': 'suspend', 'matched': 2, 'requested': 3, 'affected': 2, 'status': 'done'
+    }
+    current = statuses(db)
+    assert current[first.email] == current[second.email] == 'suspended'
+    assert current[untouched.email] == 'active'
+
+def test_action_by_filters_changes_the_matching_users(client, headers, make_user, db):
+    pending = [make_user(status='pending'), make_user(status='pending')]
+    active = make_user()
+    
+    response = bulk(client, headers, action='activate', filters={'status': 'pending'})
+    
+    assert response.status_code == 200
+    assert response.json['data']['affected'] == 2
+    current = statuses(db)
+    assert all(current[user.email] == 'active' for user in pending)
+    assert current[active.email] == 'active'
+
+def test_admin_is_left_out_of_its_own_batch(client, headers, admin, make_user, db):
+    other_admin = make_user(role='admin')
+    
+    response = bulk(client, headers, action='change_role', role='user', ids=[admin.id, other_admin.id])
+    
+    assert response.status_code == 200
+    assert response.json['data']['matched'] == 1
+    db.session.expire_all()
+    assert db.session.get(User, admin.id).role == 'admin'
+    assert db.session.get(User, other_admin.id).role == 'user'
+
+def test_filters_do_not_reach_the_acting_admin(client, headers, admin, db):
+    response = bulk(client, headers, action='deactivate', filters={'role': 'admin'})
+    
+    assert response.status_code == 200
+    assert response.json['data']['affected'] == 0
+    assert statuses(db)[admin.email] == 'active'
+
+def test_affected_users_tokens_are_revoked(client, headers, make_user, auth_headers):
+    user = make_user()
+    user_headers = auth_headers(user)
+    assert client.get('/api/v1/auth/me', headers=user_headers).status_code == 200
+    
+    response = bulk(client, headers, action='change_role', role='user', ids=[user.id])
+    
+    assert response.status_code == 200
+    assert client.get('/api/v1/auth/me', headers=user_headers).status_code == 401
+
+def test_activate_keeps_existing_tokens(client, headers, make_user, auth_headers):
+    user = make_user()
+    user_headers = auth_headers(user)
+    
+    assert bulk(client, headers, action='activate', ids=[user.id]).status_code == 200
+    assert client.get('/api/v1/auth/me', headers=user_headers).status_code == 200
+
+def test_large_batches_are_queued(app, client, headers, make_user):
+    ids = [make_user().id for _ in range(3)]
+    app.config['USER_BULK_ASYNC_THRESHOLD'] = 2
+    
+    with patch('app.infra.tasks.bulk_user_action_task.delay') as delay:
+        delay.return_value.id = 'tarefa-1'
+        response = bulk(client, headers, action='suspend', ids=ids)
+    
+    assert response.status_code == 202
+    assert response.json['data']['status'] == 'queued'
+    assert response.json['data']['task_id'] == 'tarefa-1'
+    delay.assert_called_once()
+
+@pytest.mark.parametrize('payload', [
+    {'action': 'suspend'},
+    {'action': 'suspend', 'ids': [1], 'filters': {'role': 'user'}},
+    {'action': 'suspend', 'filters': {}},
+    {'action': 'suspend', 'ids': []},
+    {'action': 'change_role', 'ids': [1]},
+    {'action': 'delete', 'ids': [1]},
+])
+def test_invalid_payloads_are_rejected(client, headers, payload):
+    response = client.post('/api/v1/users/bulk', headers=headers, json=payload)
+    
+    assert response.status_code == 400
+    assert response.json['error'] == 'ValidationError'
+
+def test_only_admins_can_run_batches(client, make_user, auth_headers):
+    developer = make_user(role='developer')
+    
+    response = bulk(client, auth_headers(developer), action='suspend', ids=[developer.id])
+    
+    assert response.status_code == 403
@@ -0,0 +1,32 @@
+"""
+Exportação de usuários em streaming (cabeçalhos da resposta e conteúdo do CSV/NDJSON)
+"""
+import json
+import pytest
+
+@pytest.fixture
+def headers(admin, auth_headers):
+    """Token do admin"""
+    return auth_headers(admin)
+
+def test_csv_export_headers_and_rows(client, headers, make_user):
+    make_user(email='ana@example.com', name='=SOMA(A1)')
+    
+    response = client.get('/api/v1/users/export', headers=headers, query_string={'format': 'csv'})
+    
+    assert response.status_code == 200
+    assert response.headers['Content-Type'] == 'text/csv; charset=utf-8'
+    assert response.headers['Content-Disposition'] == 'attachment; filename=users.csv'
+    lines = response.get_data(as_text=True).splitlines()
+    assert lines[0].startswith('id,email,name')
+    assert any("ana@example.com,'=SOMA(A1)" in line for line in lines[1:])
+
+def test_ndjson_export_headers_and_rows(client, headers, make_user):
+    make_user(email='ana@example.com')
+    
+    response = client.get('/api/v1/users/export', headers=headers, query_string={'format': 'ndjson'})
+    
+    assert response.status_code == 200
+    assert response.headers['Content-Type'] == 'application/x-ndjson'
+    emails = [json.loads(line)['email'] for line in response.get_data(as_text=True).splitlines()]
+    assert sorted(emails) == ['admin@example.com', 'ana@example.com']
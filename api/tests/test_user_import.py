@@ -0,0 +1,124 @@
+"""
+Importação de usuários: erros por linha (validação, duplicados no arquivo, emails já cadastrados)
+e acesso ao progresso/relatório restrito ao admin que enfileirou
+"""
+import io
+import json
+from unittest.mock import patch
+import pytest
+from app.api.v1.users.service import UserService
+from app.core.security import verify_password
+from app.domain.models import User
+
+CSV_HEADER = 'email,password,name,role,status\n'
+
+def import_csv(db, *lines):
+    """Importa um CSV com as linhas dadas (após o cabeçalho) e confirma a transação"""
+    result = UserService().import_users(io.BytesIO((CSV_HEADER + ''.join(lines)).encode('utf-8')), 'csv')
+    db.session.commit()
+    return result
+
+def test_valid_rows_are_created(db):
+    result = import_csv(
+        db,
+        'ana@example.com,Senha@Forte1,Ana Souza,developer,active\n',
+        'bruno@example.com,Senha@Forte2,Bruno Lima,,pending\n',
+    )
+    
+    assert (result.total, result.created, result.rejected) == (2, 2, 0)
+    ana = db.session.query(User).filter_by(email='ana@example.com').one()
+    bruno = db.session.query(User).filter_by(email='bruno@example.com').one()
+    assert (ana.role, ana.status, ana.is_active) == ('developer', 'active', True)
+    assert (bruno.role, bruno.status, bruno.is_active) == ('developer', 'pending', False)
+    assert verify_password('Senha@Forte1', ana.password_hash)
+
+def test_conflicts_and_invalid_rows_are_reported_by_line(db, make_user):
+    make_user(email='existente@example.com')
+    
+    result = import_csv(
+        db,
+        'existente@example.com,Senha@Forte1,Já Cadastrado,user,active\n',
+        'nova@example.com,Senha@Forte1,Nova,user,active\n',
+        'nova@example.com,Senha@Forte1,Nova de Novo,user,active\n',
+        'invalido,Senha@Forte1,Email Ruim,user,active\n',
+        'fraca@example.com,fraca,Senha Fraca,user,active\n',
+        'colunas@example.com,Senha@Forte1,Extra,user,active,sobrando\n',
+    )
+    
+    assert (result.total, result.created, result.rejected) == (6, 1, 5)
+    errors = result.sorted_errors()
+    assert [(error['line'], error['email']) for error in errors] == [
+        (2, 'existente@example.com'),
+        (4, 'nova@example.com'),
+        (5, 'invalido'),
+        (6, 'fraca@example.com'),
+        (7, None),
+    ]
+    assert errors[0]['errors'] == ['Email já está em uso']
+    assert errors[1]['errors'] == ['Email duplicado no arquivo']
+    assert errors[2]['errors'][0].startswith('email:')
+    assert errors[4]['errors'] == ['Linha com mais colunas que o cabeçalho']
+    assert db.session.query(User).filter_by(email='nova@example.com').one().name == 'Nova'
+
+def test_report_csv_lists_errors_in_file_order(db, make_user):
+    make_user(email='existente@example.com')
+    
+    result = import_csv(
+        db,
+        'invalido,Senha@Forte1,Email Ruim,user,active\n',
+        'existente@example.com,Senha@Forte1,Já Cadastrado,user,active\n',
+    )
+    
+    report = b''.join(result.report_csv()).decode('utf-8').splitlines()
+    assert report[0] == 'line,email,errors'
+    assert report[1].startswith('2,invalido,email:')
+    assert report[2] == '3,existente@example.com,Email já está em uso'
+
+def test_ndjson_rows_are_imported(db):
+    lines = [
+        json.dumps({'email': 'carla@example.com', 'password': 'Senha@Forte1', 'name': 'Carla'}),
+        'não é json',
+        json.dumps(['lista']),
+    ]
+    result = UserService().import_users(io.BytesIO('\n'.join(lines).encode('utf-8')), 'ndjson')
+    db.session.commit()
+    
+    assert (result.created, result.rejected) == (1, 2)
+    assert [error['errors'] for error in result.sorted_errors()] == [
+        ['JSON inválido'], ['Linha deve ser um objeto JSON']
+    ]
+
+@pytest.fixture
+def finished_import():
+    """Simula a consulta ao Celery de uma importação concluída"""
+    def finished_import(task_type='import', owner_id=None):
+        task = patch('app.infra.tasks.celery.AsyncResult').start()
+        task.return_value.state = 'SUCCESS'
+        task.return_value.info = {
+            'task_type': task_type, 'owner_id': owner_id,
+            'total': 2, 'created': 1, 'rejected': 1, 'report_path': 'imports/report.csv'
+        }
+        return task
+    
+    yield finished_import
+    patch.stopall()
+
+def test_import_status_is_visible_to_its_owner(client, admin, auth_headers, finished_import):
+    finished_import(owner_id=admin.id)
+    
+    response = client.get('/api/v1/users/import/tarefa-1', headers=auth_headers(admin))
+    
+    assert response.status_code == 200
+    data = response.json['data']
+    assert data['result'] == {'total': 2, 'created': 1, 'rejected': 1, 'report_path': 'imports/report.csv'}
+    assert data['report_url'] == '/api/v1/users/import/tarefa-1/report'
+
+@pytest.mark.parametrize('task_type, other_owner', [('import', True), ('export', False)])
+def test_import_of_another_admin_or_type_is_not_found(client, admin, make_user, auth_headers, finished_import,
+                                                      task_type, other_owner):
+    other_admin = make_user(role='admin')
+    finished_import(task_type, other_admin.id if other_owner else admin.id)
+    
+    headers = auth_headers(admin)
+    assert client.get('/api/v1/users/import/tarefa-1', headers=headers).status_code == 404
+    assert client.get('/api/v1/users/import/tarefa-1/report', headers=headers).status_code == 404
@@ -0,0 +1,66 @@
+"""
+Busca de usuários sem acento e por prefixo de palavra (FTS5 no SQLite, pg_trgm no PostgreSQL)
+"""
+import pytest
+from app.infra.search import user_search
+
+@pytest.fixture
+def headers(admin, auth_headers):
+    """Token do admin"""
+    return auth_headers(admin)
+
+@pytest.fixture
+def people(make_user):
+    """Usuários com nomes acentuados"""
+    return {
+        'joao': make_user(name='João Silva', email='joao.silva@example.com'),
+        'joana': make_user(name='Joana Souza', email='joana@example.com'),
+        'jose': make_user(name='José Álvares', email='ze@example.com'),
+        'maria': make_user(name='Maria Conceição', email='maria@example.com'),
+    }
+
+def search(client, headers, term, **params):
+    """Emails encontrados por /users/search, na ordem da resposta"""
+    response = client.get('/api/v1/users/search', headers=headers, query_string={'q': term, **params})
+    assert response.status_code == 200, response.json
+    return [user['email'] for user in response.json['data']]
+
+def test_search_ignores_accents_and_case(client, headers, people):
+    assert search(client, headers, 'joao') == ['joao.silva@example.com']
+    assert search(client, headers, 'JOÃO') == ['joao.silva@example.com']
+    assert search(client, headers, 'alvares') == ['ze@example.com']
+    assert search(client, headers, 'conceicao') == ['maria@example.com']
+
+def test_every_word_matches_as_prefix(client, headers, people):
+    assert sorted(search(client, headers, 'jo')) == ['joana@example.com', 'joao.silva@example.com', 'ze@example.com']
+    assert search(client, headers, 'jo sil') == ['joao.silva@example.com']
+    assert search(client, headers, 'jo xyz') == []
+
+def test_exact_email_ranks_first(client, headers, people, make_user):
+    make_user(name='Joana Outra', email='outra.joana@example.com')
+    
+    results = search(client, headers, 'joana@example.com')
+    
+    assert results[0] == 'joana@example.com'
+
+def test_index_follows_updates_and_deletes(client, headers, people):
+    user_id = people['maria'].id
+    
+    response = client.put(f'/api/v1/users/{user_id}', headers=headers, json={'name': 'Mariana Ribeiro'})
+    assert response.status_code == 200
+    assert search(client, headers, 'ribeiro') == ['maria@example.com']
+    assert search(client, headers, 'conceicao') == []
+    
+    assert client.delete(f'/api/v1/users/{user_id}', headers=headers).status_code == 200
+    assert search(client, headers, 'ribeiro') == []
+
+def test_listing_filter_uses_the_same_search(client, headers, people):
+    response = client.get('/api/v1/users/', headers=headers, query_string={'search': 'jose'})
+    
+    assert response.status_code == 200
+    assert [user['email'] for user in response.json['data']['users']] == ['ze@example.com']
+
+def test_like_backend_matches_substrings(client, headers, people, monkeypatch):
+    monkeypatch.setattr(user_search, 'backend', 'like')
+    
+    assert search(client, headers, 'silva@') == ['joao.silva@example.com']
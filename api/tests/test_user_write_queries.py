@@ -0,0 +1,128 @@
+"""
+Quantidade de comandos SQL por escrita de usuário (INSERT/UPDATE/DELETE ... RETURNING, sem SELECT prévio)
+"""
+import pytest
+
+@pytest.fixture
+def headers(client, admin, auth_headers):
+    """Token do admin, com a verificação de revogação já aquecida (filtro e epoch em memória)"""
+    headers = auth_headers(admin)
+    assert client.get('/api/v1/auth/me', headers=headers).status_code == 200
+    return headers
+
+def test_create_user_is_a_single_insert(client, headers, count_queries):
+    with count_queries() as statements:
+        response = client.post('/api/v1/users/', headers=headers, json={
+            'email': 'novo@example.com', 'password': 'Senha@Forte1', 'name': 'Novo Usuário'
+        })
+    
+    assert response.status_code == 201
+    assert len(statements) == 1
+    assert statements[0].startswith('INSERT INTO users')
+
+def test_create_user_conflict_is_detected_by_the_insert(client, headers, make_user, count_queries):
+    make_user(email='existente@example.com')
+    
+    with count_queries() as statements:
+        response = client.post('/api/v1/users/', headers=headers, json={
+            'email': 'existente@example.com', 'password': 'Senha@Forte1', 'name': 'Outro Usuário'
+        })
+    
+    assert response.status_code == 409
+    assert len(statements) == 1
+
+def test_update_user_is_a_single_update(client, headers, make_user, count_queries):
+    user = make_user()
+    
+    with count_queries() as statements:
+        response = client.put(f'/api/v1/users/{user.id}', headers=headers, json={
+            'name': 'Nome Novo', 'email': 'novo-email@example.com'
+        })
+    
+    assert response.status_code == 200
+    assert response.json['data']['email'] == 'novo-email@example.com'
+    assert len(statements) == 1
+    assert statements[0].startswith('UPDATE users')
+
+def test_suspending_user_bumps_epoch_in_the_same_update(client, headers, make_user, count_queries):
+    user = make_user()
+    
+    with count_queries() as statements:
+        response = client.put(f'/api/v1/users/{user.id}', headers=headers, json={'status': 'suspended'})
+    
+    assert response.status_code == 200
+    assert len(statements) == 1
+    assert 'token_epoch' in statements[0]
+
+def test_role_change_bumps_epoch_in_the_same_update(client, headers, make_user, auth_headers, count_queries):
+    user = make_user(role='admin')
+    user_headers = auth_headers(user)
+    
+    with count_queries() as statements:
+        response = client.put(f'/api/v1/users/{user.id}', headers=headers, json={'role': 'user'})
+    
+    assert response.status_code == 200
+    assert len(statements) == 1
+    assert 'token_epoch' in statements[0]
+    # Admin rebaixado: o token com a role antiga deixa de valer
+    assert client.get('/api/v1/auth/me', headers=user_headers).status_code == 401
+
+def test_same_role_keeps_existing_tokens(client, headers, make_user, auth_headers):
+    user = make_user(role='developer')
+    user_headers = auth_headers(user)
+    
+    response = client.put(f'/api/v1/users/{user.id}', headers=headers, json={'role': 'developer', 'name': 'Nome Novo'})
+    
+    assert response.status_code == 200
+    assert client.get('/api/v1/auth/me', headers=user_headers).status_code == 200
+
+@pytest.mark.parametrize('action', ['activate', 'deactivate'])
+def test_status_actions_are_a_single_update(client, headers, make_user, count_queries, action):
+    user = make_user(status='pending')
+    
+    with count_queries() as statements:
+        response = client.post(f'/api/v1/users/{user.id}/{action}', headers=headers)
+    
+    assert response.status_code == 200
+    assert len(statements) == 1
+
+def test_delete_user_is_a_single_delete(client, headers, make_user, count_queries):
+    user = make_user()
+    
+    with count_queries() as statements:
+        response = client.delete(f'/api/v1/users/{user.id}', headers=headers)
+    
+    assert response.status_code == 200
+    assert len(statements) == 1
+    assert statements[0].startswith('DELETE FROM users')
+
+def test_bulk_action_counts_then_updates_once(client, headers, make_user, count_queries):
+    ids = [make_user().id for _ in range(5)]
+    
+    with count_queries() as statements:
+        response = client.post('/api/v1/users/bulk', headers=headers, json={'action': 'deactivate', 'ids': ids})
+    
+    assert response.status_code == 200
+    assert response.json['data']['affected'] == 5
+    assert len(statements) == 2
+    assert statements[1].startswith('UPDATE users')
+
+def test_login_reads_user_and_records_login(client, headers, count_queries):
+    with count_queries() as statements:
+        response = client.post('/api/v1/auth/login', json={'email': 'admin@example.com', 'password': 'Senha@Forte1'})
+    
+    assert response.status_code == 200
+    # SELECT do usuário + UPDATE de last_login/login_count (buffer de logins desligado nos testes)
+    assert len(statements) == 2
+    assert statements[1].startswith('UPDATE users')
+
+def test_register_inserts_without_email_precheck(client, headers, count_queries):
+    with count_queries() as statements:
+        response = client.post('/api/v1/auth/register', json={
+            'email': 'registro@example.com', 'password': 'Senha@Forte1', 'name': 'Registro'
+        })
+    
+    assert response.status_code == 201
+    # INSERT ... RETURNING + epoch do novo usuário para os claims do token
+    assert len(statements) == 2
+    assert statements[0].startswith('INSERT INTO users')